@@ -12,63 +12,131 @@ Computes standardized performance metrics:
 - Correlation (for continuous ideology scores)
 - Confusion Matrix summary
 
+Result files larger than memory can be evaluated in chunks (CSV, JSONL or
+Parquet); metrics are then derived from incrementally accumulated confusion
+counts, calibration bins and correlation sums.
+
 Usage:
     $ python evaluation.py --data FPP_ANES_2016_base/results.csv --out FPP_ANES_2016_base/eval_summary.csv
+    $ python evaluation.py --data simulated_votes.parquet --chunksize 1000000
+    $ python evaluation.py --data shard_03.csv --chunksize 1000000 --save-state shard_03.json
+    $ python evaluation.py --merge shard_*.json --out eval_summary.csv
+    $ python evaluation.py --data FPP_ANES_2016_base/responses/results.csv --weight-col design_weight
 """
 
 import argparse
+import json
+import os
 import numpy as np
 import pandas as pd
-from typing import Tuple
-from sklearn.metrics import (
-    accuracy_score,
-    f1_score,
-    precision_score,
-    recall_score,
-    confusion_matrix
-)
+from typing import Iterator, Tuple
 
 # ------------------------------------------------------------
 # 1. Helper metrics
 # ------------------------------------------------------------
+# All label metrics are derived from one integer-encoded confusion matrix.
+
+def encode_labels(y_true, y_pred, labels=None) -> Tuple[np.ndarray, np.ndarray, list]:
+    """
+    Integer-encode true and predicted labels against one shared label list.
+    By default the labels are the sorted union of both arrays; when `labels` is
+    given, values outside it are encoded as -1 and ignored downstream.
+    Returns (true_codes, pred_codes, labels).
+    """
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    if labels is None:
+        uniques, codes = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+        codes = codes.ravel()
+        return codes[:len(y_true)], codes[len(y_true):], list(uniques)
+    index = pd.Index(labels)
+    return index.get_indexer(y_true), index.get_indexer(y_pred), list(labels)
+
+
+def confusion_from_codes(true_codes, pred_codes, n_labels: int, sample_weight=None) -> np.ndarray:
+    """Confusion matrix (rows = true, columns = predicted) with a single np.bincount."""
+    true_codes = np.asarray(true_codes)
+    pred_codes = np.asarray(pred_codes)
+    valid = (true_codes >= 0) & (pred_codes >= 0)
+    weights = None if sample_weight is None else np.asarray(sample_weight, dtype=float)[valid]
+    flat = true_codes[valid] * n_labels + pred_codes[valid]
+    cm = np.bincount(flat, weights=weights, minlength=n_labels * n_labels).reshape(n_labels, n_labels)
+    return cm if sample_weight is not None else cm.astype(np.int64)
+
+
+def metrics_from_confusion(cm: np.ndarray) -> dict:
+    """
+    Accuracy, macro/weighted F1 and macro precision/recall from a confusion matrix
+    (rows = true label, columns = predicted label). Classes with an empty
+    denominator score 0, matching scikit-learn's zero_division default.
+    """
+    cm = np.asarray(cm, dtype=float)
+    tp = np.diag(cm)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    total = cm.sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(support + predicted > 0, 2 * tp / (support + predicted), 0.0)
+    return {
+        "accuracy": tp.sum() / total if total else np.nan,
+        "f1_macro": f1.mean() if len(f1) else np.nan,
+        "f1_weighted": (f1 * support).sum() / support.sum() if support.sum() else 0.0,
+        "precision": precision.mean() if len(precision) else np.nan,
+        "recall": recall.mean() if len(recall) else np.nan,
+    }
+
+
+def _confusion(y_true, y_pred, labels=None) -> Tuple[np.ndarray, list]:
+    t, p, labels = encode_labels(y_true, y_pred, labels)
+    return confusion_from_codes(t, p, len(labels)), labels
+
 
 def compute_accuracy(y_true, y_pred) -> float:
-    return accuracy_score(y_true, y_pred)
+    return metrics_from_confusion(_confusion(y_true, y_pred)[0])["accuracy"]
 
 
 def compute_f1_scores(y_true, y_pred) -> Tuple[float, float]:
     """Return (macro F1, weighted F1)."""
-    return (
-        f1_score(y_true, y_pred, average="macro"),
-        f1_score(y_true, y_pred, average="weighted")
-    )
+    m = metrics_from_confusion(_confusion(y_true, y_pred)[0])
+    return m["f1_macro"], m["f1_weighted"]
 
 
 def compute_precision_recall(y_true, y_pred) -> Tuple[float, float]:
     """Return (precision, recall)."""
-    return (
-        precision_score(y_true, y_pred, average="macro"),
-        recall_score(y_true, y_pred, average="macro")
-    )
+    m = metrics_from_confusion(_confusion(y_true, y_pred)[0])
+    return m["precision"], m["recall"]
 
 
 def compute_confusion_matrix_summary(y_true, y_pred, labels=None) -> pd.DataFrame:
     """Return confusion matrix as a DataFrame."""
-    cm = confusion_matrix(y_true, y_pred, labels=labels)
+    cm, labels = _confusion(y_true, y_pred, labels)
     cm_df = pd.DataFrame(cm, index=labels, columns=labels)
     return cm_df
 
 
-def compute_expected_calibration_error(df: pd.DataFrame, n_bins: int = 10) -> float:
+def compute_expected_calibration_error(df: pd.DataFrame, n_bins: int = 10, sample_weight=None) -> float:
     """
     Compute Expected Calibration Error (ECE).
     Requires 'confidence' column.
     If missing, assumes uniform confidence of 0.5.
+    With `sample_weight` (e.g. survey design weights) bin sizes, accuracies and
+    confidences are weighted.
     """
     if "confidence" not in df.columns:
         df["confidence"] = 0.5
 
     df["correct"] = (df["predicted_vote"] == df["true_vote"]).astype(int)
+    if sample_weight is not None:
+        w = np.asarray(sample_weight, dtype=float)
+        conf = df["confidence"].to_numpy(dtype=float)
+        bin_idx = np.digitize(conf, np.linspace(0, 1, n_bins + 1)[1:-1], right=True)
+        in_range = (conf > 0) & (conf <= 1)
+        gaps = np.bincount(bin_idx[in_range], weights=(w * (df["correct"].to_numpy() - conf))[in_range],
+                           minlength=n_bins)
+        return float(np.abs(gaps).sum() / w.sum()) if w.sum() > 0 else 0.0
+
     bins = np.linspace(0, 1, n_bins + 1)
     ece = 0.0
     for i in range(n_bins):
@@ -81,13 +149,23 @@ def compute_expected_calibration_error(df: pd.DataFrame, n_bins: int = 10) -> fl
     return ece
 
 
-def compute_correlation(df: pd.DataFrame) -> float:
+def compute_correlation(df: pd.DataFrame, sample_weight=None) -> float:
     """
     Compute correlation between predicted and true ideology if columns exist.
-    Returns np.nan if unavailable.
+    Returns np.nan if unavailable. `sample_weight` gives the weighted Pearson correlation.
     """
     if {"predicted_ideology", "true_ideology"}.issubset(df.columns):
-        return df["predicted_ideology"].corr(df["true_ideology"], method="pearson")
+        if sample_weight is None:
+            return df["predicted_ideology"].corr(df["true_ideology"], method="pearson")
+        x = df["predicted_ideology"].to_numpy(dtype=float)
+        y = df["true_ideology"].to_numpy(dtype=float)
+        w = np.asarray(sample_weight, dtype=float)
+        ok = ~(np.isnan(x) | np.isnan(y))
+        if ok.sum() < 2:
+            return np.nan
+        x, y, w = x[ok], y[ok], w[ok]
+        dx, dy = x - np.average(x, weights=w), y - np.average(y, weights=w)
+        return float(np.sum(w * dx * dy) / np.sqrt(np.sum(w * dx * dx) * np.sum(w * dy * dy)))
     else:
         return np.nan
 
@@ -95,53 +173,412 @@ def compute_correlation(df: pd.DataFrame) -> float:
 # 2. Evaluation pipeline
 # ------------------------------------------------------------
 
-def evaluate_political_llm(df: pd.DataFrame) -> pd.DataFrame:
+def _summary_row(metrics: dict, ece: float, corr: float, samples: int) -> dict:
+    return {
+        "Accuracy": round(metrics["accuracy"], 4),
+        "F1_macro": round(metrics["f1_macro"], 4),
+        "F1_weighted": round(metrics["f1_weighted"], 4),
+        "Precision": round(metrics["precision"], 4),
+        "Recall": round(metrics["recall"], 4),
+        "ECE": round(ece, 4),
+        "Ideology_Correlation": round(corr, 4) if not np.isnan(corr) else "N/A",
+        "Samples": samples
+    }
+
+
+def evaluate_political_llm(df: pd.DataFrame, confusion=None, weight_col: str = None) -> pd.DataFrame:
     """
     Run standardized evaluation for Political-LLM experiments.
     Expected columns:
     - predicted_vote
     - true_vote
     - optional: confidence, predicted_ideology, true_ideology
+
+    Labels are integer-encoded once and every label metric is derived from a
+    single confusion matrix. Pass `confusion` (array or DataFrame, rows = true
+    labels) to reuse a matrix that was already computed.
+
+    `weight_col` names a column of survey design weights (e.g. `design_weight`
+    from a stratified ANES subsample); every metric is then the weighted,
+    population-level estimate. Samples still reports the number of rows.
     """
-    y_true = df["true_vote"].astype(str)
-    y_pred = df["predicted_vote"].astype(str)
-
-    accuracy = compute_accuracy(y_true, y_pred)
-    f1_macro, f1_weighted = compute_f1_scores(y_true, y_pred)
-    precision, recall = compute_precision_recall(y_true, y_pred)
-    ece = compute_expected_calibration_error(df)
-    corr = compute_correlation(df)
-
-    summary = {
-        "Accuracy": round(accuracy, 4),
-        "F1_macro": round(f1_macro, 4),
-        "F1_weighted": round(f1_weighted, 4),
-        "Precision": round(precision, 4),
-        "Recall": round(recall, 4),
-        "ECE": round(ece, 4),
-        "Ideology_Correlation": round(corr, 4) if not np.isnan(corr) else "N/A",
-        "Samples": len(df)
-    }
+    weights = None if weight_col is None else df[weight_col].to_numpy(dtype=float)
+    if confusion is None:
+        y_true = np.asarray(df["true_vote"].astype(str), dtype=str)
+        y_pred = np.asarray(df["predicted_vote"].astype(str), dtype=str)
+        t, p, labels = encode_labels(y_true, y_pred)
+        confusion = confusion_from_codes(t, p, len(labels), sample_weight=weights)
+
+    metrics = metrics_from_confusion(np.asarray(confusion))
+    ece = compute_expected_calibration_error(df, sample_weight=weights)
+    corr = compute_correlation(df, sample_weight=weights)
+    return pd.DataFrame([_summary_row(metrics, ece, corr, len(df))])
+
+
+def compare_models(true_vote, predictions: dict, labels=None) -> Tuple[pd.DataFrame, dict]:
+    """
+    Evaluate several models' predictions against the same ground truth.
+
+    The ground truth is encoded once; each model's predictions are encoded against
+    the shared label list, so every confusion matrix has the same axes.
+    Returns (one summary row per model, {model: confusion DataFrame}).
+    """
+    y_true = np.asarray(pd.Series(true_vote).astype(str), dtype=str)
+    y_preds = {name: np.asarray(pd.Series(pred).astype(str), dtype=str) for name, pred in predictions.items()}
+    if labels is None:
+        labels = sorted(set(np.unique(y_true)).union(*[np.unique(p) for p in y_preds.values()]))
+    index = pd.Index(labels)
+    true_codes = index.get_indexer(y_true)
 
-    return pd.DataFrame([summary])
+    rows, matrices = [], {}
+    for name, y_pred in y_preds.items():
+        cm = confusion_from_codes(true_codes, index.get_indexer(y_pred), len(labels))
+        m = metrics_from_confusion(cm)
+        rows.append({
+            "Model": name,
+            "Accuracy": round(m["accuracy"], 4),
+            "F1_macro": round(m["f1_macro"], 4),
+            "F1_weighted": round(m["f1_weighted"], 4),
+            "Precision": round(m["precision"], 4),
+            "Recall": round(m["recall"], 4),
+            "Samples": len(y_pred)
+        })
+        matrices[name] = pd.DataFrame(cm, index=labels, columns=labels)
+    return pd.DataFrame(rows), matrices
 
 
 # ------------------------------------------------------------
-# 3. Command-line Interface
+# 3. Streaming evaluation
+# ------------------------------------------------------------
+
+LABEL_COLUMNS = ["predicted_vote", "true_vote"]
+
+
+def _labels_as_text(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Spell numeric vote labels the same way in every chunk. A chunk with a
+    missing value is inferred as float, which would turn 1 into "1.0" there
+    and split one label across two rows of the confusion matrix.
+    """
+    for col in LABEL_COLUMNS:
+        if col in chunk.columns and pd.api.types.is_numeric_dtype(chunk[col]):
+            values = chunk[col]
+            if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+                values = values.astype("Int64")
+            chunk[col] = values.astype(str).where(values.notna(), np.nan)
+    return chunk
+
+
+def iter_result_chunks(path: str, chunksize: int = 100_000, columns: list = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield a results file as DataFrame chunks of at most `chunksize` rows.
+    Supports .csv, .jsonl/.ndjson (one JSON object per line) and .parquet.
+    Vote labels come back as strings (CSV labels exactly as written).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        for chunk in pd.read_json(path, lines=True, chunksize=chunksize):
+            yield _labels_as_text(chunk[[c for c in columns if c in chunk.columns]] if columns else chunk)
+    elif ext == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow package not installed. Install with: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        if columns:
+            columns = [c for c in columns if c in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            yield _labels_as_text(batch.to_pandas())
+    else:
+        usecols = (lambda c: c in columns) if columns else None
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=usecols,
+                               dtype={col: str for col in LABEL_COLUMNS})
+
+
+# Accumulators merge associatively and serialize to small JSON-friendly dicts,
+# so shards of a run can be evaluated locally and combined by a coordinator.
+
+class ConfusionAccumulator:
+    """Confusion counts over labels discovered incrementally (kept in sorted order)."""
+
+    def __init__(self):
+        self.labels = []
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def _add_labels(self, values):
+        new = sorted(set(np.unique(values)) - set(self.labels))
+        if new:
+            old_labels = self.labels
+            self.labels = sorted(old_labels + new)
+            pos = np.searchsorted(self.labels, old_labels)
+            grown = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+            grown[np.ix_(pos, pos)] = self.counts
+            self.counts = grown
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=str)
+        y_pred = np.asarray(y_pred, dtype=str)
+        self._add_labels(np.concatenate([y_true, y_pred]))
+        self.counts += confusion_from_codes(np.searchsorted(self.labels, y_true),
+                                            np.searchsorted(self.labels, y_pred), len(self.labels))
+
+    def merge(self, other: "ConfusionAccumulator") -> "ConfusionAccumulator":
+        self._add_labels(np.asarray(other.labels, dtype=str))
+        pos = np.searchsorted(self.labels, other.labels)
+        self.counts[np.ix_(pos, pos)] += other.counts
+        return self
+
+    def metrics(self) -> dict:
+        return metrics_from_confusion(self.counts)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.counts, index=self.labels, columns=self.labels)
+
+    def to_dict(self) -> dict:
+        return {"labels": [str(l) for l in self.labels], "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "ConfusionAccumulator":
+        acc = cls()
+        acc.labels = list(state["labels"])
+        acc.counts = np.array(state["counts"], dtype=np.int64).reshape(len(acc.labels), len(acc.labels))
+        return acc
+
+
+class CalibrationAccumulator:
+    """Per-bin sums of (correct - confidence) for Expected Calibration Error."""
+
+    def __init__(self, n_bins: int = 10):
+        self.n_bins = n_bins
+        self.gaps = np.zeros(n_bins)
+        self.total = 0
+
+    def update(self, correct, confidence):
+        correct = np.asarray(correct, dtype=float)
+        confidence = np.asarray(confidence, dtype=float)
+        bins = np.linspace(0, 1, self.n_bins + 1)
+        bin_idx = np.digitize(confidence, bins, right=True) - 1
+        in_range = (bin_idx >= 0) & (bin_idx < self.n_bins)
+        self.gaps += np.bincount(bin_idx[in_range], weights=(correct - confidence)[in_range],
+                                 minlength=self.n_bins)
+        self.total += len(correct)
+
+    def merge(self, other: "CalibrationAccumulator") -> "CalibrationAccumulator":
+        if other.n_bins != self.n_bins:
+            raise ValueError(f"Cannot merge calibration bins of different sizes ({self.n_bins} vs {other.n_bins}).")
+        self.gaps += other.gaps
+        self.total += other.total
+        return self
+
+    def ece(self) -> float:
+        return np.abs(self.gaps).sum() / self.total if self.total else 0.0
+
+    def to_dict(self) -> dict:
+        return {"n_bins": self.n_bins, "gaps": self.gaps.tolist(), "total": int(self.total)}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CalibrationAccumulator":
+        acc = cls(state["n_bins"])
+        acc.gaps = np.array(state["gaps"], dtype=float)
+        acc.total = int(state["total"])
+        return acc
+
+
+class CorrelationAccumulator:
+    """Pearson correlation from running sums over complete (x, y) pairs."""
+
+    def __init__(self):
+        self.shift = None
+        self.sums = np.zeros(6)  # n, sx, sy, sxx, syy, sxy of shifted values
+
+    def update(self, x, y):
+        x = pd.to_numeric(pd.Series(x), errors="coerce").to_numpy(dtype=float)
+        y = pd.to_numeric(pd.Series(y), errors="coerce").to_numpy(dtype=float)
+        ok = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[ok], y[ok]
+        if len(x) == 0:
+            return
+        if self.shift is None:
+            # Shifting by the first chunk's means keeps the sums well conditioned.
+            self.shift = (x.mean(), y.mean())
+        x, y = x - self.shift[0], y - self.shift[1]
+        self.sums += [len(x), x.sum(), y.sum(), (x * x).sum(), (y * y).sum(), (x * y).sum()]
+
+    def _sums_at(self, shift) -> np.ndarray:
+        """Re-express the running sums relative to another shift."""
+        n, sx, sy, sxx, syy, sxy = self.sums
+        dx, dy = self.shift[0] - shift[0], self.shift[1] - shift[1]
+        return np.array([
+            n,
+            sx + n * dx,
+            sy + n * dy,
+            sxx + 2 * dx * sx + n * dx * dx,
+            syy + 2 * dy * sy + n * dy * dy,
+            sxy + dy * sx + dx * sy + n * dx * dy,
+        ])
+
+    def merge(self, other: "CorrelationAccumulator") -> "CorrelationAccumulator":
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift, self.sums = other.shift, other.sums.copy()
+        else:
+            self.sums = self.sums + other._sums_at(self.shift)
+        return self
+
+    def correlation(self) -> float:
+        n, sx, sy, sxx, syy, sxy = self.sums
+        if n < 2:
+            return np.nan
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        if var_x <= 0 or var_y <= 0:
+            return np.nan
+        return cov / np.sqrt(var_x * var_y)
+
+    def to_dict(self) -> dict:
+        shift = None if self.shift is None else [float(v) for v in self.shift]
+        return {"shift": shift, "sums": self.sums.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CorrelationAccumulator":
+        acc = cls()
+        acc.shift = None if state["shift"] is None else tuple(state["shift"])
+        acc.sums = np.array(state["sums"], dtype=float)
+        return acc
+
+
+class EvaluationAccumulator:
+    """
+    Everything `evaluate_political_llm` needs, as mergeable partial state:
+    confusion counts, calibration bins, correlation sums and the sample count.
+    """
+
+    def __init__(self, n_bins: int = 10):
+        self.confusion = ConfusionAccumulator()
+        self.calibration = CalibrationAccumulator(n_bins)
+        self.correlation = CorrelationAccumulator()
+        self.samples = 0
+
+    def update(self, df: pd.DataFrame):
+        if not {"predicted_vote", "true_vote"}.issubset(df.columns):
+            raise ValueError("Input file must contain columns: {'predicted_vote', 'true_vote'}")
+        self.confusion.update(df["true_vote"].astype(str), df["predicted_vote"].astype(str))
+        confidence = df["confidence"] if "confidence" in df.columns else np.full(len(df), 0.5)
+        self.calibration.update(df["predicted_vote"] == df["true_vote"], confidence)
+        if {"predicted_ideology", "true_ideology"}.issubset(df.columns):
+            self.correlation.update(df["predicted_ideology"], df["true_ideology"])
+        self.samples += len(df)
+
+    def merge(self, other: "EvaluationAccumulator") -> "EvaluationAccumulator":
+        self.confusion.merge(other.confusion)
+        self.calibration.merge(other.calibration)
+        self.correlation.merge(other.correlation)
+        self.samples += other.samples
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        row = _summary_row(self.confusion.metrics(), self.calibration.ece(),
+                           self.correlation.correlation(), self.samples)
+        return pd.DataFrame([row])
+
+    def to_dict(self) -> dict:
+        return {
+            "confusion": self.confusion.to_dict(),
+            "calibration": self.calibration.to_dict(),
+            "correlation": self.correlation.to_dict(),
+            "samples": int(self.samples),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "EvaluationAccumulator":
+        acc = cls(state["calibration"]["n_bins"])
+        acc.confusion = ConfusionAccumulator.from_dict(state["confusion"])
+        acc.calibration = CalibrationAccumulator.from_dict(state["calibration"])
+        acc.correlation = CorrelationAccumulator.from_dict(state["correlation"])
+        acc.samples = int(state["samples"])
+        return acc
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "EvaluationAccumulator":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def accumulate_file(path: str, chunksize: int = 100_000, n_bins: int = 10) -> EvaluationAccumulator:
+    """Fold a results file into an EvaluationAccumulator, one chunk at a time."""
+    acc = EvaluationAccumulator(n_bins)
+    columns = ["predicted_vote", "true_vote", "confidence", "predicted_ideology", "true_ideology"]
+    for chunk in iter_result_chunks(path, chunksize, columns):
+        acc.update(chunk.dropna(subset=["true_vote"]))
+    return acc
+
+
+def evaluate_stream(path: str, chunksize: int = 100_000, n_bins: int = 10):
+    """
+    Evaluate a results file chunk by chunk with constant memory.
+    Returns (summary DataFrame, confusion matrix DataFrame); the summary has the
+    same columns as `evaluate_political_llm`.
+    """
+    acc = accumulate_file(path, chunksize, n_bins)
+    return acc.summary(), acc.confusion.to_frame()
+
+
+# ------------------------------------------------------------
+# 4. Command-line Interface
 # ------------------------------------------------------------
 
 def main():
     parser = argparse.ArgumentParser(description="Evaluate Political-LLM predictions with standardized metrics.")
-    parser.add_argument("--data", type=str, required=True, help="Path to CSV file with model outputs.")
+    parser.add_argument("--data", type=str, default=None, help="Path to CSV file with model outputs.")
     parser.add_argument("--out", type=str, default="eval_summary.csv", help="Path to output CSV summary.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Evaluate in chunks of this many rows (supports .csv, .jsonl, .parquet).")
+    parser.add_argument("--save-state", type=str, default=None,
+                        help="Also write the mergeable partial metric state to this JSON file.")
+    parser.add_argument("--merge", type=str, nargs="+", default=None,
+                        help="Combine partial metric states (JSON) from shards instead of reading --data.")
+    parser.add_argument("--weight-col", type=str, default=None,
+                        help="Column of survey design weights (e.g. design_weight) for weighted estimates.")
     args = parser.parse_args()
+    if args.data is None and not args.merge:
+        parser.error("one of --data or --merge is required")
+    if args.weight_col and (args.merge or args.chunksize or args.save_state):
+        parser.error("--weight-col is only supported for in-memory evaluation")
+
+    if args.merge or args.chunksize or args.save_state:
+        if args.merge:
+            acc = EvaluationAccumulator.load(args.merge[0])
+            for path in args.merge[1:]:
+                acc.merge(EvaluationAccumulator.load(path))
+        else:
+            acc = accumulate_file(args.data, chunksize=args.chunksize or 100_000)
+        if args.save_state:
+            acc.save(args.save_state)
+        eval_df, cm = acc.summary(), acc.confusion.to_frame()
+        eval_df.to_csv(args.out, index=False)
+        print("\n=== Political-LLM Evaluation Summary ===")
+        print(eval_df.to_string(index=False))
+        print(f"\nSaved evaluation summary to: {args.out}")
+        print("\nConfusion Matrix:")
+        print(cm)
+        return
 
     df = pd.read_csv(args.data)
     required_cols = {"predicted_vote", "true_vote"}
     if not required_cols.issubset(df.columns):
         raise ValueError(f"Input file must contain columns: {required_cols}")
+    # Respondents without a ground-truth vote (e.g. ANES refusals) cannot be scored
+    df = df.dropna(subset=["true_vote"])
 
-    eval_df = evaluate_political_llm(df)
+    if args.weight_col and args.weight_col not in df.columns:
+        raise ValueError(f"Weight column '{args.weight_col}' not found in input file.")
+    eval_df = evaluate_political_llm(df, weight_col=args.weight_col)
     eval_df.to_csv(args.out, index=False)
 
     print("\n=== Political-LLM Evaluation Summary ===")
@@ -150,7 +587,11 @@ def main():
 
     # Optionally print confusion matrix for debugging
     labels = sorted(df["true_vote"].dropna().unique())
-    cm = compute_confusion_matrix_summary(df["true_vote"], df["predicted_vote"], labels=labels)
+    if args.weight_col:
+        t, p, labels = encode_labels(df["true_vote"], df["predicted_vote"], labels)
+        cm = pd.DataFrame(confusion_from_codes(t, p, len(labels), df[args.weight_col]), index=labels, columns=labels)
+    else:
+        cm = compute_confusion_matrix_summary(df["true_vote"], df["predicted_vote"], labels=labels)
     print("\nConfusion Matrix:")
     print(cm)
 
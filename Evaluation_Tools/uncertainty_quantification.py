@@ -4,14 +4,24 @@ uncertainty_quantification.py
 Quantifies uncertainty in Political-LLM simulation metrics using bootstrap resampling.
 Implements 95% confidence interval estimation for any aggregate metric function.
 
+Metrics that can be written as a function of per-row means (vote ratio,
+Pearson correlation) are also available through a vectorized NumPy engine that
+draws whole blocks of resamples at once and never materializes resampled
+DataFrames.
+
 Example:
     $ python uncertainty_quantification.py --data data/predictions.csv --metric vote_ratio
+    $ python uncertainty_quantification.py --data data/predictions.csv --metric vote_ratio --engine vectorized --n_boot 100000
+    $ python uncertainty_quantification.py --data data/predictions.csv --metric vote_ratio --engine vectorized --weight_col design_weight
 """
 
 import argparse
 import numpy as np
 import pandas as pd
-from typing import Callable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from statistics import NormalDist
+from typing import Callable, List, Tuple
 
 
 # 1. Metric definitions (you can customize these)
@@ -38,13 +48,192 @@ def compute_ideology_alignment(df: pd.DataFrame) -> float:
     return df['predicted_ideology'].corr(df['true_ideology'], method='pearson')
 
 
-# 2. Bootstrap resampling procedure
+# 2. Vectorized metric definitions
+# Each metric is split into a per-row "terms" matrix of shape (n, k) and a
+# function mapping the (weighted) column means of that matrix back to the metric.
+# A bootstrap replicate is then just a weight vector over rows.
+
+def _vote_ratio_terms(df: pd.DataFrame) -> np.ndarray:
+    if 'predicted_vote' not in df.columns:
+        raise ValueError("Column 'predicted_vote' not found in dataset.")
+    return (df['predicted_vote'] == 'A').to_numpy(dtype=float)[:, None]
+
+
+def _vote_ratio_from_means(means: np.ndarray) -> np.ndarray:
+    return means[..., 0]
+
+
+def _ideology_alignment_terms(df: pd.DataFrame) -> np.ndarray:
+    if not {'predicted_ideology', 'true_ideology'}.issubset(df.columns):
+        raise ValueError("Columns 'predicted_ideology' and 'true_ideology' must exist.")
+    x = pd.to_numeric(df['predicted_ideology'], errors='coerce').to_numpy(dtype=float)
+    y = pd.to_numeric(df['true_ideology'], errors='coerce').to_numpy(dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    # Centering keeps the one-pass moment formulas numerically stable;
+    # correlation is shift-invariant so the result is unchanged.
+    x = np.where(valid, x - x[valid].mean() if valid.any() else 0.0, 0.0)
+    y = np.where(valid, y - y[valid].mean() if valid.any() else 0.0, 0.0)
+    return np.column_stack([valid.astype(float), x, y, x * x, y * y, x * y])
+
+
+def _ideology_alignment_from_means(means: np.ndarray) -> np.ndarray:
+    count = means[..., 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mx = means[..., 1] / count
+        my = means[..., 2] / count
+        cov = means[..., 5] / count - mx * my
+        var_x = means[..., 3] / count - mx * mx
+        var_y = means[..., 4] / count - my * my
+        return cov / np.sqrt(var_x * var_y)
+
+
+VECTORIZED_METRICS = {
+    "vote_ratio": (_vote_ratio_terms, _vote_ratio_from_means),
+    "ideology_alignment": (_ideology_alignment_terms, _ideology_alignment_from_means),
+}
+
+# Upper bound on the number of (resample, row) weight cells held in memory at once.
+_CHUNK_CELLS = 1 << 22
+
+
+def _collapse_rows(terms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collapse identical term rows into (unique_rows, counts).
+    Vote labels and coded ideology scales have only a handful of distinct rows,
+    which lets resampling work on counts instead of individual respondents.
+    """
+    unique, counts = np.unique(terms, axis=0, return_counts=True)
+    return unique, counts
+
+
+def _resample_weights(rng: np.random.Generator, counts: np.ndarray, size: int, scheme: str) -> np.ndarray:
+    """
+    Draw a (size, len(counts)) matrix of bootstrap weights over collapsed rows.
+    'multinomial' reproduces an ordinary resample of all rows with replacement;
+    'poisson' gives every original row an independent Poisson(1) weight (the Poisson bootstrap).
+    """
+    n = int(counts.sum())
+    n_unique = len(counts)
+    if scheme == "multinomial":
+        if n_unique * 4 <= n:
+            return rng.multinomial(n, counts / n, size=size).astype(float)
+        # Mostly distinct rows: drawing indices and counting them is cheaper.
+        row_of = np.repeat(np.arange(n_unique), counts)
+        idx = row_of[rng.integers(0, n, size=(size, n))]
+        idx += (np.arange(size) * n_unique)[:, None]
+        return np.bincount(idx.ravel(), minlength=size * n_unique).reshape(size, n_unique).astype(float)
+    if scheme == "poisson":
+        # A sum of c independent Poisson(1) weights is Poisson(c).
+        return rng.poisson(counts, size=(size, n_unique)).astype(float)
+    raise ValueError(f"Unknown resampling scheme '{scheme}'. Use 'multinomial' or 'poisson'.")
+
+
+def _design_weighted(terms: np.ndarray, design_weights: np.ndarray, stat_fn: Callable) -> Tuple[np.ndarray, Callable]:
+    """
+    Fold survey design weights into a metric's terms.
+    Terms become [w, w * t] and the metric is evaluated at mean(w * t) / mean(w),
+    i.e. the weighted (Hajek) estimate; resampling then treats each sampled
+    respondent as a unit carrying its weight.
+    """
+    w = np.asarray(design_weights, dtype=float)
+    weighted_terms = np.column_stack([w, w[:, None] * terms])
+
+    def weighted_stat(means):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return stat_fn(means[..., 1:] / means[..., :1])
+    return weighted_terms, weighted_stat
+
+
+def _collapsed_terms(df: pd.DataFrame, metric: str, weight_col: str = None) -> Tuple[np.ndarray, np.ndarray, Callable]:
+    if metric not in VECTORIZED_METRICS:
+        raise ValueError(f"Metric '{metric}' has no vectorized form. "
+                         f"Available: {sorted(VECTORIZED_METRICS)}")
+    terms_fn, stat_fn = VECTORIZED_METRICS[metric]
+    terms = terms_fn(df)
+    if weight_col is not None:
+        if weight_col not in df.columns:
+            raise ValueError(f"Weight column '{weight_col}' not found in dataset.")
+        terms, stat_fn = _design_weighted(terms, df[weight_col].to_numpy(), stat_fn)
+    if len(terms) == 0:
+        return terms, np.zeros(0, dtype=int), stat_fn
+    terms, counts = _collapse_rows(terms)
+    return terms, counts, stat_fn
+
+
+def _iter_weight_chunks(counts: np.ndarray, n_bootstrap: int, random_state: int,
+                        scheme: str, chunk_size: int = None):
+    """Yield (start, weights) pairs covering n_bootstrap resamples."""
+    if chunk_size is None:
+        chunk_size = max(1, _CHUNK_CELLS // max(len(counts), 1))
+    rng = np.random.default_rng(random_state)
+    for start in range(0, n_bootstrap, chunk_size):
+        size = min(chunk_size, n_bootstrap - start)
+        yield start, _resample_weights(rng, counts, size, scheme)
+
+
+def _weighted_means(weights: np.ndarray, terms: np.ndarray) -> np.ndarray:
+    totals = weights.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (weights @ terms) / totals
+
+
+def bootstrap_replicates(
+    df: pd.DataFrame,
+    metric: str,
+    n_bootstrap: int = 10000,
+    random_state: int = 42,
+    scheme: str = "multinomial",
+    chunk_size: int = None,
+    weight_col: str = None
+) -> np.ndarray:
+    """
+    Return the bootstrap distribution of a vectorized metric as a 1-D array.
+
+    Duplicate rows are collapsed first, then resamples are drawn in chunks of
+    `chunk_size` (by default sized so that each weight matrix holds about four
+    million cells); each chunk is reduced with a single matrix product against
+    the metric's terms. With `weight_col` the metric is the design-weighted
+    estimate (see `_design_weighted`).
+    """
+    terms, counts, stat_fn = _collapsed_terms(df, metric, weight_col)
+    if len(terms) == 0:
+        return np.full(n_bootstrap, np.nan)
+
+    out = np.empty(n_bootstrap)
+    for start, weights in _iter_weight_chunks(counts, n_bootstrap, random_state, scheme, chunk_size):
+        out[start:start + len(weights)] = stat_fn(_weighted_means(weights, terms))
+    return out
+
+
+def bootstrap_confidence_interval_vectorized(
+    df: pd.DataFrame,
+    metric: str,
+    n_bootstrap: int = 10000,
+    ci: float = 0.95,
+    random_state: int = 42,
+    scheme: str = "multinomial",
+    chunk_size: int = None,
+    weight_col: str = None
+) -> Tuple[float, Tuple[float, float]]:
+    """
+    Vectorized counterpart of `bootstrap_confidence_interval` for the metrics
+    in VECTORIZED_METRICS. Returns the same (mean, (lower, upper)) tuple.
+    """
+    metrics = bootstrap_replicates(df, metric, n_bootstrap, random_state, scheme, chunk_size, weight_col)
+    mean_metric = np.nanmean(metrics)
+    lower = np.nanpercentile(metrics, (1 - ci) / 2 * 100)
+    upper = np.nanpercentile(metrics, (1 + ci) / 2 * 100)
+    return mean_metric, (lower, upper)
+
+
+# 3. Bootstrap resampling procedure
 def bootstrap_confidence_interval(
     df: pd.DataFrame,
     metric_fn: Callable[[pd.DataFrame], float],
     n_bootstrap: int = 100,
     ci: float = 0.95,
-    random_state: int = 42
+    random_state: int = 42,
+    n_jobs: int = None
 ) -> Tuple[float, Tuple[float, float]]:
     """
     Compute mean and confidence interval for a metric using bootstrap resampling.
@@ -55,19 +244,26 @@ def bootstrap_confidence_interval(
         n_bootstrap: Number of bootstrap samples.
         ci: Confidence level (default 0.95).
         random_state: Random seed for reproducibility.
+        n_jobs: None keeps the original sequential sampler. An integer switches to
+            block-seeded resampling spread over that many processes (metric_fn must
+            then be picklable, i.e. defined at module level); results are identical
+            for every n_jobs >= 1.
 
     Returns:
         mean_metric: Mean of bootstrap metric values.
         (lower, upper): Confidence interval bounds.
     """
-    rng = np.random.default_rng(random_state)
-    metrics = []
+    if n_jobs is not None:
+        metrics = parallel_bootstrap_replicates(df, metric_fn, n_bootstrap, random_state, n_jobs)
+    else:
+        rng = np.random.default_rng(random_state)
+        metrics = []
 
-    for i in range(n_bootstrap):
-        sample_idx = rng.choice(df.index, size=len(df), replace=True)
-        sample_df = df.loc[sample_idx]
-        metric_value = metric_fn(sample_df)
-        metrics.append(metric_value)
+        for i in range(n_bootstrap):
+            sample_idx = rng.choice(df.index, size=len(df), replace=True)
+            sample_df = df.loc[sample_idx]
+            metric_value = metric_fn(sample_df)
+            metrics.append(metric_value)
 
     metrics = np.array(metrics)
     mean_metric = np.nanmean(metrics)
@@ -77,7 +273,268 @@ def bootstrap_confidence_interval(
     return mean_metric, (lower, upper)
 
 
-# 3. CLI interface for convenience
+# Resamples per independently seeded block. Fixed (not derived from n_jobs) so that
+# the set of random streams, and therefore the result, is independent of worker count.
+_BLOCK_SIZE = 64
+
+_worker_frame = None
+_worker_segments = []
+
+
+def _share_frame(df: pd.DataFrame) -> Tuple[list, List[shared_memory.SharedMemory]]:
+    """
+    Copy each column of df into its own shared-memory segment.
+    Non-numeric columns are stored as integer codes; their (small) label arrays
+    travel with the spec and are pickled once per worker, not once per task.
+    """
+    specs, segments = [], []
+    for col in df.columns:
+        values = df[col].to_numpy()
+        labels = None
+        if values.dtype.kind not in "biufcmM":
+            codes, uniques = pd.factorize(df[col])
+            values, labels = codes, np.asarray(uniques, dtype=object)
+        values = np.ascontiguousarray(values)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        segments.append(shm)
+        specs.append((col, shm.name, values.shape, values.dtype.str, labels))
+    return specs, segments
+
+
+def _attach_frame(specs: list) -> Tuple[pd.DataFrame, List[shared_memory.SharedMemory]]:
+    """
+    Rebuild the DataFrame from shared segments, without copying numeric columns.
+    Segments of decoded (non-numeric) columns are closed right away; the returned
+    segments back the numeric columns and must stay open while the frame is used.
+    """
+    columns, segments = {}, []
+    for col, name, shape, dtype, labels in specs:
+        shm = shared_memory.SharedMemory(name=name)
+        values = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        if labels is not None:
+            decoded = labels.take(np.where(values < 0, 0, values)) if len(labels) else np.full(shape, None, dtype=object)
+            decoded[values < 0] = np.nan
+            del values
+            shm.close()
+            values = decoded
+        else:
+            segments.append(shm)
+        columns[col] = values
+    return pd.DataFrame(columns, copy=False), segments
+
+
+def _detach_worker():
+    """Drop the worker's frame (the views into shared memory), then close its segments."""
+    global _worker_frame, _worker_segments
+    _worker_frame = None
+    for shm in _worker_segments:
+        shm.close()
+    _worker_segments = []
+
+
+def _init_worker(specs: list):
+    global _worker_frame, _worker_segments
+    _worker_frame, _worker_segments = _attach_frame(specs)
+    # Runs when the worker process exits (the parent unlinks the segments)
+    util.Finalize(None, _detach_worker, exitpriority=10)
+
+
+def _bootstrap_block(metric_fn: Callable[[pd.DataFrame], float], seed: np.random.SeedSequence,
+                     size: int, df: pd.DataFrame = None) -> np.ndarray:
+    """Evaluate `size` resamples drawn from one block's own random stream."""
+    if df is None:
+        df = _worker_frame
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    out = np.empty(size)
+    for i in range(size):
+        out[i] = metric_fn(df.take(rng.integers(0, n, size=n)))
+    return out
+
+
+def parallel_bootstrap_replicates(
+    df: pd.DataFrame,
+    metric_fn: Callable[[pd.DataFrame], float],
+    n_bootstrap: int = 100,
+    random_state: int = 42,
+    n_jobs: int = 1
+) -> np.ndarray:
+    """
+    Bootstrap distribution of an arbitrary metric, computed across processes.
+
+    Resamples are grouped into fixed-size blocks, each driven by a child of
+    SeedSequence(random_state). The DataFrame is placed in shared memory once and
+    every worker maps it at start-up, so tasks only carry a seed and a block size.
+    """
+    block_sizes = [min(_BLOCK_SIZE, n_bootstrap - start) for start in range(0, n_bootstrap, _BLOCK_SIZE)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(block_sizes))
+
+    if n_jobs is None or n_jobs <= 1:
+        local = df.reset_index(drop=True)
+        blocks = [_bootstrap_block(metric_fn, seed, size, local) for seed, size in zip(seeds, block_sizes)]
+        return np.concatenate(blocks) if blocks else np.empty(0)
+
+    specs, segments = _share_frame(df)
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(specs,)) as pool:
+            blocks = list(pool.map(_bootstrap_block, [metric_fn] * len(seeds), seeds, block_sizes))
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+    return np.concatenate(blocks) if blocks else np.empty(0)
+
+
+# 4. Bias-corrected (BCa) and studentized intervals
+def jackknife_values(df: pd.DataFrame, metric, weight_col: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Leave-one-out values of a metric, returned as (values, counts).
+
+    For a vectorized metric (a name in VECTORIZED_METRICS) every leave-one-out
+    estimate follows from the full-sample term sums minus one row, so the whole
+    pass is O(n) array arithmetic; identical rows share one value and `counts`
+    records their multiplicity. A callable metric is re-evaluated n times.
+    """
+    if isinstance(metric, str):
+        terms, counts, stat_fn = _collapsed_terms(df, metric, weight_col)
+        n = counts.sum()
+        if n < 2:
+            return np.full(len(counts), np.nan), counts
+        loo_means = (terms.T @ counts - terms) / (n - 1)
+        return stat_fn(loo_means), counts
+    n = len(df)
+    positions = np.arange(n)
+    values = np.array([metric(df.iloc[positions != i]) for i in range(n)], dtype=float)
+    return values, np.ones(n, dtype=int)
+
+
+def _acceleration(jack_values: np.ndarray, counts: np.ndarray) -> float:
+    """Jackknife estimate of the BCa acceleration constant."""
+    ok = ~np.isnan(jack_values)
+    values, counts = jack_values[ok], counts[ok]
+    if counts.sum() == 0:
+        return 0.0
+    diffs = np.average(values, weights=counts) - values
+    denom = 6.0 * (np.sum(counts * diffs ** 2) ** 1.5)
+    return float(np.sum(counts * diffs ** 3) / denom) if denom > 0 else 0.0
+
+
+def _full_sample_estimate(df: pd.DataFrame, metric, weight_col: str = None) -> float:
+    if isinstance(metric, str):
+        terms, counts, stat_fn = _collapsed_terms(df, metric, weight_col)
+        return float(stat_fn(_weighted_means(counts.astype(float), terms))) if len(terms) else np.nan
+    return float(metric(df))
+
+
+def bootstrap_bca_interval(
+    df: pd.DataFrame,
+    metric,
+    n_bootstrap: int = 2000,
+    ci: float = 0.95,
+    random_state: int = 42,
+    scheme: str = "multinomial",
+    n_jobs: int = 1,
+    weight_col: str = None
+) -> Tuple[float, Tuple[float, float]]:
+    """
+    Bias-corrected and accelerated (BCa) bootstrap interval.
+
+    `metric` is either a name in VECTORIZED_METRICS (replicates from the vectorized
+    engine, acceleration from the O(n) jackknife) or a picklable callable (replicates
+    from `parallel_bootstrap_replicates`, acceleration from n re-evaluations).
+    Returns (mean_metric, (lower, upper)) like `bootstrap_confidence_interval`.
+    `weight_col` (vectorized metrics only) selects design-weighted estimates.
+    """
+    if isinstance(metric, str):
+        replicates = bootstrap_replicates(df, metric, n_bootstrap, random_state, scheme, weight_col=weight_col)
+    else:
+        if weight_col is not None:
+            raise ValueError("Design weights require a vectorized metric name.")
+        replicates = parallel_bootstrap_replicates(df, metric, n_bootstrap, random_state, n_jobs)
+    replicates = replicates[~np.isnan(replicates)]
+    if len(replicates) == 0:
+        return np.nan, (np.nan, np.nan)
+
+    theta_hat = _full_sample_estimate(df, metric, weight_col)
+    normal = NormalDist()
+    # Ties count half so that discrete metrics (e.g. vote ratio) are not biased by them.
+    below = (np.sum(replicates < theta_hat) + 0.5 * np.sum(replicates == theta_hat)) / len(replicates)
+    below = min(max(below, 1.0 / (2 * len(replicates))), 1 - 1.0 / (2 * len(replicates)))
+    z0 = normal.inv_cdf(below)
+    accel = _acceleration(*jackknife_values(df, metric, weight_col))
+
+    bounds = []
+    for alpha in ((1 - ci) / 2, (1 + ci) / 2):
+        z = z0 + normal.inv_cdf(alpha)
+        bounds.append(normal.cdf(z0 + z / (1 - accel * z)) * 100)
+    lower, upper = np.percentile(replicates, bounds)
+    return np.mean(replicates), (lower, upper)
+
+
+def _delta_method_se(weights: np.ndarray, terms: np.ndarray, stat_fn: Callable, eps: float = 1e-6) -> np.ndarray:
+    """
+    Delta-method standard error of stat_fn(weighted means), one per weight row.
+    Uses the weighted covariance of the terms and a central-difference gradient.
+    """
+    weights = np.atleast_2d(weights)
+    totals = weights.sum(axis=1)
+    k = terms.shape[1]
+    means = _weighted_means(weights, terms)
+    outer = (terms[:, :, None] * terms[:, None, :]).reshape(len(terms), k * k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        second = ((weights @ outer) / totals[:, None]).reshape(-1, k, k)
+    cov = second - means[:, :, None] * means[:, None, :]
+
+    grad = np.empty_like(means)
+    for j in range(k):
+        step = np.zeros(k)
+        step[j] = eps
+        grad[:, j] = (stat_fn(means + step) - stat_fn(means - step)) / (2 * eps)
+    var = np.einsum('bi,bij,bj->b', grad, cov, grad) / totals
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def bootstrap_studentized_interval(
+    df: pd.DataFrame,
+    metric: str,
+    n_bootstrap: int = 2000,
+    ci: float = 0.95,
+    random_state: int = 42,
+    scheme: str = "multinomial",
+    chunk_size: int = None,
+    weight_col: str = None
+) -> Tuple[float, Tuple[float, float]]:
+    """
+    Studentized (bootstrap-t) interval for a metric in VECTORIZED_METRICS.
+
+    Each replicate is standardized by its own delta-method standard error, which is
+    available in closed form from the weighted term moments, so no nested bootstrap
+    is needed. Returns (mean_metric, (lower, upper)).
+    """
+    terms, counts, stat_fn = _collapsed_terms(df, metric, weight_col)
+    if len(terms) == 0:
+        return np.nan, (np.nan, np.nan)
+    full_weights = counts.astype(float)
+    theta_hat = float(stat_fn(_weighted_means(full_weights, terms)))
+    se_hat = float(_delta_method_se(full_weights, terms, stat_fn)[0])
+
+    replicates = np.empty(n_bootstrap)
+    t_stats = np.empty(n_bootstrap)
+    for start, weights in _iter_weight_chunks(counts, n_bootstrap, random_state, scheme, chunk_size):
+        stop = start + len(weights)
+        replicates[start:stop] = stat_fn(_weighted_means(weights, terms))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t_stats[start:stop] = (replicates[start:stop] - theta_hat) / _delta_method_se(weights, terms, stat_fn)
+
+    t_stats = t_stats[np.isfinite(t_stats)]
+    if len(t_stats) == 0:
+        return np.nanmean(replicates), (np.nan, np.nan)
+    t_low, t_high = np.percentile(t_stats, [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100])
+    return np.nanmean(replicates), (theta_hat - t_high * se_hat, theta_hat - t_low * se_hat)
+
+
+# 5. CLI interface for convenience
 
 def main():
     parser = argparse.ArgumentParser(description="Bootstrap uncertainty quantification for Political-LLM metrics.")
@@ -87,8 +544,20 @@ def main():
     parser.add_argument("--n_boot", type=int, default=100, help="Number of bootstrap samples (default: 100).")
     parser.add_argument("--ci", type=float, default=0.95, help="Confidence level (default: 0.95).")
     parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+    parser.add_argument("--engine", type=str, choices=["vectorized", "loop"], default="loop",
+                        help="Bootstrap engine: the per-resample DataFrame loop (default) or NumPy block resampling.")
+    parser.add_argument("--scheme", type=str, choices=["multinomial", "poisson"], default="multinomial",
+                        help="Resampling weights for the vectorized engine (default: multinomial).")
+    parser.add_argument("--interval", type=str, choices=["percentile", "bca", "studentized"], default="percentile",
+                        help="Interval type (default: percentile). 'studentized' requires the vectorized engine.")
+    parser.add_argument("--n_jobs", type=int, default=None,
+                        help="Worker processes for the loop engine (default: sequential sampler).")
+    parser.add_argument("--weight_col", type=str, default=None,
+                        help="Column of survey design weights (e.g. design_weight); vectorized engine only.")
 
     args = parser.parse_args()
+    if args.weight_col and args.engine != "vectorized":
+        parser.error("--weight_col requires --engine vectorized")
     df = pd.read_csv(args.data)
 
     metric_map = {
@@ -96,10 +565,29 @@ def main():
         "ideology_alignment": compute_ideology_alignment
     }
 
-    metric_fn = metric_map[args.metric]
-    mean_val, (low, high) = bootstrap_confidence_interval(
-        df, metric_fn, n_bootstrap=args.n_boot, ci=args.ci, random_state=args.seed
-    )
+    if args.interval == "bca":
+        metric = args.metric if args.engine == "vectorized" else metric_map[args.metric]
+        mean_val, (low, high) = bootstrap_bca_interval(
+            df, metric, n_bootstrap=args.n_boot, ci=args.ci, random_state=args.seed,
+            scheme=args.scheme, n_jobs=args.n_jobs or 1, weight_col=args.weight_col
+        )
+    elif args.interval == "studentized":
+        if args.engine != "vectorized":
+            parser.error("--interval studentized requires --engine vectorized")
+        mean_val, (low, high) = bootstrap_studentized_interval(
+            df, args.metric, n_bootstrap=args.n_boot, ci=args.ci, random_state=args.seed, scheme=args.scheme,
+            weight_col=args.weight_col
+        )
+    elif args.engine == "vectorized":
+        mean_val, (low, high) = bootstrap_confidence_interval_vectorized(
+            df, args.metric, n_bootstrap=args.n_boot, ci=args.ci, random_state=args.seed, scheme=args.scheme,
+            weight_col=args.weight_col
+        )
+    else:
+        metric_fn = metric_map[args.metric]
+        mean_val, (low, high) = bootstrap_confidence_interval(
+            df, metric_fn, n_bootstrap=args.n_boot, ci=args.ci, random_state=args.seed, n_jobs=args.n_jobs
+        )
 
     print(f"Metric: {args.metric}")
     print(f"Mean: {mean_val:.4f}")
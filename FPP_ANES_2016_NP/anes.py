@@ -1,5 +1,6 @@
 # anes.py (第二组版本 - 不包含political ideology)
 import pandas as pd
+from survey_cache import load_survey
 
 # 定义 fips_state_map
 fips_state_map = {
@@ -29,12 +30,17 @@ fields_of_interest = {
     'V161010d': {"valmap": fips_state_map}
 }
 
-# 读取 CSV 文件
-data = pd.read_csv('full_results_2016_2.csv')
+# 读取 CSV 文件（经由共享的内存映射缓存，CSV变化时自动重建）
+# 只映射用到的列：受访者ID、真实投票与先验概率，以及上面的字段
+data = load_survey('full_results_2016_2.csv',
+                   columns=['V160001_orig', 'p_trump', 'p_clinton', 'V162062x'] + list(fields_of_interest))
 
 # 筛选感兴趣的列
 filtered_data = data[fields_of_interest.keys()]
 
+# 真实投票与先验概率，按行与 identities 对齐（用于评估）
+ground_truth = data[['V160001_orig', 'V162062x', 'p_trump', 'p_clinton']].reset_index(drop=True)
+
 # 转换函数
 def convert_row_to_description(row):
     description_parts = []
@@ -70,5 +76,26 @@ def convert_row_to_description(row):
     )
     return description
 
+# 向量化版本：整列映射后拼接字符串，结果与逐行的 convert_row_to_description 完全一致
+# frame 只需包含 fields_of_interest 各列（真实数据或 synthetic.py 生成的编码）
+def render_identities(frame):
+    parts = []
+    for col in fields_of_interest:
+        values = frame[col]
+        text = values.map(fields_of_interest[col]["valmap"])
+        # 没有映射的值（如年龄）使用整数值
+        text = text.where(text.notna(), values.fillna(0).astype('int64').astype(str))
+        text = text.where(values.notna(), "Unknown")
+        parts.append(text.astype(object).reset_index(drop=True))
+
+    descriptions = (
+        "You are " + parts[5] + ", " + parts[0] + " of age " + parts[4] + ", "
+        + "You " + parts[3] + ", "
+        + "and " + parts[1] + " "
+        + "You feel " + parts[6] + " about the American flag, and you live in " + parts[8] + ". "
+        + "The current year is 2016."
+    )
+    return descriptions.tolist()
+
 # 转换数据
-identities = filtered_data.apply(convert_row_to_description, axis=1).tolist()
\ No newline at end of file
+identities = render_identities(filtered_data)
\ No newline at end of file
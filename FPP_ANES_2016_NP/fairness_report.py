@@ -7,24 +7,100 @@ using the ANES 2016 dataset results.
 Expected input: fairness_results.csv with columns:
 ['predicted_vote', 'true_vote', 'gender', 'age', 'education_level']
 
+The report groups by gender, age_group (binned from age) and education_level.
+Tables without education_level, such as the keyed results table written by
+run.py (results_table.py), fall back to whichever of gender, age_group,
+education_level and race they contain; --groups overrides the choice.
+
+Rows with a missing true_vote (e.g. ANES respondents who refused to report a
+vote) are dropped before any metric is computed, so every accuracy, ECE and
+answer rate is relative to respondents with a known vote.
+
 Metrics:
 - Accuracy per subgroup
 - Expected Calibration Error (ECE)
 - Answer Rate Parity
 
+Optionally, bootstrap confidence intervals for every subgroup are computed from
+a single set of resamples shared by all attributes, and intersectional subgroups
+(e.g. race x state x party ID) are reported as a pruned data-cube rollup. Both
+need the whole table in memory; the streamed and sharded modes (--chunksize,
+--save-state, --merge) produce the per-attribute report only.
+
 Example:
     $ python fairness_report.py --data fairness_results.csv --out fairness_summary.csv
+    $ python fairness_report.py --data fairness_results.csv --bootstrap 1000 --strata gender
+    $ python fairness_report.py --data results.csv --intersect race state party_id --min-count 30
+    $ python fairness_report.py --data responses/results.csv --groups gender race state
+    $ python fairness_report.py --data simulated_votes.jsonl --chunksize 1000000
+    $ python fairness_report.py --data shard_03.csv --chunksize 1000000 --save-state shard_03.json
+    $ python fairness_report.py --merge shard_*.json --out fairness_summary.csv
 """
 
 import argparse
+import json
+import os
+import sys
 import pandas as pd
 import numpy as np
 from collections import defaultdict
+from itertools import combinations
+
+# Results files are read in chunks by the same reader as Evaluation_Tools/evaluation.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Evaluation_Tools"))
+from evaluation import iter_result_chunks
 
 # ------------------------------------------------------------
 # 1. Metric definitions
 # ------------------------------------------------------------
 
+def _encode_groups(df: pd.DataFrame, col: str):
+    """Integer-encode a grouping column (sorted like groupby); missing values get -1."""
+    column = df[col]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Reuse the existing codes, keeping only observed categories.
+        codes = column.cat.codes.to_numpy().astype(np.int64)
+        used = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories)) > 0
+        remap = np.cumsum(used) - 1
+        return np.where(codes >= 0, remap[np.maximum(codes, 0)], -1), column.cat.categories[used]
+    codes, labels = pd.factorize(column, sort=True)
+    return codes, labels
+
+
+def _row_statistics(df: pd.DataFrame, n_bins: int = 10):
+    """
+    Per-row arrays shared by every subgroup metric:
+    correct (0/1), answered (0/1), the row's confidence bin (-1 if outside (0, 1])
+    and its calibration gap (correct - confidence, zero outside the bins).
+    """
+    if "confidence" in df.columns:
+        confidence = df["confidence"].to_numpy(dtype=float)
+    else:
+        confidence = np.full(len(df), 0.5)
+    correct = (df["predicted_vote"] == df["true_vote"]).to_numpy(dtype=float)
+    answered = df["predicted_vote"].notnull().to_numpy(dtype=float)
+
+    bins = np.linspace(0, 1, n_bins + 1)
+    bin_idx = np.digitize(confidence, bins, right=True) - 1
+    in_range = (bin_idx >= 0) & (bin_idx < n_bins)
+    bin_idx = np.where(in_range, bin_idx, -1)
+    gap = np.where(in_range, correct - confidence, 0.0)
+    return correct, answered, bin_idx, gap
+
+
+def _fairness_from_counts(count, n_correct, n_answered, gaps, overall_rate):
+    """Accuracy and ECE per subgroup plus the attribute's answer-rate parity."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        accuracy = n_correct / count
+        ece = np.abs(gaps).sum(axis=-1) / count
+        rates = n_answered / count
+    present = count > 0
+    deviation = np.where(present, np.abs(rates - overall_rate[..., None]), 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        parity = deviation.sum(axis=-1) / present.sum(axis=-1)
+    return accuracy, ece, parity
+
+
 def compute_accuracy(df: pd.DataFrame) -> float:
     """Compute prediction accuracy."""
     if len(df) == 0:
@@ -35,24 +111,17 @@ def compute_accuracy(df: pd.DataFrame) -> float:
 def compute_ece(df: pd.DataFrame, n_bins: int = 10) -> float:
     """
     Compute Expected Calibration Error (ECE).
-    Requires model confidence scores; if not available, approximates by class frequency.
-    """
-    if "confidence" not in df.columns:
-        # Use a dummy uniform confidence approximation if missing
-        df["confidence"] = 0.5
-    df = df.copy()
-    df["correct"] = (df["predicted_vote"] == df["true_vote"]).astype(int)
+    Requires model confidence scores; if not available, a uniform confidence of 0.5 is assumed.
 
-    bins = np.linspace(0, 1, n_bins + 1)
-    ece = 0.0
-    for i in range(n_bins):
-        bin_mask = (df["confidence"] > bins[i]) & (df["confidence"] <= bins[i + 1])
-        bin_size = bin_mask.mean()
-        if bin_size > 0:
-            acc_bin = df.loc[bin_mask, "correct"].mean()
-            conf_bin = df.loc[bin_mask, "confidence"].mean()
-            ece += bin_size * abs(acc_bin - conf_bin)
-    return ece
+    Since each bin contributes (n_bin / n) * |acc_bin - conf_bin| = |sum(correct - confidence)| / n,
+    one np.bincount over the bin index replaces the per-bin masks.
+    """
+    if len(df) == 0:
+        return 0.0
+    _, _, bin_idx, gap = _row_statistics(df, n_bins)
+    in_range = bin_idx >= 0
+    gaps = np.bincount(bin_idx[in_range], weights=gap[in_range], minlength=n_bins)
+    return np.abs(gaps).sum() / len(df)
 
 
 def compute_answer_rate_parity(df: pd.DataFrame, group_col: str) -> float:
@@ -86,52 +155,495 @@ def categorize_age(age):
         return "Unknown"
 
 
+def categorize_age_series(age: pd.Series) -> pd.Series:
+    """Vectorized categorize_age: same bins, non-numeric values map to 'Unknown'."""
+    values = pd.to_numeric(age, errors="coerce").to_numpy(dtype=float)
+    labels = np.select(
+        [values < 18, (values >= 18) & (values <= 29), (values >= 30) & (values <= 49),
+         (values >= 50) & (values <= 64), values >= 65],
+        ["Under18", "18-29", "30-49", "50-64", "65+"],
+        default="Unknown"
+    )
+    return pd.Series(labels, index=age.index, dtype=object)
+
+
 # ------------------------------------------------------------
 # 2. Main Fairness Analysis
 # ------------------------------------------------------------
 
-def subgroup_fairness_report(df: pd.DataFrame, group_cols: list) -> pd.DataFrame:
+_REPORT_COLUMNS = ["Attribute", "Subgroup", "Count", "Accuracy", "ECE", "AnswerRateParity"]
+
+DEFAULT_GROUP_COLS = ["gender", "age_group", "education_level"]
+FALLBACK_GROUP_COLS = ["gender", "age_group", "education_level", "race"]
+
+
+def default_group_cols(columns) -> list:
+    """
+    The default grouping attributes for a table with these columns: the legacy
+    gender / age_group / education_level set when all are present, otherwise the
+    FALLBACK_GROUP_COLS found in the table (age_group counts as present with age).
+    """
+    available = set(columns) | ({"age_group"} if "age" in columns else set())
+    if set(DEFAULT_GROUP_COLS) <= available:
+        return list(DEFAULT_GROUP_COLS)
+    return [col for col in FALLBACK_GROUP_COLS if col in available]
+
+
+def _resolve_group_cols(columns, requested=None) -> list:
+    """--groups if given, else default_group_cols; fails if nothing is left to group by."""
+    group_cols = list(requested) if requested else default_group_cols(columns)
+    if not group_cols:
+        raise ValueError(f"Input file has none of the grouping columns {FALLBACK_GROUP_COLS}; pass --groups.")
+    if not requested and group_cols != DEFAULT_GROUP_COLS:
+        print(f"Note: no {', '.join(c for c in DEFAULT_GROUP_COLS if c not in group_cols)} column; "
+              f"grouping by {', '.join(group_cols)}.")
+    return group_cols
+
+
+def _attribute_counts(df: pd.DataFrame, group_cols: list, n_bins: int = 10) -> list:
+    """
+    Per-attribute subgroup statistics as a list of (labels, count, correct, answered, gaps).
+
+    All attributes are aggregated together: every row contributes one key per
+    attribute (group code offset by the attribute's position in a stacked key
+    space), and counts, correct answers, answer counts and calibration-bin gaps
+    for every subgroup come from a single np.bincount each.
+    """
+    correct, answered, bin_idx, gap = _row_statistics(df, n_bins)
+    n = len(df)
+
+    encoded = [_encode_groups(df, col) for col in group_cols]
+    sizes = np.array([len(labels) for _, labels in encoded], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    total = int(offsets[-1])
+
+    # Rows with a missing group value are routed to one spare key past the end.
+    codes = np.stack([c for c, _ in encoded]) if encoded else np.empty((0, n), dtype=np.int64)
+    keys = np.where(codes >= 0, codes + offsets[:-1, None], total).ravel()
+    cells = np.where((codes >= 0) & (bin_idx >= 0), keys.reshape(codes.shape) * n_bins + bin_idx,
+                     total * n_bins).ravel()
+    n_attr = len(group_cols)
+
+    count = np.bincount(keys, minlength=total + 1)[:total]
+    n_correct = np.bincount(keys, weights=np.tile(correct, n_attr), minlength=total + 1)[:total]
+    n_answered = np.bincount(keys, weights=np.tile(answered, n_attr), minlength=total + 1)[:total]
+    gaps = np.bincount(cells, weights=np.tile(gap, n_attr),
+                       minlength=total * n_bins + 1)[:total * n_bins].reshape(total, n_bins)
+
+    out = []
+    for a in range(n_attr):
+        part = slice(offsets[a], offsets[a + 1])
+        out.append((encoded[a][1], count[part], n_correct[part], n_answered[part], gaps[part]))
+    return out
+
+
+def _report_frame(group_cols: list, per_attribute: list, overall_rate: float) -> pd.DataFrame:
+    frames = []
+    for col, (labels, count, n_correct, n_answered, gaps) in zip(group_cols, per_attribute):
+        if len(labels) == 0:
+            continue
+        acc, ece, parity = _fairness_from_counts(count, n_correct, n_answered, gaps, np.array(overall_rate))
+        frames.append(pd.DataFrame({
+            "Attribute": col,
+            "Subgroup": labels,
+            "Count": np.asarray(count).astype(int),
+            "Accuracy": np.round(acc, 4),
+            "ECE": np.round(ece, 4),
+            "AnswerRateParity": np.round(np.full(len(acc), parity), 4)
+        }))
+    if not frames:
+        return pd.DataFrame(columns=_REPORT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def subgroup_fairness_report(df: pd.DataFrame, group_cols: list, n_bins: int = 10) -> pd.DataFrame:
     """
     Compute fairness metrics for each demographic attribute.
     Returns a summary DataFrame.
     """
+    answered = df["predicted_vote"].notnull()
+    overall_rate = answered.mean() if len(df) else np.nan
+    return _report_frame(group_cols, _attribute_counts(df, group_cols, n_bins), overall_rate)
+
+
+class SubgroupAccumulator:
+    """
+    Incremental per-subgroup counters (count, correct, answered, calibration-bin gaps).
+    Feed it chunks with `update`; `report` yields the same table as subgroup_fairness_report
+    on the concatenated data.
+    """
+
+    def __init__(self, group_cols: list, n_bins: int = 10):
+        self.group_cols = list(group_cols)
+        self.n_bins = n_bins
+        self.rows = 0
+        self.answered = 0
+        # attribute -> {subgroup: [count, correct, answered, gap_0, ..., gap_{n_bins-1}]}
+        self.stats = {col: {} for col in self.group_cols}
+
+    def update(self, df: pd.DataFrame):
+        self.rows += len(df)
+        self.answered += int(df["predicted_vote"].notnull().sum())
+        for col, (labels, count, n_correct, n_answered, gaps) in zip(
+                self.group_cols, _attribute_counts(df, self.group_cols, self.n_bins)):
+            table = self.stats[col]
+            rows = np.column_stack([count, n_correct, n_answered, gaps])
+            for label, row in zip(labels, rows):
+                if label in table:
+                    table[label] += row
+                else:
+                    table[label] = row.astype(float)
+
+    def merge(self, other: "SubgroupAccumulator") -> "SubgroupAccumulator":
+        """Add another shard's counters into this one (associative and commutative)."""
+        if other.group_cols != self.group_cols or other.n_bins != self.n_bins:
+            raise ValueError("Cannot merge accumulators with different attributes or bin counts.")
+        self.rows += other.rows
+        self.answered += other.answered
+        for col in self.group_cols:
+            table = self.stats[col]
+            for label, row in other.stats[col].items():
+                if label in table:
+                    table[label] = table[label] + row
+                else:
+                    table[label] = row.copy()
+        return self
+
+    def to_dict(self) -> dict:
+        def native(label):
+            return label.item() if isinstance(label, np.generic) else label
+        return {
+            "group_cols": self.group_cols,
+            "n_bins": self.n_bins,
+            "rows": int(self.rows),
+            "answered": int(self.answered),
+            # (label, counters) pairs keep integer labels intact through JSON
+            "stats": {col: [[native(label), row.tolist()] for label, row in table.items()]
+                      for col, table in self.stats.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "SubgroupAccumulator":
+        acc = cls(state["group_cols"], state["n_bins"])
+        acc.rows = state["rows"]
+        acc.answered = state["answered"]
+        for col, pairs in state["stats"].items():
+            acc.stats[col] = {label: np.array(row, dtype=float) for label, row in pairs}
+        return acc
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "SubgroupAccumulator":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def report(self) -> pd.DataFrame:
+        per_attribute = []
+        for col in self.group_cols:
+            table = self.stats[col]
+            try:
+                labels = sorted(table)
+            except TypeError:
+                labels = sorted(table, key=str)
+            rows = np.array([table[label] for label in labels]).reshape(len(labels), 3 + self.n_bins)
+            per_attribute.append((labels, rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3:]))
+        overall_rate = self.answered / self.rows if self.rows else np.nan
+        return _report_frame(self.group_cols, per_attribute, overall_rate)
+
+
+# ------------------------------------------------------------
+# 3. Subgroup bootstrap intervals
+# ------------------------------------------------------------
+
+def _subgroup_counts(idx: np.ndarray, codes: np.ndarray, n_groups: int, correct: np.ndarray,
+                     answered: np.ndarray, bin_idx: np.ndarray, gap: np.ndarray, n_bins: int):
+    """
+    Sufficient statistics per (resample, subgroup) from a (B, n) matrix of row indices.
+    Each statistic is one np.bincount over resample-offset group keys.
+    Returns count, correct, answered with shape (B, G) and calibration gaps (B, G, n_bins).
+    """
+    n_rep = idx.shape[0]
+    group = codes[idx]
+    keep = group >= 0
+    offsets = (np.arange(n_rep) * n_groups)[:, None]
+    keys = (group + offsets)[keep]
+    size = n_rep * n_groups
+    count = np.bincount(keys, minlength=size).reshape(n_rep, n_groups)
+    n_correct = np.bincount(keys, weights=correct[idx][keep], minlength=size).reshape(n_rep, n_groups)
+    n_answered = np.bincount(keys, weights=answered[idx][keep], minlength=size).reshape(n_rep, n_groups)
+
+    cell = bin_idx[idx]
+    keep &= cell >= 0
+    cell_keys = ((group * n_bins + cell) + offsets * n_bins)[keep]
+    gaps = np.bincount(cell_keys, weights=gap[idx][keep], minlength=size * n_bins)
+    return count, n_correct, n_answered, gaps.reshape(n_rep, n_groups, n_bins)
+
+
+def _bootstrap_indices(rng: np.random.Generator, n: int, size: int, strata_codes: np.ndarray = None) -> np.ndarray:
+    """Resample row indices, optionally within strata so stratum sizes stay fixed."""
+    if strata_codes is None:
+        return rng.integers(0, n, size=(size, n))
+    idx = np.empty((size, n), dtype=np.int64)
+    for stratum in np.unique(strata_codes):
+        positions = np.flatnonzero(strata_codes == stratum)
+        idx[:, positions] = positions[rng.integers(0, len(positions), size=(size, len(positions)))]
+    return idx
+
+
+def bootstrap_subgroup_fairness(
+    df: pd.DataFrame,
+    group_cols: list,
+    n_bootstrap: int = 1000,
+    ci: float = 0.95,
+    random_state: int = 42,
+    strata: str = None,
+    n_bins: int = 10,
+    chunk_size: int = None
+) -> pd.DataFrame:
+    """
+    Point estimates and bootstrap confidence intervals of Accuracy, ECE and
+    AnswerRateParity for every subgroup of every attribute.
+
+    Each chunk of resamples is drawn once (within `strata` if given) and reused for
+    all attributes; per-subgroup statistics come from bincount reductions over
+    group-index arrays, so the cost is close to a single bootstrap.
+    """
+    n = len(df)
+    correct, answered, bin_idx, gap = _row_statistics(df, n_bins)
+    encoded = {col: _encode_groups(df, col) for col in group_cols}
+    strata_codes = _encode_groups(df, strata)[0] if strata else None
+    if chunk_size is None:
+        chunk_size = max(1, (1 << 20) // max(n, 1))
+
+    def metrics_for(idx):
+        overall = answered[idx].mean(axis=1)
+        out = {}
+        for col, (codes, labels) in encoded.items():
+            counts = _subgroup_counts(idx, codes, len(labels), correct, answered, bin_idx, gap, n_bins)
+            out[col] = (counts[0],) + _fairness_from_counts(*counts, overall)
+        return out
+
+    point = metrics_for(np.arange(n)[None, :])
+    draws = {col: ([], [], []) for col in group_cols}
+    rng = np.random.default_rng(random_state)
+    for start in range(0, n_bootstrap, chunk_size):
+        idx = _bootstrap_indices(rng, n, min(chunk_size, n_bootstrap - start), strata_codes)
+        for col, (_, acc, ece, parity) in metrics_for(idx).items():
+            draws[col][0].append(acc)
+            draws[col][1].append(ece)
+            draws[col][2].append(parity)
+
+    q = [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100]
     results = []
-    for col in group_cols:
-        for subgroup, sub_df in df.groupby(col):
-            acc = compute_accuracy(sub_df)
-            ece = compute_ece(sub_df)
-            ans_parity = compute_answer_rate_parity(df, col)
+    for col, (codes, labels) in encoded.items():
+        count, acc, ece, parity = point[col]
+        acc_ci = np.nanpercentile(np.concatenate(draws[col][0]), q, axis=0)
+        ece_ci = np.nanpercentile(np.concatenate(draws[col][1]), q, axis=0)
+        parity_ci = np.nanpercentile(np.concatenate(draws[col][2]), q)
+        for g, subgroup in enumerate(labels):
             results.append({
                 "Attribute": col,
                 "Subgroup": subgroup,
-                "Count": len(sub_df),
-                "Accuracy": round(acc, 4),
-                "ECE": round(ece, 4),
-                "AnswerRateParity": round(ans_parity, 4)
+                "Count": int(count[0, g]),
+                "Accuracy": round(acc[0, g], 4),
+                "Accuracy_CI_low": round(acc_ci[0, g], 4),
+                "Accuracy_CI_high": round(acc_ci[1, g], 4),
+                "ECE": round(ece[0, g], 4),
+                "ECE_CI_low": round(ece_ci[0, g], 4),
+                "ECE_CI_high": round(ece_ci[1, g], 4),
+                "AnswerRateParity": round(parity[0], 4),
+                "AnswerRateParity_CI_low": round(parity_ci[0], 4),
+                "AnswerRateParity_CI_high": round(parity_ci[1], 4)
             })
     return pd.DataFrame(results)
 
 
 # ------------------------------------------------------------
-# 3. CLI interface
+# 4. Intersectional subgroups (data-cube rollup)
+# ------------------------------------------------------------
+
+def _cell_key(codes: np.ndarray, radices: np.ndarray) -> np.ndarray:
+    """Mixed-radix key per row of an (n, k) code matrix."""
+    strides = np.concatenate([np.cumprod(radices[::-1])[::-1][1:], [1]]).astype(np.int64)
+    return codes @ strides
+
+
+def intersectional_fairness_report(
+    df: pd.DataFrame,
+    attributes: list,
+    max_order: int = None,
+    min_count: int = 30,
+    n_bins: int = 10
+) -> pd.DataFrame:
+    """
+    Fairness metrics for every combination of `attributes` up to `max_order`
+    (default: all of them), e.g. race x state x party ID.
+
+    The data is scanned once to build per-cell sufficient statistics (count,
+    correct, answered, calibration-bin gaps) for the finest observed cells only.
+    Every coarser cuboid is a rollup of that sparse cell table, so the cost of
+    exploring many intersections scales with the number of observed cells, not
+    with the number of rows. Cells with fewer than `min_count` rows are pruned;
+    AnswerRateParity is computed over the retained cells of each cuboid.
+    """
+    correct, answered, bin_idx, gap = _row_statistics(df, n_bins)
+    encoded = [_encode_groups(df, col) for col in attributes]
+    # Missing values get their own code so rows still count toward cuboids that omit that attribute.
+    radices = np.array([len(labels) + 1 for _, labels in encoded], dtype=np.int64)
+    codes = np.column_stack([np.where(c >= 0, c, len(labels)) for c, labels in encoded])
+    if np.prod(radices.astype(float)) < 2 ** 62:
+        _, first, inverse = np.unique(_cell_key(codes, radices), return_index=True, return_inverse=True)
+        cell_codes = codes[first]
+    else:
+        cell_codes, inverse = np.unique(codes, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    n_cells = len(cell_codes)
+
+    cell_count = np.bincount(inverse, minlength=n_cells)
+    cell_correct = np.bincount(inverse, weights=correct, minlength=n_cells)
+    cell_answered = np.bincount(inverse, weights=answered, minlength=n_cells)
+    binned = bin_idx >= 0
+    cell_gaps = np.bincount(inverse[binned] * n_bins + bin_idx[binned], weights=gap[binned],
+                            minlength=n_cells * n_bins).reshape(n_cells, n_bins)
+    overall_rate = np.array(answered.mean() if len(df) else np.nan)
+
+    max_order = len(attributes) if max_order is None else min(max_order, len(attributes))
+    frames = []
+    for order in range(1, max_order + 1):
+        for subset in combinations(range(len(attributes)), order):
+            subset = list(subset)
+            sub_codes = cell_codes[:, subset]
+            observed = (sub_codes < (radices[subset] - 1)).all(axis=1)
+            if not observed.any():
+                continue
+            keys, first, group = np.unique(_cell_key(sub_codes[observed], radices[subset]),
+                                           return_index=True, return_inverse=True)
+            group = group.ravel()
+            count = np.bincount(group, weights=cell_count[observed], minlength=len(keys))
+            keep = count >= min_count
+            if not keep.any():
+                continue
+            n_correct = np.bincount(group, weights=cell_correct[observed], minlength=len(keys))
+            n_answered = np.bincount(group, weights=cell_answered[observed], minlength=len(keys))
+            gaps = np.stack([np.bincount(group, weights=cell_gaps[observed, b], minlength=len(keys))
+                             for b in range(n_bins)], axis=1)
+            acc, ece, parity = _fairness_from_counts(count[keep], n_correct[keep], n_answered[keep],
+                                                     gaps[keep], overall_rate)
+
+            labels = sub_codes[observed][first][keep]
+            subgroup = [" & ".join(str(encoded[a][1][c]) for a, c in zip(subset, row)) for row in labels]
+            frames.append(pd.DataFrame({
+                "Attributes": " x ".join(attributes[a] for a in subset),
+                "Order": order,
+                "Subgroup": subgroup,
+                "Count": count[keep].astype(int),
+                "Accuracy": np.round(acc, 4),
+                "ECE": np.round(ece, 4),
+                "AnswerRateParity": round(float(parity), 4)
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["Attributes", "Order", "Subgroup", "Count", "Accuracy", "ECE", "AnswerRateParity"])
+    return pd.concat(frames, ignore_index=True)
+
+
+# ------------------------------------------------------------
+# 5. CLI interface
 # ------------------------------------------------------------
 
 def main():
     parser = argparse.ArgumentParser(description="Generate subgroup-level fairness report for Political-LLM.")
-    parser.add_argument("--data", type=str, default="fairness_results.csv", help="Path to input CSV file.")
+    parser.add_argument("--data", type=str, default="fairness_results.csv",
+                        help="Path to input CSV file. Rows without a true_vote are dropped before scoring.")
     parser.add_argument("--out", type=str, default="fairness_summary.csv", help="Path to output CSV file.")
+    parser.add_argument("--bootstrap", type=int, default=0,
+                        help="Number of bootstrap resamples for subgroup confidence intervals (default: 0, off).")
+    parser.add_argument("--strata", type=str, default=None, help="Column to stratify bootstrap resampling by.")
+    parser.add_argument("--groups", type=str, nargs="+", default=None,
+                        help="Attributes to report (default: gender age_group education_level, "
+                             "or those of gender/age_group/education_level/race present in the input).")
+    parser.add_argument("--ci", type=float, default=0.95, help="Confidence level (default: 0.95).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+    parser.add_argument("--intersect", type=str, nargs="+", default=None,
+                        help="Report intersectional subgroups over these columns instead.")
+    parser.add_argument("--max-order", type=int, default=None,
+                        help="Largest number of attributes combined in --intersect mode (default: all).")
+    parser.add_argument("--min-count", type=int, default=30,
+                        help="Minimum subgroup size reported in --intersect mode (default: 30).")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the input in chunks of this many rows (.csv, .jsonl, .parquet); "
+                             "per-attribute report only (no --intersect or --bootstrap).")
+    parser.add_argument("--save-state", type=str, default=None,
+                        help="Also write the mergeable subgroup counters to this JSON file.")
+    parser.add_argument("--merge", type=str, nargs="+", default=None,
+                        help="Combine subgroup counters (JSON) from shards instead of reading --data.")
     args = parser.parse_args()
 
+    if args.merge or args.chunksize or args.save_state:
+        # Streamed counters only hold per-attribute totals: no resampling or cell crossing
+        unsupported = [flag for flag, value in [("--intersect", args.intersect), ("--bootstrap", args.bootstrap),
+                                                ("--strata", args.strata), ("--max-order", args.max_order)] if value]
+        if args.merge and args.groups:
+            unsupported.append("--groups")
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --chunksize/--save-state/--merge")
+        if args.merge:
+            accumulator = SubgroupAccumulator.load(args.merge[0])
+            for path in args.merge[1:]:
+                accumulator.merge(SubgroupAccumulator.load(path))
+        else:
+            accumulator = None
+            for chunk in iter_result_chunks(args.data, args.chunksize or 100_000):
+                if "age" in chunk.columns:
+                    chunk["age_group"] = categorize_age_series(chunk["age"])
+                if accumulator is None:
+                    group_cols = _resolve_group_cols(chunk.columns, args.groups)
+                    required_cols = {"predicted_vote", "true_vote"} | set(group_cols)
+                    accumulator = SubgroupAccumulator(group_cols)
+                if not required_cols.issubset(chunk.columns):
+                    raise ValueError(f"Input file must contain columns: {required_cols}")
+                # Rows without a known vote cannot be scored
+                chunk = chunk.dropna(subset=["true_vote"])
+                accumulator.update(chunk)
+            if accumulator is None:
+                raise ValueError(f"Input file is empty: {args.data}")
+        if args.save_state:
+            accumulator.save(args.save_state)
+        fairness_df = accumulator.report()
+        fairness_df.to_csv(args.out, index=False)
+        print("\n=== Fairness Summary ===")
+        print(fairness_df.to_string(index=False))
+        print(f"\nSaved fairness summary to: {args.out}")
+        return
+
     # Load data
     df = pd.read_csv(args.data)
-    required_cols = {"predicted_vote", "true_vote", "gender", "age", "education_level"}
+    if "true_vote" in df.columns:
+        # 没有真实投票的受访者（如ANES拒答）无法评估
+        df = df.dropna(subset=["true_vote"])
+    if "age" in df.columns:
+        df["age_group"] = categorize_age_series(df["age"])
+    if args.intersect:
+        required_cols = {"predicted_vote", "true_vote"} | set(args.intersect)
+    else:
+        group_cols = _resolve_group_cols(df.columns, args.groups)
+        required_cols = {"predicted_vote", "true_vote"} | set(group_cols)
     if not required_cols.issubset(df.columns):
         raise ValueError(f"Input CSV must contain columns: {required_cols}")
 
-    df["age_group"] = df["age"].apply(categorize_age)
     #Generation Fairness Report
-    group_cols = ["gender", "age_group", "education_level"]
-    fairness_df = subgroup_fairness_report(df, group_cols)
+    if args.intersect:
+        fairness_df = intersectional_fairness_report(
+            df, args.intersect, max_order=args.max_order, min_count=args.min_count
+        )
+    elif args.bootstrap > 0:
+        fairness_df = bootstrap_subgroup_fairness(
+            df, group_cols, n_bootstrap=args.bootstrap, ci=args.ci, random_state=args.seed, strata=args.strata
+        )
+    else:
+        fairness_df = subgroup_fairness_report(df, group_cols)
 
     # Save and print
     fairness_df.to_csv(args.out, index=False)
@@ -0,0 +1,110 @@
+# results_table.py (预测结果与ANES真实值的关联表)
+"""
+Keyed results table for an ANES run.
+
+Each prediction is recorded against the respondent id (V160001_orig) of the
+identity it came from and joined with the ANES ground truth and demographic
+codes, so the output CSV can be passed straight to
+Evaluation_Tools/evaluation.py and fairness_report.py:
+
+    $ python run.py --model <model_id>                  # writes responses/results.csv
+    $ python ../Evaluation_Tools/evaluation.py --data responses/results.csv
+    $ python fairness_report.py --data responses/results.csv
+    $ python fairness_report.py --data responses/results.csv --intersect gender age_group race
+
+ANES 2016 has no education variable in this extract, so fairness_report.py
+groups this table by gender / age_group / race instead of the legacy
+gender / age_group / education_level set.
+"""
+
+import os
+
+import pandas as pd
+
+from anes import fields_of_interest, fips_state_map
+
+VOTE_LABELS = {1: "Republican", -1: "Democratic", 0: "No Preference"}
+
+# V162062x: 1=Clinton, 2=Trump, 3-5=其他候选人, -2=未投票/不适用 → No Preference;
+# -8/-9（不知道/拒答）没有真实投票，留空
+TRUE_VOTE_LABELS = {1: "Democratic", 2: "Republican", 3: "No Preference", 4: "No Preference",
+                    5: "No Preference", -2: "No Preference"}
+
+GROUND_TRUTH_COLUMNS = ["V162062x", "p_trump", "p_clinton"]
+DEMOGRAPHIC_COLUMNS = ["V161310x", "V161342", "V161267", "V161158x", "V161126", "V161244",
+                       "V162174", "V162256", "V162125x", "V161010d"]
+
+
+def _decoded_demographics(respondents):
+    """Readable group columns (gender, age, race, state) for fairness_report.py."""
+    age = respondents["V161267"].astype(float)
+    return pd.DataFrame({
+        "gender": respondents["V161342"].map(fields_of_interest["V161342"]["valmap"]),
+        "age": age.where(age >= 0),
+        "race": respondents["V161310x"].map(fields_of_interest["V161310x"]["valmap"]),
+        "state": respondents["V161010d"].map(fips_state_map),
+    }, index=respondents.index)
+
+
+class ResultsTable:
+    """
+    Predictions keyed by respondent id.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The ANES frame the identities were built from (anes.data); row i must
+        correspond to identities[i].
+    model_id : str
+        Recorded in every output row so tables from several models can be
+        concatenated.
+    design : pandas.DataFrame, optional
+        Output of sampling.stratified_sample (indexed by row position); its
+        `design_weight` and `stratum` columns are carried into the table for
+        weighted evaluation.
+    """
+
+    def __init__(self, data, model_id, design=None):
+        columns = [c for c in GROUND_TRUTH_COLUMNS + DEMOGRAPHIC_COLUMNS if c in data.columns]
+        # 以受访者ID为索引，join时按ID查找而不是匹配identity文本
+        self.respondents = data.set_index("V160001_orig")[columns]
+        if not self.respondents.index.is_unique:
+            raise ValueError("V160001_orig must be unique to key the results table.")
+        self.row_ids = data["V160001_orig"].to_numpy()
+        self.model_id = model_id
+        self.predictions = {}
+        self.design = None
+        if design is not None:
+            self.design = design[["design_weight", "stratum"]].set_index(
+                pd.Index(self.row_ids[design.index.to_numpy()], name="V160001_orig"))
+
+    def record(self, index, score):
+        """Record the vote for identity `index` (0-based row in anes.data)."""
+        self.predictions[self.row_ids[index].item()] = VOTE_LABELS[score]
+
+    def to_frame(self):
+        """Processed respondents joined with ground truth and demographics, in run order."""
+        ids = pd.Index(list(self.predictions), name="V160001_orig")
+        respondents = self.respondents.loc[ids]
+        table = pd.DataFrame({
+            "model": self.model_id,
+            "predicted_vote": pd.Series(self.predictions).reindex(ids).to_numpy(),
+            "true_vote": respondents["V162062x"].map(TRUE_VOTE_LABELS).to_numpy(),
+        }, index=ids)
+        if self.design is not None:
+            table = table.join(self.design)
+        table = table.join(_decoded_demographics(respondents)).join(respondents)
+        return table.reset_index()
+
+    def write(self, path="responses/results.csv"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        table = self.to_frame()
+        table.to_csv(path, index=False)
+        return table
+
+
+def load_results(path="responses/results.csv"):
+    """Read a results table back, indexed by respondent id."""
+    return pd.read_csv(path, index_col="V160001_orig")
@@ -0,0 +1,223 @@
+# survey_cache.py (ANES问卷数据的二进制缓存)
+"""
+Memory-mapped column cache for full_results_2016_2.csv.
+
+Every FPP_ANES folder ships its own copy of the survey CSV and anes.py used
+to re-parse it with pd.read_csv at every import. `load_survey` instead keeps
+one .npy file per column under a shared cache directory (../.cache/anes),
+keyed by the SHA-256 of the CSV contents:
+
+    .cache/anes/<sha256>/meta.json           # column order and dtypes
+    .cache/anes/<sha256>/<column>.npy        # one memory-mappable array per column
+    .cache/anes/<sha256>/<column>.mask.npy   # missing values of a nullable integer column
+    .cache/anes/index.json                   # path -> (size, mtime_ns, sha256)
+
+Identical copies of the CSV (base / NP / gen) share one cache entry. The CSV
+is only hashed again when its size or mtime changes, and the cache is only
+rebuilt when the hash changes, or when a column file is missing or truncated
+(e.g. after an interrupted build). A rebuild removes the entries no CSV in
+index.json points to any more, so edited surveys do not pile up.
+
+Survey codes (integer columns, and float columns whose values are all whole
+numbers) are stored as the smallest nullable integer type that holds them
+(Int8 / Int16 / Int32 / Int64), so a coded column costs one or two bytes per
+respondent and missing codes stay missing instead of turning the column into
+floats. Other columns keep the dtype pd.read_csv infers. Numeric and boolean
+columns are memory-mapped. Object arrays cannot be (np.load would need
+pickle), so string columns are stored as integer codes into their distinct
+values (kept in meta.json) and decoded on load; those columns are ordinary
+in-memory arrays.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "anes")
+# 缓存格式变化时递增：旧格式的条目会被重建
+CACHE_FORMAT = 2
+INTEGER_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, obj):
+    # 先写临时文件再替换，避免多个进程同时读写时读到半个文件
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def csv_checksum(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    SHA-256 of `csv_path`, re-hashed only when its size or mtime changed since
+    the last call (recorded in index.json).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, "index.json")
+    index = _read_json(index_path, {})
+    key = os.path.realpath(csv_path)
+    stat = os.stat(csv_path)
+    entry = index.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+    sha = _file_sha256(csv_path)
+    index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+    _write_json(index_path, index)
+    return sha
+
+
+def _save_array(path, values):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+def _smallest_integer(low, high):
+    """Smallest NumPy integer type holding [low, high], or None."""
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def typed_columns(data):
+    """
+    Convert survey codes to nullable integers: integer columns, and float
+    columns whose non-missing values are all whole numbers, become the
+    smallest of Int8 / Int16 / Int32 / Int64 that holds them.
+    """
+    for col in data.columns:
+        values = data[col].to_numpy()
+        if values.dtype.kind not in "if":
+            continue
+        present = values[~np.isnan(values)] if values.dtype.kind == "f" else values
+        if len(present) == 0 or (values.dtype.kind == "f" and not np.all(np.mod(present, 1) == 0)):
+            continue
+        dtype = _smallest_integer(present.min(), present.max())
+        if dtype is not None:
+            data[col] = data[col].astype(pd.api.types.pandas_dtype(dtype.__name__.capitalize()))
+    return data
+
+
+def build_cache(csv_path, entry_dir):
+    """Parse the CSV once and write one .npy file per column plus meta.json."""
+    data = typed_columns(pd.read_csv(csv_path))
+    os.makedirs(entry_dir, exist_ok=True)
+    categories = {}
+    masked = []
+    for col in data.columns:
+        series = data[col]
+        if pd.api.types.is_extension_array_dtype(series.dtype) and pd.api.types.is_integer_dtype(series.dtype):
+            # 可空整数列：数值与缺失值掩码分开保存，两者都可以 memory-map
+            values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+            if series.isna().any():
+                _save_array(os.path.join(entry_dir, f"{col}.mask.npy"), series.isna().to_numpy())
+                masked.append(col)
+        else:
+            values = series.to_numpy()
+        if values.dtype == object:
+            # 字符串列不能 memory-map：保存为整数编码，取值表写入 meta.json（缺失值编码为 -1）
+            codes, uniques = pd.factorize(series)
+            values = codes.astype(_smallest_integer(-1, len(uniques)))
+            categories[col] = uniques.tolist()
+        _save_array(os.path.join(entry_dir, f"{col}.npy"), values)
+    # meta.json 最后写入：它存在即表示缓存完整
+    _write_json(os.path.join(entry_dir, "meta.json"), {
+        "format": CACHE_FORMAT,
+        "source": os.path.basename(csv_path),
+        "rows": len(data),
+        "columns": list(data.columns),
+        "dtypes": {col: str(dtype) for col, dtype in data.dtypes.items()},
+        "categories": categories,
+        "masked": masked,
+    })
+    return data
+
+
+def _load_entry(entry_dir, meta, columns):
+    """Map the cached column files; raises OSError/ValueError/EOFError if one is missing or corrupt."""
+    categories = meta.get("categories", {})
+    masked = set(meta.get("masked", []))
+    arrays = {}
+    for col in columns:
+        values = np.load(os.path.join(entry_dir, f"{col}.npy"), mmap_mode="r")
+        if len(values) != meta["rows"]:
+            raise ValueError(f"{col}.npy has {len(values)} rows, expected {meta['rows']}")
+        if col in categories:
+            values = pd.Series(pd.Categorical.from_codes(values, pd.Index(categories[col], dtype=object)))
+            values = values.astype(meta["dtypes"][col]).array
+        elif meta["dtypes"][col].startswith("Int"):
+            if col in masked:
+                mask = np.load(os.path.join(entry_dir, f"{col}.mask.npy"), mmap_mode="r")
+                if len(mask) != meta["rows"]:
+                    raise ValueError(f"{col}.mask.npy has {len(mask)} rows, expected {meta['rows']}")
+            else:
+                mask = np.zeros(len(values), dtype=bool)
+            values = pd.arrays.IntegerArray(values, mask)
+        arrays[col] = values
+    return pd.DataFrame(arrays, columns=columns, copy=False)
+
+
+def evict_stale_entries(cache_dir):
+    """
+    Remove cache entries that no CSV recorded in index.json points to (older
+    versions of a changed survey); index entries of deleted CSVs are dropped.
+    """
+    index_path = os.path.join(cache_dir, "index.json")
+    index = _read_json(index_path, {})
+    current = {path: entry for path, entry in index.items() if os.path.exists(path)}
+    if len(current) != len(index):
+        _write_json(index_path, current)
+    live = {entry["sha256"] for entry in current.values()}
+    for name in os.listdir(cache_dir):
+        if re.fullmatch("[0-9a-f]{64}", name) and name not in live:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def load_survey(csv_path, columns=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Load the survey as a DataFrame backed by memory-mapped column arrays,
+    building the cache first if the CSV is new or has changed.
+
+    `columns` projects the load to a subset of columns (only those files are
+    mapped). A missing or unreadable column file triggers a rebuild; falls back
+    to pd.read_csv (with the same column types) if the cache directory is not
+    writable.
+    """
+    try:
+        entry_dir = os.path.join(cache_dir, csv_checksum(csv_path, cache_dir))
+        meta = _read_json(os.path.join(entry_dir, "meta.json"), None)
+        if meta is not None and meta.get("format") == CACHE_FORMAT:
+            try:
+                return _load_entry(entry_dir, meta, meta["columns"] if columns is None else list(columns))
+            except (OSError, ValueError, EOFError):
+                # 列文件缺失、为空或被截断（例如构建过程中断）：重新构建
+                pass
+        data = build_cache(csv_path, entry_dir)
+        evict_stale_entries(cache_dir)
+    except OSError:
+        data = typed_columns(pd.read_csv(csv_path))
+    return data[list(columns)] if columns is not None else data
@@ -0,0 +1,234 @@
+# live_metrics.py (运行过程中的实时指标)
+"""
+Incremental evaluation of an ANES run while it is still in progress.
+
+Every vote returned by PoliticalBias.get_response is folded into a set of
+running counters, so accuracy against the ANES ground truth (V162062x,
+labelled as in results_table.TRUE_VOTE_LABELS), vote shares and calibration
+against p_trump are available after every identity instead of only after the
+full run. Confidence bounds use the Wilson score interval, which needs nothing
+but the running counts (no bootstrap).
+
+The latest snapshot can be written to a JSON file every N votes and/or served
+on a local HTTP endpoint:
+
+    $ python run.py --model <model_id> --live-summary responses/live.json --live-port 8765
+    $ curl http://127.0.0.1:8765/metrics
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import NormalDist
+
+from results_table import TRUE_VOTE_LABELS, VOTE_LABELS
+
+
+# =============================================================
+# 1. Confidence bounds
+# =============================================================
+def wilson_interval(successes, n, alpha=0.05):
+    """
+    Wilson score interval for a binomial proportion.
+
+    Returns (low, high); (0.0, 1.0) when n == 0.
+    """
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+# =============================================================
+# 2. Running metrics
+# =============================================================
+class LiveMetrics:
+    """
+    Running counters for one model run.
+
+    Parameters
+    ----------
+    ground_truth : pandas.DataFrame
+        Rows aligned with `identities` (see anes.ground_truth); must contain
+        V162062x and p_trump. V162062x codes are labelled with TRUE_VOTE_LABELS,
+        the mapping of the results table; respondents without a label
+        (-8/-9) are skipped for accuracy.
+    alpha : float
+        Miscoverage level of the reported bounds.
+    total : int, optional
+        Number of identities the run plans to process: the subsample size with
+        --sample, the population (the most an --adaptive run can draw before it
+        stops) otherwise. Defaults to every row of `ground_truth`; only used for
+        progress and the ETA.
+    """
+
+    def __init__(self, ground_truth, alpha=0.05, total=None):
+        self.true_labels = [TRUE_VOTE_LABELS.get(code) for code in ground_truth["V162062x"].tolist()]
+        self.p_trump = ground_truth["p_trump"].astype(float).tolist()
+        self.total = len(self.true_labels) if total is None else total
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+        self.processed = 0
+        self.errors = 0
+        self.votes = {label: 0 for label in VOTE_LABELS.values()}
+        # accuracy：只统计有真实投票标签的受访者（与results.csv的true_vote一致）
+        self.labelled = 0
+        self.correct = 0
+        # calibration：模型是否投 Republican 与 p_trump 的比较
+        self.p_trump_sum = 0.0
+        self.brier_sum = 0.0
+
+    def update(self, index, score):
+        """Fold the vote of identity `index` (0-based row) into the counters."""
+        with self.lock:
+            self.processed += 1
+            self.votes[VOTE_LABELS[score]] += 1
+
+            truth = self.true_labels[index]
+            if truth is not None:
+                self.labelled += 1
+                self.correct += int(VOTE_LABELS[score] == truth)
+
+            p = self.p_trump[index]
+            said_trump = 1.0 if score == 1 else 0.0
+            self.p_trump_sum += p
+            self.brier_sum += (said_trump - p) ** 2
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def _share(self, count, n):
+        low, high = wilson_interval(count, n, self.alpha)
+        return {"value": count / n if n else None, "low": low, "high": high}
+
+    def snapshot(self):
+        """Current metrics as a JSON-serializable dict."""
+        with self.lock:
+            n = self.processed
+            elapsed = time.time() - self.started
+            rate = n / elapsed if elapsed > 0 else 0.0
+            remaining = self.total - n - self.errors
+            republican_share = self.votes["Republican"] / n if n else None
+            mean_p_trump = self.p_trump_sum / n if n else None
+            return {
+                "processed": n,
+                "errors": self.errors,
+                "total": self.total,
+                "elapsed_seconds": round(elapsed, 1),
+                "eta_seconds": round(remaining / rate, 1) if rate > 0 else None,
+                "confidence": 1 - self.alpha,
+                "votes": dict(self.votes),
+                "vote_shares": {label: self._share(count, n) for label, count in self.votes.items()},
+                "accuracy": dict(self._share(self.correct, self.labelled), n=self.labelled),
+                "calibration": {
+                    "republican_share": republican_share,
+                    "mean_p_trump": mean_p_trump,
+                    "gap": republican_share - mean_p_trump if n else None,
+                    "brier": self.brier_sum / n if n else None,
+                },
+            }
+
+    def summary_line(self):
+        snap = self.snapshot()
+        acc = snap["accuracy"]
+        if acc["value"] is None:
+            return f"processed {snap['processed']}/{snap['total']}, no labelled respondents yet"
+        return (
+            f"processed {snap['processed']}/{snap['total']} | "
+            f"accuracy {acc['value']:.3f} [{acc['low']:.3f}, {acc['high']:.3f}] | "
+            f"R share {snap['vote_shares']['Republican']['value']:.3f} "
+            f"vs p_trump {snap['calibration']['mean_p_trump']:.3f}"
+        )
+
+
+# =============================================================
+# 3. Publishing: periodic summary file and HTTP endpoint
+# =============================================================
+def write_summary(metrics, path):
+    """Atomically write the current snapshot to `path`."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(metrics.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """
+    Serve the live snapshot as JSON on http://host:port/ (and /metrics)
+    from a daemon thread. Returns the server so the caller can shut it down.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = json.dumps(metrics.snapshot(), indent=2).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 不打断 run.py 的逐条输出
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class LiveReporter:
+    """
+    Glue used by run.py: updates the metrics, rewrites the summary file every
+    `every` votes and keeps the HTTP endpoint (if any) running. close() prints
+    the final summary line unless the last vote already printed it.
+    """
+
+    def __init__(self, metrics, summary_path=None, port=None, every=25):
+        self.metrics = metrics
+        self.summary_path = summary_path
+        self.every = max(1, every)
+        self.printed_at = None
+        self.server = serve_metrics(metrics, port) if port else None
+        if self.server:
+            print(f"📡 Live metrics: http://127.0.0.1:{port}/metrics")
+
+    def record(self, index, score):
+        self.metrics.update(index, score)
+        if self.metrics.processed % self.every == 0:
+            self.flush()
+            self.print_summary()
+
+    def print_summary(self):
+        self.printed_at = self.metrics.processed
+        print(f"📈 {self.metrics.summary_line()}")
+
+    def record_error(self):
+        self.metrics.record_error()
+
+    def flush(self):
+        if self.summary_path:
+            write_summary(self.metrics, self.summary_path)
+
+    def close(self):
+        self.flush()
+        if self.printed_at != self.metrics.processed:
+            self.print_summary()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,221 @@
+# synthetic.py (合成受访者生成器)
+"""
+Synthetic ANES population generator for scale testing.
+
+A Chow-Liu tree Bayesian network is fitted over the coded survey columns:
+the `fields_of_interest` plus the ground-truth vote V162062x. The tree is the
+maximum mutual-information spanning tree, rooted at party ID. Each column is
+conditioned on its single parent. The network reproduces every one-way and
+tree-edge two-way distribution of the real data and can emit any number of
+synthetic respondents. Rows are drawn by vectorized ancestral sampling in
+chunks of compact integer arrays, so a million-respondent population never
+has to be held in memory, as codes or as rendered identities.
+
+    $ python synthetic.py --n 1000000 --out synthetic_population.npy
+    $ python synthetic.py --n 1000000 --chunksize 200000 --out synthetic_population.csv --render
+
+In Python:
+
+    from synthetic import ChowLiuNetwork, iter_synthetic_identities
+    for codes, texts in iter_synthetic_identities(1_000_000, chunk_size=100_000, seed=0):
+        ...
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from anes import data, fields_of_interest, render_identities
+
+DEFAULT_COLUMNS = list(fields_of_interest) + ["V162062x"]
+DEFAULT_ROOT = "V161158x"   # party identification
+SYNTHETIC_ID_OFFSET = 10_000_000
+
+
+# =============================================================
+# 1. Chow-Liu tree Bayesian network
+# =============================================================
+def _mutual_information(a, b, n_a, n_b):
+    joint = np.bincount(a * n_b + b, minlength=n_a * n_b).reshape(n_a, n_b) / len(a)
+    pa = joint.sum(axis=1, keepdims=True)
+    pb = joint.sum(axis=0, keepdims=True)
+    nz = joint > 0
+    return float(np.sum(joint[nz] * np.log(joint[nz] / (pa @ pb)[nz])))
+
+
+class ChowLiuNetwork:
+    """
+    Tree-structured Bayesian network over categorical (coded) columns.
+
+    Parameters
+    ----------
+    alpha : float
+        Additive smoothing for the conditional tables. 0 (default) only emits
+        value combinations seen along each tree edge.
+    """
+
+    def __init__(self, alpha=0.0):
+        self.alpha = alpha
+        self.columns = []
+        self.values = {}     # column -> sorted observed codes
+        self.parent = {}     # column -> parent column (None for the root)
+        self.order = []      # topological (ancestral) order
+        self.cdf = {}        # column -> cumulative conditional table [parent_state, value]
+
+    def fit(self, frame, columns=None, root=None):
+        columns = list(columns or frame.columns)
+        root = root if root in columns else columns[0]
+        self.columns = columns
+        codes = {}
+        for col in columns:
+            # 缺失值单独编码为 NaN 类别
+            uniques, inverse = np.unique(frame[col].to_numpy(dtype=float), return_inverse=True)
+            self.values[col] = uniques
+            codes[col] = inverse.ravel()
+
+        # Chow-Liu：按互信息求最大生成树（Prim）
+        k = len(columns)
+        mi = np.zeros((k, k))
+        for i in range(k):
+            for j in range(i + 1, k):
+                ci, cj = columns[i], columns[j]
+                mi[i, j] = mi[j, i] = _mutual_information(
+                    codes[ci], codes[cj], len(self.values[ci]), len(self.values[cj]))
+        in_tree = {columns.index(root)}
+        self.parent = {root: None}
+        self.order = [root]
+        while len(in_tree) < k:
+            best = max(((i, j) for i in in_tree for j in range(k) if j not in in_tree), key=lambda e: mi[e])
+            in_tree.add(best[1])
+            self.parent[columns[best[1]]] = columns[best[0]]
+            self.order.append(columns[best[1]])
+
+        for col in self.order:
+            n_values = len(self.values[col])
+            parent = self.parent[col]
+            if parent is None:
+                counts = np.bincount(codes[col], minlength=n_values)[None, :].astype(float)
+            else:
+                n_parent = len(self.values[parent])
+                counts = np.bincount(codes[parent] * n_values + codes[col],
+                                     minlength=n_parent * n_values).reshape(n_parent, n_values).astype(float)
+            counts += self.alpha
+            self.cdf[col] = np.cumsum(counts / counts.sum(axis=1, keepdims=True), axis=1)
+        return self
+
+    def edges(self):
+        return [(self.parent[col], col) for col in self.order if self.parent[col] is not None]
+
+    def sample_codes(self, n, rng):
+        """Draw n rows as value indices (column -> int array), in ancestral order."""
+        out = {}
+        for col in self.order:
+            parent = self.parent[col]
+            cdf = self.cdf[col][0] if parent is None else self.cdf[col][out[parent]]
+            u = rng.random(n)
+            if parent is None:
+                idx = np.searchsorted(cdf, u, side="right")
+            else:
+                idx = (u[:, None] >= cdf).sum(axis=1)
+            out[col] = np.minimum(idx, len(self.values[col]) - 1)
+        return out
+
+    def sample(self, n, rng):
+        """Draw n synthetic rows with the original survey codes as a DataFrame."""
+        codes = self.sample_codes(n, rng)
+        frame = {}
+        for col in self.columns:
+            values = self.values[col][codes[col]]
+            if np.isnan(self.values[col]).any():
+                frame[col] = values
+            else:
+                frame[col] = values.astype(np.int32)
+        return pd.DataFrame(frame, columns=self.columns)
+
+
+# =============================================================
+# 2. Chunked generation
+# =============================================================
+def fit_network(columns=None, alpha=0.0):
+    """Fit the network on the real ANES respondents of this variant."""
+    columns = columns or DEFAULT_COLUMNS
+    return ChowLiuNetwork(alpha).fit(data, columns, root=DEFAULT_ROOT)
+
+
+def iter_synthetic_population(n, chunk_size=100_000, seed=None, network=None):
+    """
+    Yield DataFrames of at most `chunk_size` synthetic respondents (n in total),
+    with survey codes plus a synthetic V160001_orig id.
+    """
+    network = network or fit_network()
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        chunk = network.sample(size, rng)
+        chunk.insert(0, "V160001_orig", np.arange(start, start + size) + SYNTHETIC_ID_OFFSET)
+        yield chunk
+
+
+def iter_synthetic_identities(n, chunk_size=100_000, seed=None, network=None):
+    """Yield (codes DataFrame, list of identity strings) per chunk."""
+    for chunk in iter_synthetic_population(n, chunk_size, seed, network):
+        yield chunk, render_identities(chunk)
+
+
+# =============================================================
+# 3. CLI
+# =============================================================
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ANES population (Chow-Liu Bayesian network).")
+    parser.add_argument("--n", type=int, default=1_000_000, help="Number of synthetic respondents.")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows generated per chunk.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--alpha", type=float, default=0.0, help="Additive smoothing of the conditional tables.")
+    parser.add_argument("--out", type=str, default="synthetic_population.npy",
+                        help="Output file: .npy (int32 matrix, memory-mapped) or .csv.")
+    parser.add_argument("--render", action="store_true",
+                        help="Also render identity text (written alongside as <out>.identities.txt).")
+    args = parser.parse_args()
+
+    network = fit_network(alpha=args.alpha)
+    print("Chow-Liu tree edges (parent -> child):")
+    for parent, child in network.edges():
+        print(f"  {parent} -> {child}")
+
+    columns = ["V160001_orig"] + network.columns
+    ext = os.path.splitext(args.out)[1].lower()
+    if ext == ".npy" and any(np.isnan(network.values[col]).any() for col in network.columns):
+        parser.error("Columns with missing values cannot be stored in an integer .npy; use .csv")
+    matrix = None
+    if ext == ".npy":
+        matrix = np.lib.format.open_memmap(args.out, mode="w+", dtype=np.int32, shape=(args.n, len(columns)))
+    elif ext != ".csv":
+        parser.error("--out must end in .npy or .csv")
+    text_file = open(os.path.splitext(args.out)[0] + ".identities.txt", "w") if args.render else None
+
+    started = time.time()
+    written = 0
+    for chunk in iter_synthetic_population(args.n, args.chunksize, args.seed, network):
+        if matrix is not None:
+            matrix[written:written + len(chunk)] = chunk[columns].to_numpy(dtype=np.int32)
+        else:
+            chunk.to_csv(args.out, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        if text_file:
+            text_file.write("\n".join(render_identities(chunk)) + "\n")
+        written += len(chunk)
+        print(f"  {written:,}/{args.n:,} rows ({time.time() - started:.1f}s)")
+
+    if matrix is not None:
+        matrix.flush()
+        with open(os.path.splitext(args.out)[0] + ".columns.txt", "w") as f:
+            f.write("\n".join(columns) + "\n")
+    if text_file:
+        text_file.close()
+    print(f"Saved {written:,} synthetic respondents to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
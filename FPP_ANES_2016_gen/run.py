@@ -2,12 +2,22 @@
 import time
 import os
 from Identity import PoliticalBias
-from anes import identities
+from anes import identities, data, ground_truth
+from live_metrics import LiveMetrics, LiveReporter
+from results_table import ResultsTable
+from sampling import random_order, stratified_order, stratified_sample, weighted_vote_shares
+from sequential import SequentialVoteShares
 from Poligenerator import generate_polibias
 from config import DEFAULT_MODEL, get_model_family, list_all_models
 
+# --sample 未指定 --stratify 时的分层变量：state, race, party ID, age band
+DEFAULT_SAMPLE_STRATA = ["V161010d", "V161310x", "V161158x", "age_band"]
 
-def main(model_id=None, show_models=False, delay=1.0, add_candidate_info=True, use_llm_ideology=True):
+
+def main(model_id=None, show_models=False, delay=1.0, add_candidate_info=True, use_llm_ideology=True,
+         live_summary=None, live_port=None, live_every=25,
+         adaptive=False, precision=0.01, alpha=0.05, stratify=None, seed=None,
+         sample_size=None, min_per_stratum=0):
     if show_models:
         list_all_models()
         return
@@ -49,8 +59,40 @@ def main(model_id=None, show_models=False, delay=1.0, add_candidate_info=True, u
     total = len(identities)
     print(f"📊 Total identities to process: {total}\n")
     
+    # 分层抽样模式：只跑带设计权重的代表性子样本
+    design = None
+    if sample_size:
+        strata = stratify or DEFAULT_SAMPLE_STRATA
+        design = stratified_sample(data, strata, sample_size, seed=seed, min_per_stratum=min_per_stratum)
+        total = len(design)
+        print(f"🧪 Stratified subsample: {total} identities (strata: {', '.join(strata)})\n")
+    
+    # 按受访者ID记录预测，结束后与ANES真实值join
+    results_table = ResultsTable(data, model_id, design=design)
+    
     # 顺序处理每个identity
-    for idx, identity in enumerate(identities, 1):
+    # adaptive模式：随机（可按state/party ID分层）顺序抽样，投票比例达到目标精度后提前停止
+    order = range(total) if design is None else design.index.to_numpy()
+    sequential = None
+    sampled_scores = {}
+    if adaptive:
+        order = stratified_order(data, stratify, seed) if stratify else random_order(total, seed)
+        sequential = SequentialVoteShares(total, precision=precision, alpha=alpha)
+        strata_note = f", stratified by {', '.join(stratify)}" if stratify else ""
+        print(f"🎯 Adaptive sampling: stop when vote shares are within ±{precision} "
+              f"({1 - alpha:.0%} confidence sequence{strata_note})\n")
+    
+    # 实时指标（可选）：定期写入summary文件 / 本地HTTP endpoint
+    # total为计划处理的identity数（--sample为子样本大小，--adaptive为最多抽取的总体大小）
+    live = None
+    if live_summary or live_port:
+        live = LiveReporter(
+            LiveMetrics(ground_truth, total=len(order)),
+            summary_path=live_summary, port=live_port, every=live_every
+        )
+    
+    for idx, row in enumerate(order, 1):
+        identity = identities[row]
         try:
             print(f"[{idx}/{total}] ", end='', flush=True)
             
@@ -71,6 +113,15 @@ def main(model_id=None, show_models=False, delay=1.0, add_candidate_info=True, u
             
             vote_map = {1: "Republican ✓", -1: "Democratic ✓", 0: "No Preference ○"}
             print(f"{vote_map[score]}")
+            results_table.record(row, score)
+            sampled_scores[row] = score
+            if live:
+                live.record(row, score)
+            if sequential:
+                sequential.update(score)
+                if sequential.done:
+                    print(f"🛑 Target precision reached after {idx} identities: {sequential.summary_line()}")
+                    break
             
             # 在处理下一个identity之前添加延迟
             if is_bedrock and idx < total:
@@ -78,11 +129,16 @@ def main(model_id=None, show_models=False, delay=1.0, add_candidate_info=True, u
                 
         except Exception as e:
             print(f"❌ Error: {e}")
+            if live:
+                live.record_error()
             if is_bedrock:
                 print(f"⏸️  Waiting {delay * 3}s before continuing...")
                 time.sleep(delay * 3)
             continue
     
+    if live:
+        live.close()
+    
     # 输出结果
     results = bias.get_results()
     print(f"\n{'='*60}")
@@ -107,6 +163,21 @@ def main(model_id=None, show_models=False, delay=1.0, add_candidate_info=True, u
         f.write(f"Democratic Votes: {results['Democratic']}\n")
         f.write(f"No Preference Votes: {results['No Preference']}\n")
         f.write(f"Total Processed: {sum(results.values())}\n")
+        if design is not None and sampled_scores:
+            rows = list(sampled_scores)
+            shares = weighted_vote_shares(list(sampled_scores.values()),
+                                          design.loc[rows, "design_weight"], design.loc[rows, "stratum"])
+            f.write(f"Stratified Subsample: {len(design)} identities, strata {stratify or DEFAULT_SAMPLE_STRATA}, seed {seed}\n")
+            for name, (estimate, se) in shares.items():
+                f.write(f"Weighted {name} Share: {estimate:.4f} (SE {se:.4f})\n")
+        if sequential:
+            f.write(f"Adaptive Sampling: precision ±{precision}, alpha {alpha}, stratify {stratify}, seed {seed}\n")
+            for name, share in sequential.summary().items():
+                f.write(f"{name} Share: {share['estimate']:.4f} [{share['low']:.4f}, {share['high']:.4f}]\n")
+    
+    results_path = os.path.join(results_dir, 'results.csv')
+    results_table.write(results_path)
+    print(f"📄 Results table saved to: {results_path}")
 
 
 if __name__ == "__main__":
@@ -144,9 +215,108 @@ if __name__ == "__main__":
         if "--no-llm-ideology" in sys.argv:
             use_llm_ideology = False
         
+        # 实时指标参数
+        live_summary = None
+        live_port = None
+        live_every = 25
+        if "--live-summary" in sys.argv:
+            summary_idx = sys.argv.index("--live-summary")
+            if summary_idx + 1 < len(sys.argv):
+                live_summary = sys.argv[summary_idx + 1]
+            else:
+                print("Error: --live-summary requires a file path")
+                exit(1)
+        
+        if "--live-port" in sys.argv:
+            port_idx = sys.argv.index("--live-port")
+            try:
+                live_port = int(sys.argv[port_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --live-port requires an integer port")
+                exit(1)
+        
+        if "--live-every" in sys.argv:
+            every_idx = sys.argv.index("--live-every")
+            try:
+                live_every = int(sys.argv[every_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --live-every requires an integer")
+                exit(1)
+        
+        # adaptive抽样参数
+        adaptive = "--adaptive" in sys.argv
+        precision = 0.01
+        alpha = 0.05
+        stratify = None
+        seed = None
+        sample_size = None
+        min_per_stratum = 0
+        if "--precision" in sys.argv:
+            precision_idx = sys.argv.index("--precision")
+            try:
+                precision = float(sys.argv[precision_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --precision requires a numeric value (e.g. 0.01)")
+                exit(1)
+        
+        if "--alpha" in sys.argv:
+            alpha_idx = sys.argv.index("--alpha")
+            try:
+                alpha = float(sys.argv[alpha_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --alpha requires a numeric value (e.g. 0.05)")
+                exit(1)
+        
+        if "--stratify" in sys.argv:
+            stratify_idx = sys.argv.index("--stratify")
+            if stratify_idx + 1 < len(sys.argv):
+                # 逗号分隔的ANES列名，例如 V161010d,V161158x
+                stratify = sys.argv[stratify_idx + 1].split(",")
+            else:
+                print("Error: --stratify requires comma-separated column names")
+                exit(1)
+        
+        if "--seed" in sys.argv:
+            seed_idx = sys.argv.index("--seed")
+            try:
+                seed = int(sys.argv[seed_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --seed requires an integer")
+                exit(1)
+        
+        if "--sample" in sys.argv:
+            sample_idx = sys.argv.index("--sample")
+            try:
+                sample_size = int(sys.argv[sample_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --sample requires an integer number of identities")
+                exit(1)
+        
+        if "--min-per-stratum" in sys.argv:
+            min_idx = sys.argv.index("--min-per-stratum")
+            try:
+                min_per_stratum = int(sys.argv[min_idx + 1])
+            except (IndexError, ValueError):
+                print("Error: --min-per-stratum requires an integer")
+                exit(1)
+        
+        if adaptive and sample_size:
+            print("Error: --adaptive and --sample cannot be combined")
+            exit(1)
+        
         main(
             model_id=model_id, 
             delay=delay, 
             add_candidate_info=add_candidate_info,
-            use_llm_ideology=use_llm_ideology
+            use_llm_ideology=use_llm_ideology,
+            live_summary=live_summary,
+            live_port=live_port,
+            live_every=live_every,
+            adaptive=adaptive,
+            precision=precision,
+            alpha=alpha,
+            stratify=stratify,
+            seed=seed,
+            sample_size=sample_size,
+            min_per_stratum=min_per_stratum
         )
\ No newline at end of file
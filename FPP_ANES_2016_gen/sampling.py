@@ -0,0 +1,140 @@
+# sampling.py (受访者抽样顺序)
+"""
+Orders in which run.py visits the ANES respondents.
+
+For adaptive (early-stopping) runs every prefix of the order should look
+like a random sample of the whole survey. `random_order` is a uniform random
+permutation. `stratified_order` additionally interleaves the strata so every
+prefix holds each stratum (state, party ID, ...) in close to its population
+proportion.
+
+`stratified_sample` draws a fixed-budget subsample of the survey with
+survey design weights, so a run over a few hundred respondents still gives
+unbiased population-level estimates (see Evaluation_Tools/evaluation.py
+--weight-col).
+"""
+
+import numpy as np
+import pandas as pd
+
+# 年龄段（V161267，负值为缺失），可作为分层变量 "age_band"
+AGE_BANDS = [(18, 29, "18-29"), (30, 44, "30-44"), (45, 64, "45-64"), (65, 200, "65+")]
+
+
+def strata_frame(data, columns):
+    """Columns of `data` used for stratification; "age_band" is derived from V161267."""
+    frame = {}
+    for col in columns:
+        if col == "age_band":
+            age = data["V161267"]
+            band = pd.Series("missing", index=data.index)
+            for low, high, label in AGE_BANDS:
+                band[(age >= low) & (age <= high)] = label
+            frame[col] = band
+        else:
+            frame[col] = data[col]
+    return pd.DataFrame(frame, index=data.index)
+
+
+def random_order(n, seed=None):
+    """Uniform random permutation of range(n)."""
+    return np.random.default_rng(seed).permutation(n)
+
+
+def stratified_order(data, columns, seed=None):
+    """
+    Random order of the rows of `data`, interleaved across the strata defined by
+    `columns`.
+
+    Rows are shuffled within each stratum. The k-th row (0-based) of a stratum
+    of size n_s gets the key (k + u) / n_s with u ~ U(0, 1), and all rows are
+    sorted by key. After t draws each stratum has contributed about
+    t * n_s / N rows.
+    """
+    rng = np.random.default_rng(seed)
+    codes = strata_frame(data, columns).groupby(list(columns), sort=True, dropna=False).ngroup().to_numpy()
+    n = len(codes)
+    shuffled = rng.permutation(n)
+    # 组内随机排序后的名次
+    shuffled_codes = codes[shuffled]
+    rank = pd.Series(shuffled_codes).groupby(shuffled_codes).cumcount().to_numpy()
+    size = np.bincount(shuffled_codes)[shuffled_codes]
+    keys = (rank + rng.random(n)) / size
+    return shuffled[np.argsort(keys, kind="stable")]
+
+
+def stratified_sample(data, columns, n, seed=None, min_per_stratum=0):
+    """
+    Stratified random subsample of about `n` rows with design weights.
+
+    Each stratum h (a combination of `columns`) of size N_h is allocated
+    a_h = n * N_h / N rows, raised to `min_per_stratum` (capped at N_h) for
+    small strata. A fractional allocation is rounded by systematic rounding
+    over the strata with one uniform start. Every row of stratum h is then
+    included with probability exactly a_h / N_h, and its design weight is the
+    inverse, N_h / a_h. Horvitz-Thompson totals are therefore unbiased, and
+    weighted shares (Hajek ratios) are unbiased up to O(1/n), even with many
+    more strata than sampled rows. The realized sample size is within one of
+    sum(a_h).
+
+    Returns a DataFrame indexed by row position in `data` with columns
+    `stratum` (integer code) and `design_weight`, in a random order that is
+    interleaved across strata (so it can also drive run.py directly).
+    """
+    rng = np.random.default_rng(seed)
+    codes = strata_frame(data, columns).groupby(list(columns), sort=True, dropna=False).ngroup().to_numpy()
+    sizes = np.bincount(codes)
+    N = len(codes)
+    expected = np.minimum(np.maximum(n * sizes / N, min_per_stratum), sizes)
+
+    # 系统取整：每层的抽样数 floor(a_h) 或 ceil(a_h)，且 P(ceil) = a_h 的小数部分
+    base = np.floor(expected)
+    cumulative = np.floor(np.cumsum(expected - base) + rng.random())
+    extra = np.diff(np.concatenate([[0.0], cumulative]))
+    take = (base + extra).astype(int)
+
+    # 每层内随机取前 take_h 个
+    shuffled = rng.permutation(N)
+    shuffled_codes = codes[shuffled]
+    rank = pd.Series(shuffled_codes).groupby(shuffled_codes).cumcount().to_numpy()
+    chosen = shuffled[rank < take[shuffled_codes]]
+    chosen_codes = codes[chosen]
+
+    with np.errstate(divide="ignore"):
+        weights = sizes / expected
+    sample = pd.DataFrame({"stratum": chosen_codes, "design_weight": weights[chosen_codes]}, index=chosen)
+    sample.index.name = "row"
+    # 层间交错的随机顺序
+    order = stratified_order(data.iloc[chosen].reset_index(drop=True), columns, seed=rng.integers(2**32))
+    return sample.iloc[order]
+
+
+def weighted_vote_shares(scores, weights, strata=None):
+    """
+    Design-weighted vote shares with linearization standard errors.
+
+    `scores` are vote scores (1 = Republican, -1 = Democratic, 0 = No Preference).
+    With `strata`, the variance is computed within strata (stratified design)
+    when every stratum holds at least two sampled rows; otherwise (fine strata
+    with singletons) the strata are collapsed into one, which is conservative.
+    The finite-population correction is ignored, which is also conservative.
+    Returns {label: (estimate, standard_error)}.
+    """
+    scores = np.asarray(scores)
+    w = np.asarray(weights, dtype=float)
+    if strata is None or np.unique(strata, return_counts=True)[1].min() < 2:
+        strata = np.zeros(len(scores), dtype=int)
+    strata = np.asarray(strata)
+    total = w.sum()
+    shares = {}
+    for label, value in (("Republican", 1), ("Democratic", -1), ("No Preference", 0)):
+        y = (scores == value).astype(float)
+        estimate = np.sum(w * y) / total
+        # Hajek 估计量的线性化残差
+        z = w * (y - estimate) / total
+        var = 0.0
+        for h in np.unique(strata):
+            zh = z[strata == h]
+            var += len(zh) / (len(zh) - 1) * np.sum((zh - zh.mean()) ** 2)
+        shares[label] = (float(estimate), float(np.sqrt(var)))
+    return shares
@@ -0,0 +1,123 @@
+# sequential.py (顺序估计与提前停止)
+"""
+Anytime-valid confidence sequences for vote shares, used for early stopping.
+
+The ANES extract is a finite population of N respondents that run.py samples
+without replacement. The Hoeffding-type confidence sequence of
+Waudby-Smith & Ramdas ("Confidence sequences for sampling without
+replacement", NeurIPS 2020) holds simultaneously at every step t. Checking it
+after every vote and stopping when it is narrow enough therefore keeps the
+stated coverage; no peeking correction is needed. The interval also shrinks
+to a point when t = N.
+
+The guarantee assumes a uniformly random order. A stratified order
+(sampling.stratified_order) is a restricted randomization that lowers
+variance; with it the stated coverage is approximate rather than exact.
+"""
+
+import math
+
+VOTE_LABELS = {1: "Republican", -1: "Democratic", 0: "No Preference"}
+
+
+class WoRConfidenceSequence:
+    """
+    Running confidence sequence for the mean of a [0, 1] quantity over a finite
+    population of size N, sampled without replacement.
+
+    Without `target_half_width` it uses the predictable plug-in
+    λ_t = min(1, sqrt(8 log(2/α) / (t log(t + 1)))). With a target half-width
+    ε, λ is held constant at sqrt(8 log(2/α) / n*), where n* is the
+    fixed-sample Hoeffding size for ε with the finite-population correction.
+    This makes the sequence tightest around the step where it is expected to
+    reach ε, which stops much sooner than the generic plug-in.
+    """
+
+    def __init__(self, population_size, alpha=0.05, target_half_width=None):
+        self.N = population_size
+        self.alpha = alpha
+        self.log_term = math.log(2 / alpha)
+        self.fixed_lambda = None
+        if target_half_width:
+            n_star = self.log_term / (2 * target_half_width ** 2)
+            n_star = n_star / (1 + n_star / population_size)
+            self.fixed_lambda = min(1.0, math.sqrt(8 * self.log_term / n_star))
+        self.t = 0
+        self.sum_x = 0.0           # Σ_{j<t} X_j
+        self.weighted_sum = 0.0    # Σ λ_i (X_i + Σ_{j<i} X_j / (N - i + 1))
+        self.weight = 0.0          # Σ λ_i (1 + (i - 1) / (N - i + 1))
+        self.lambda_sq = 0.0       # Σ λ_i²
+        self.low, self.high = 0.0, 1.0
+
+    def update(self, x):
+        if self.t >= self.N:
+            raise ValueError("Population exhausted: more observations than population_size.")
+        self.t += 1
+        i = self.t
+        if self.fixed_lambda is not None:
+            lam = self.fixed_lambda
+        else:
+            lam = min(1.0, math.sqrt(8 * self.log_term / (i * math.log(i + 1))))
+        remaining = self.N - i + 1
+        self.weighted_sum += lam * (x + self.sum_x / remaining)
+        self.weight += lam * (1 + (i - 1) / remaining)
+        self.lambda_sq += lam * lam
+        self.sum_x += x
+
+        centre = self.weighted_sum / self.weight
+        radius = (self.log_term + self.lambda_sq / 8) / self.weight
+        # 取历史区间的交集（仍然是有效的置信序列）
+        self.low = max(self.low, centre - radius)
+        self.high = min(self.high, centre + radius)
+        if self.t == self.N:
+            self.low = self.high = self.sum_x / self.N
+        return self.low, self.high
+
+    @property
+    def estimate(self):
+        return self.sum_x / self.t if self.t else None
+
+    @property
+    def half_width(self):
+        return (self.high - self.low) / 2
+
+
+class SequentialVoteShares:
+    """
+    Joint confidence sequences for the Republican and Democratic vote shares.
+
+    The miscoverage α is split across the two shares (Bonferroni), so both
+    intervals hold simultaneously. `done` turns True once both half-widths are
+    at most `precision`.
+    """
+
+    def __init__(self, population_size, precision=0.01, alpha=0.05):
+        self.precision = precision
+        self.shares = {
+            "Republican": WoRConfidenceSequence(population_size, alpha / 2, precision),
+            "Democratic": WoRConfidenceSequence(population_size, alpha / 2, precision),
+        }
+
+    def update(self, score):
+        label = VOTE_LABELS[score]
+        for name, cs in self.shares.items():
+            cs.update(1.0 if label == name else 0.0)
+
+    @property
+    def n(self):
+        return self.shares["Republican"].t
+
+    @property
+    def done(self):
+        return self.n > 0 and all(cs.half_width <= self.precision for cs in self.shares.values())
+
+    def summary(self):
+        return {
+            name: {"estimate": cs.estimate, "low": cs.low, "high": cs.high}
+            for name, cs in self.shares.items()
+        }
+
+    def summary_line(self):
+        parts = [f"{name} {cs.estimate:.3f} [{cs.low:.3f}, {cs.high:.3f}]"
+                 for name, cs in self.shares.items()]
+        return f"n={self.n} | " + " | ".join(parts)
@@ -7,11 +7,14 @@ class ManifestoIdentity:
         self.text = row["text"]
         self.true_rile = row["rile"]
 
-    def build_prompt(self):
+    def build_prompt(self, text=None, segment=None):
         """
         构造LLM的提示词。模型知道党派、国家、年份和宣言文本。
         要求模型预测 RILE (Left-Right) 分数。
+        text / segment=(i, n)：分段模式下只给出第 i 段（共 n 段）的文本
         """
+        excerpt = self.text if text is None else text
+        label = "Manifesto excerpt" if segment is None else f"Manifesto excerpt (part {segment[0]} of {segment[1]})"
         return f"""
 You are a comparative political scientist specializing in party manifestos.
 
@@ -25,8 +28,8 @@ Country: {self.country}
 Party: {self.party}
 Year: {self.date}
 
-Manifesto excerpt:
-{self.text}
+{label}:
+{excerpt}
 
 Output your result in JSON format only:
 {{
@@ -0,0 +1,92 @@
+# chunking.py
+"""
+长宣言分段：把宣言文本切成不超过 max_tokens 的段，分别估计 RILE 后按长度加权汇总。
+
+- 切分单位是准句（quasi-sentence）：ManifestoStore 中带注释的文本每行一句；
+  过长的行再按句号切分，仍过长则按词硬切
+- 段长用 estimate_tokens 估计（约 4 个字符一个 token，不依赖具体 tokenizer）
+- max_total_tokens 限制每条宣言送入模型的总 token 数：超出时在全文中等间隔选段，
+  保证覆盖全文而延迟有上限
+- RILE 本身是准句计数的比例，段 RILE 按段内准句数加权平均即等于全文 RILE
+"""
+
+import math
+import re
+
+CHARS_PER_TOKEN = 4
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def estimate_tokens(text):
+    """粗略 token 数（约 4 个字符 / token）"""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def _split_long(unit, max_tokens):
+    """把超过 max_tokens 的单位按句子、再按词切开"""
+    if estimate_tokens(unit) <= max_tokens:
+        return [unit]
+    pieces = []
+    for sentence in _SENTENCE_END.split(unit):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words, current = sentence.split(), []
+        for word in words:
+            if current and estimate_tokens(" ".join(current + [word])) > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+def split_units(text, max_tokens):
+    """文本 -> 准句列表（每行一句，空行忽略；过长的句子继续切分）"""
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            units.extend(_split_long(line, max_tokens))
+    return units
+
+
+def chunk_text(text, max_tokens=1500, max_total_tokens=None):
+    """
+    把 text 切成段，返回 [{"text", "tokens", "units", "index"}, ...]
+    每段按顺序装入完整的准句，不超过 max_tokens；总 token 超过 max_total_tokens 时
+    等间隔保留 floor(max_total_tokens / max_tokens) 段（至少 1 段），index 为段在全文中的序号
+    """
+    chunks, current, current_tokens = [], [], 0
+    for unit in split_units(text, max_tokens):
+        tokens = estimate_tokens(unit)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+
+    segments = [{"text": "\n".join(units), "tokens": sum(estimate_tokens(u) for u in units),
+                 "units": len(units), "index": i} for i, units in enumerate(chunks)]
+    if max_total_tokens and sum(s["tokens"] for s in segments) > max_total_tokens:
+        keep = max(1, min(len(segments), max_total_tokens // max_tokens))
+        # 等间隔选段（每个区间取中点），覆盖全文
+        step = len(segments) / keep
+        segments = [segments[int((k + 0.5) * step)] for k in range(keep)]
+    return segments
+
+
+def aggregate_rile(estimates):
+    """
+    estimates: [(rile 或 None, 权重), ...]，按权重（准句数）加权平均，忽略失败的段
+    返回 (rile, 成功段数)；全部失败时 rile 为 None
+    """
+    scored = [(float(r), w) for r, w in estimates if r is not None]
+    total = sum(w for _, w in scored)
+    if not scored or total <= 0:
+        return None, 0
+    rile = sum(r * w for r, w in scored) / total
+    return max(-100.0, min(100.0, rile)), len(scored)
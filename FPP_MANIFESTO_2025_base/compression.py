@@ -0,0 +1,233 @@
+# compression.py
+"""
+宣言抽取式压缩：提示模型前在本地（仅CPU、无额外依赖）选出最能反映左右立场的准句。
+
+- 每个准句（每行一句）计算 TF-IDF（IDF 在本宣言内计算），与 RILE 左/右类别的词干词表
+  （RILE_LEXICON，对应 Manifesto 编码 per104 / per401 / per504 等）比较得分
+- 词干互斥匹配：多词短语优先，其次是更长（更具体）的词干，每个 token 只归属一个词干，
+  例如 nationalisation 只命中左侧的 nationali，fair competition 不再同时命中右侧的 competiti
+- 按左、右两类准句在全文中的比例分配 token 预算（最大余数法），各类内取得分最高的句子，
+  保持原文顺序输出，使压缩后文本的左右比例与全文一致
+- 压缩文本开头注明选取比例和无左右内容句子的占比，模型可据此校正极端程度
+- 结果按宣言 key 缓存在 .cache/manifesto_compressed/ 下（文本或参数变化时自动失效）
+
+    from compression import compress_manifesto
+    text, stats = compress_manifesto(full_text, token_budget=1200, key="11220_196009")
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+from chunking import estimate_tokens, split_units
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "manifesto_compressed")
+LEXICON_VERSION = 2
+SUMMARY_PREFIX = "[Extractive summary:"
+
+# RILE 右/左类别的词干（token 以词干开头即命中；重叠时更长的词干优先，见 _matched_positions）
+RILE_LEXICON = {
+    "right": {
+        "per104 military positive": ["military", "defen", "armed", "army", "soldier", "security forc"],
+        "per201 freedom and human rights": ["freedom", "liberty", "individual right"],
+        "per203 constitutionalism positive": ["constitution"],
+        "per305 political authority": ["strong government", "stabilit", "leadership", "authorit"],
+        "per401 free market economy": ["free market", "free enterprise", "private enterprise", "competiti", "deregulat",
+                                       "privati", "entrepreneur"],
+        "per402 incentives": ["tax cut", "lower tax", "tax relief", "incentive", "investment"],
+        "per407 protectionism negative": ["free trade"],
+        "per414 economic orthodoxy": ["budget", "deficit", "debt", "balanced", "inflation", "spending cut"],
+        "per505 welfare state limitation": ["welfare reform", "dependenc", "self-relian", "cut spending"],
+        "per601 national way of life positive": ["patriot", "nationhood", "national identity", "national pride",
+                                                 "national interest", "heritage", "tradition", "sovereign"],
+        "per603 traditional morality positive": ["family values", "marriage", "religio", "church", "moral"],
+        "per605 law and order positive": ["crime", "criminal", "police", "law and order", "punish", "prison", "terror"],
+        "per606 civic mindedness positive": ["community", "volunteer", "civic", "solidarity"],
+    },
+    "left": {
+        "per103 anti-imperialism": ["imperialis", "colonial"],
+        "per105 military negative": ["disarm", "arms race", "military spending cut", "nuclear weapon"],
+        "per106 peace": ["peace", "peaceful"],
+        "per107 internationalism positive": ["international cooperat", "united nations", "foreign aid", "development aid"],
+        "per202 democracy": ["democra", "participat", "referend"],
+        "per403 market regulation": ["regulat", "consumer protect", "monopol", "fair competition"],
+        "per404 economic planning": ["planning", "planned economy"],
+        "per406 protectionism positive": ["protectionis", "tariff", "import quota"],
+        "per412 controlled economy": ["price control", "wage control", "controlled economy"],
+        "per413 nationalisation": ["nationali", "public ownership", "state ownership"],
+        "per504 welfare state expansion": ["welfare", "social security", "pension", "health care", "healthcare",
+                                           "public service", "social housing", "poverty"],
+        "per506 education expansion": ["education", "school", "universit", "teacher"],
+        "per701 labour groups positive": ["worker", "trade union", "labour", "labor", "wage", "employee"],
+    },
+}
+
+_WORD = re.compile(r"[a-z][a-z\-']*")
+
+
+def _tokens(text):
+    return _WORD.findall(text.lower())
+
+
+def _specificity(parts):
+    """词干的优先级：词数多的优先，其次字符数多的优先"""
+    return len(parts), sum(len(p) for p in parts)
+
+
+def _compile_lexicon():
+    """所有词干 (词列表, side)，按优先级从高到低排序"""
+    stems = [(tuple(stem.split()), side) for side, categories in RILE_LEXICON.items()
+             for stems in categories.values() for stem in stems]
+    return sorted(stems, key=lambda s: _specificity(s[0]), reverse=True)
+
+
+_STEMS = _compile_lexicon()
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hits(token):
+    """以该词开头可能命中的词干 ((词列表, side), ...)，按优先级排序"""
+    return tuple((parts, side) for parts, side in _STEMS if token.startswith(parts[0]))
+
+
+def _matched_positions(tokens):
+    """
+    {side: 命中的 token 位置集合}（多词词干要求连续命中）
+    互斥匹配：候选按优先级（词数、长度）从高到低、同级按位置依次认领 token，
+    已被认领的 token 不再计入其他词干
+    """
+    candidates = [(i, parts, side) for i, token in enumerate(tokens) for parts, side in _token_hits(token)]
+    candidates.sort(key=lambda c: (_specificity(c[1]), -c[0]), reverse=True)
+    hits = {"right": set(), "left": set()}
+    claimed = set()
+    for i, parts, side in candidates:
+        span = range(i, i + len(parts))
+        if span.stop > len(tokens) or any(j in claimed for j in span):
+            continue
+        if all(tokens[i + j].startswith(parts[j]) for j in range(1, len(parts))):
+            claimed.update(span)
+            hits[side].update(span)
+    return hits
+
+
+def score_units(units):
+    """
+    每个准句的 (side, score)：side 为 "right" / "left" / None
+    score 为命中词干的 token 的 TF-IDF 权重之和除以句向量范数（即与该侧词表方向的余弦）
+    """
+    docs = [_tokens(unit) for unit in units]
+    n = len(docs)
+    df = Counter(term for doc in docs for term in set(doc))
+    idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+    scored = []
+    for doc in docs:
+        if not doc:
+            scored.append((None, 0.0))
+            continue
+        tf = Counter(doc)
+        weight = [tf[t] / len(doc) * idf[t] for t in doc]
+        norm = math.sqrt(sum((tf[t] / len(doc) * idf[t]) ** 2 for t in tf)) or 1.0
+        hits = _matched_positions(doc)
+        sides = {side: sum(weight[i] / tf[doc[i]] for i in positions) / norm for side, positions in hits.items()}
+        side = max(sides, key=sides.get)
+        scored.append((side, sides[side]) if sides[side] > 0 else (None, 0.0))
+    return scored
+
+
+def _allocate(budget, sizes):
+    """按比例（最大余数法）把 budget 分给各组，不超过组内可用量"""
+    total = sum(sizes.values())
+    if total == 0:
+        return {k: 0 for k in sizes}
+    quotas = {k: budget * v / total for k, v in sizes.items()}
+    alloc = {k: min(sizes[k], int(q)) for k, q in quotas.items()}
+    for k in sorted(quotas, key=lambda k: quotas[k] - int(quotas[k]), reverse=True):
+        if sum(alloc.values()) >= budget:
+            break
+        if alloc[k] < sizes[k]:
+            alloc[k] += 1
+    return alloc
+
+
+def select_units(units, token_budget, top_k=None):
+    """
+    选出压缩后的准句下标（按原文顺序）：左、右两侧按各自 token 量的比例分配预算，
+    侧内按得分从高到低装入；全文没有左右内容时取开头的句子
+    返回 (下标列表, 每句 side 列表)
+    """
+    scored = score_units(units)
+    tokens = [estimate_tokens(u) for u in units]
+    pools = {side: sorted((i for i, (s, _) in enumerate(scored) if s == side), key=lambda i: -scored[i][1])
+             for side in ("right", "left")}
+    if not pools["right"] and not pools["left"]:
+        pools = {"none": list(range(len(units)))}
+    budgets = _allocate(token_budget, {side: sum(tokens[i] for i in pool) for side, pool in pools.items()})
+    max_count = _allocate(top_k, {side: len(pool) for side, pool in pools.items()}) if top_k else None
+
+    chosen = []
+    for side, pool in pools.items():
+        used, count = 0, 0
+        for i in pool:
+            if max_count is not None and count >= max_count[side]:
+                break
+            if used + tokens[i] > budgets[side]:
+                continue
+            chosen.append(i)
+            used += tokens[i]
+            count += 1
+    return sorted(chosen), [s for s, _ in scored]
+
+
+def split_summary_header(text):
+    """压缩文本 -> (开头的说明行, 正文)；不是 compress_manifesto 的输出时说明行为 None"""
+    first, _, rest = text.partition("\n")
+    if first.startswith(SUMMARY_PREFIX):
+        return first, rest
+    return None, text
+
+
+def _cache_path(cache_dir, key, text, token_budget, top_k):
+    digest = hashlib.md5(f"{LEXICON_VERSION}|{token_budget}|{top_k}|".encode("utf-8") + text.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.{digest[:16]}.json")
+
+
+def compress_manifesto(text, token_budget=1200, top_k=None, key=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    抽取式压缩：返回 (压缩文本, 统计信息)
+    文本本身不超过 token_budget 时原样返回；给定 key 时结果缓存到 cache_dir
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text, {"units": None, "selected": None, "tokens": estimate_tokens(text), "original_tokens": estimate_tokens(text)}
+
+    path = _cache_path(cache_dir, key, text, token_budget, top_k) if key else None
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        return cached["text"], cached["stats"]
+
+    units = split_units(text, token_budget)
+    chosen, sides = select_units(units, token_budget, top_k)
+    neutral = sum(side is None for side in sides) / max(1, len(units))
+    if neutral < 1:
+        header = (f"{SUMMARY_PREFIX} {len(chosen)} of {len(units)} quasi-sentences selected for left/right "
+                  f"content; {neutral:.0%} of the full manifesto has no left/right content]")
+    else:
+        # 全文没有左右内容：select_units 取的是开头的句子
+        header = (f"{SUMMARY_PREFIX} the first {len(chosen)} of {len(units)} quasi-sentences; "
+                  f"no quasi-sentence in the full manifesto has left/right content]")
+    compressed = "\n".join([header] + [units[i] for i in chosen])
+    stats = {"units": len(units), "selected": len(chosen), "tokens": estimate_tokens(compressed),
+             "original_tokens": estimate_tokens(text)}
+
+    if path:
+        # 先写临时文件再替换，避免并发读取到半个文件
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": compressed, "stats": stats}, f)
+        os.replace(tmp_path, path)
+    return compressed, stats
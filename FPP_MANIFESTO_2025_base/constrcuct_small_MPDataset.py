@@ -5,13 +5,28 @@
 功能：
 从原始 Manifesto 数据集中筛选出特定国家的行，
 生成一个新的小规模数据集 `MPDataset_MPDS2025_small.csv`
+
+分块流式读取（内存占用与数据集大小无关），可按国家、年份范围、政党家族筛选，
+一次遍历源文件同时写出多个子集：
+    python constrcuct_small_MPDataset.py
+    python constrcuct_small_MPDataset.py --countries Germany,France --years 1990-2020 --parfam SOC,LIB \
+        --output MPDataset_small_eu.csv
+    python constrcuct_small_MPDataset.py --subsets subsets.json
+
+subsets.json 为子集列表，每项字段与 make_subset 参数相同：
+    [{"output": "MPDataset_us.csv", "countries": ["United States"]},
+     {"output": "MPDataset_postwar_soc.csv", "years": [1945, 1990], "parfam": ["SOC"]}]
 """
 
+import argparse
+import json
+
 import pandas as pd
 
 # ===== 输入输出文件路径 =====
 INPUT_FILE = "MPDataset_MPDS2025a.csv"
 OUTPUT_FILE = "MPDataset_MPDS2025_small.csv"
+CHUNKSIZE = 20000  # 每次读取的行数
 
 # ===== 要保留的国家列表 =====
 TARGET_COUNTRIES = {
@@ -25,22 +40,133 @@ TARGET_COUNTRIES = {
     "Brazil"
 }
 
-def create_small_dataset(input_path=INPUT_FILE, output_path=OUTPUT_FILE):
-    """根据国家名筛选出特定数据行并保存"""
-    # 读取原始CSV
-    df = pd.read_csv(input_path)
+# ===== 政党家族（MPDS parfam 编码）=====
+PARFAM_CODES = {
+    "ECO": 10,  # 生态
+    "LEF": 20,  # 社会主义及其他左翼
+    "SOC": 30,  # 社会民主
+    "LIB": 40,  # 自由
+    "CHR": 50,  # 基督教民主
+    "CON": 60,  # 保守
+    "NAT": 70,  # 民族主义/激进右翼
+    "AGR": 80,  # 农民
+    "ETH": 90,  # 民族与地区
+    "SIP": 95,  # 单一议题
+    "DIV": 98,  # 选举联盟
+    "MI": 999,  # 缺失
+}
+
+
+def parfam_code(value):
+    """政党家族缩写（如 SOC）或编码（如 30）-> 编码；未知取值抛出 ValueError 并列出可用缩写"""
+    key = str(value).strip().upper()
+    if key in PARFAM_CODES:
+        return PARFAM_CODES[key]
+    if key.isdigit() and int(key) in PARFAM_CODES.values():
+        return int(key)
+    valid = ", ".join(f"{abbrev} ({code})" for abbrev, code in PARFAM_CODES.items())
+    raise ValueError(f"Unknown party family {value!r}. Valid abbreviations (codes): {valid}")
+
+
+def make_subset(output, countries=None, years=None, parfam=None):
+    """
+    子集定义：countries 为国家名集合，years 为 (起始年, 结束年)（含两端），
+    parfam 为政党家族（缩写或编码）；None 表示不限
+    """
+    return {
+        "output": output,
+        "countries": None if countries is None else set(countries),
+        "years": None if years is None else (int(years[0]), int(years[1])),
+        "parfam": None if parfam is None else {parfam_code(p) for p in parfam},
+    }
+
 
-    # 筛选行
-    df_small = df[df["countryname"].isin(TARGET_COUNTRIES)]
+def _subset_mask(chunk, subset):
+    mask = pd.Series(True, index=chunk.index)
+    if subset["countries"] is not None:
+        mask &= chunk["countryname"].isin(subset["countries"])
+    if subset["years"] is not None:
+        # date 为 YYYYMM
+        year = pd.to_numeric(chunk["date"], errors="coerce") // 100
+        mask &= year.between(*subset["years"])
+    if subset["parfam"] is not None:
+        mask &= pd.to_numeric(chunk["parfam"], errors="coerce").isin(subset["parfam"])
+    return mask
 
-    # 输出结果
-    df_small.to_csv(output_path, index=False, encoding="utf-8")
+
+def build_subsets(subsets, input_path=INPUT_FILE, chunksize=CHUNKSIZE):
+    """
+    一次分块遍历 input_path，把每个子集的行追加写入各自的输出文件
+    所有列按原始字符串读取和写出（不做类型推断，输出与源文件的取值一致）
+    返回 (源文件行数, {output: 行数})
+    """
+    total = 0
+    counts = {subset["output"]: 0 for subset in subsets}
+    header = pd.read_csv(input_path, dtype=str, nrows=0)
+    handles = {subset["output"]: open(subset["output"], "w", encoding="utf-8", newline="") for subset in subsets}
+    try:
+        # 先写表头：即使没有任何行匹配（或源文件只有表头），输出也是带表头的合法 CSV
+        for handle in handles.values():
+            header.to_csv(handle, index=False)
+        reader = pd.read_csv(input_path, dtype=str, keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            total += len(chunk)
+            for subset in subsets:
+                rows = chunk[_subset_mask(chunk, subset)]
+                rows.to_csv(handles[subset["output"]], header=False, index=False)
+                counts[subset["output"]] += len(rows)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return total, counts
+
+
+def create_small_dataset(input_path=INPUT_FILE, output_path=OUTPUT_FILE, chunksize=CHUNKSIZE):
+    """根据国家名筛选出特定数据行并保存"""
+    total, counts = build_subsets([make_subset(output_path, countries=TARGET_COUNTRIES)], input_path, chunksize)
 
     # 打印结果信息
     print(f"已成功生成小规模数据集：{output_path}")
-    print(f"原始数据行数：{len(df)}")
-    print(f"筛选后数据行数：{len(df_small)}")
+    print(f"原始数据行数：{total}")
+    print(f"筛选后数据行数：{counts[output_path]}")
     print(f"包含国家：{', '.join(sorted(TARGET_COUNTRIES))}")
 
+
+def _split(value):
+    return None if value is None else [item.strip() for item in value.split(",") if item.strip()]
+
+
 if __name__ == "__main__":
-    create_small_dataset()
+    parser = argparse.ArgumentParser(description="Stream subsets of the MPDS dataset by country, year and party family.")
+    parser.add_argument("--input", type=str, default=INPUT_FILE, help="Source MPDS CSV.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="Output CSV for a single subset.")
+    parser.add_argument("--countries", type=str, default=None,
+                        help="Comma-separated country names (default: the TARGET_COUNTRIES list).")
+    parser.add_argument("--years", type=str, default=None, help="Inclusive year range, e.g. 1990-2020.")
+    parser.add_argument("--parfam", type=str, default=None, help="Comma-separated party families, e.g. SOC,LIB or 30,40.")
+    parser.add_argument("--subsets", type=str, default=None, help="JSON file with a list of subset definitions.")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Rows read per chunk.")
+    args = parser.parse_args()
+
+    # 先校验所有子集定义（未知的政党家族等），再开始读取源文件
+    try:
+        if args.subsets:
+            with open(args.subsets, encoding="utf-8") as f:
+                subsets = [make_subset(**spec) for spec in json.load(f)]
+        elif args.countries is None and args.years is None and args.parfam is None:
+            subsets = None
+        else:
+            subsets = [make_subset(args.output,
+                                   countries=_split(args.countries),
+                                   years=None if args.years is None else args.years.split("-"),
+                                   parfam=_split(args.parfam))]
+    except ValueError as e:
+        parser.error(str(e))
+    if subsets is None:
+        create_small_dataset(args.input, args.output, args.chunksize)
+        raise SystemExit
+
+    total, counts = build_subsets(subsets, args.input, args.chunksize)
+    print(f"原始数据行数：{total}")
+    for output, count in counts.items():
+        print(f"已生成子集 {output}：{count} 行")
@@ -3,39 +3,77 @@
 
 """
 功能亮点（新版）：
-1. 每条宣言保存为单独的TXT文件 -> manifesto_text/party_date.txt
-2. 自动创建manifesto_text文件夹
-3. 断点续传：自动检测已存在的TXT文件并跳过
+1. 所有宣言保存在一个压缩的 SQLite 存储中 -> manifesto_store.sqlite（见 manifesto_store.py）
+2. 旧的 manifesto_text/ 文件夹会在首次运行时自动导入
+3. 断点续传：按 (party, date, version, translation) 主键判断是否已抓取，无需扫描文件系统
 4. 错误日志记录 + 容错重试 + 限速保护
 5. tqdm进度条展示抓取进度
+6. 线程池并发抓取 + 令牌桶限速（总请求速率不超过 RATE_LIMIT，而不是逐条串行等待）
+7. 批量请求：一次请求携带多个 keys[]，按返回 items 拆分保存；出错时自动减半批大小，成功后逐步恢复
+8. 保留逐句（quasi-sentence）的 cmp_code / eu_code 注释，按宣言与编码建索引，可直接聚合主题分布
+9. 增量同步（--sync）：先批量请求元数据接口，按 md5 与本地存储比较，只下载新增或变化的宣言；
+   切换 VERSION 时 md5 未变的宣言直接从旧版本复制
 
 输出：
-    manifesto_text/11220_196009.txt
+    manifesto_store.sqlite  （ManifestoStore(...).get("11220", "196009")）
 日志：
     manifesto_loader_errors.log
+用法：
+    python data_loader_v2.py --path MPDataset_MPDS2025a.csv --workers 8 --rate 4 --batch-size 20
+    python data_loader_v2.py --path MPDataset_MPDS2025a.csv --version 2025-1 --sync
 """
 
+import argparse
 import pandas as pd
 import requests
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import os
 from datetime import datetime
 
+from manifesto_store import ManifestoStore
+from rate_limit import TokenBucket
+
 
 # ===== 配置区 =====
 API_KEY = "Your_API_Key"
-BASE_URL = "https://manifesto-project.wzb.eu/api/v1/texts_and_annotations"
+BASE_URL = os.environ.get("MANIFESTO_API_URL", "https://manifesto-project.wzb.eu/api/v1/texts_and_annotations")
+METADATA_URL = os.environ.get("MANIFESTO_METADATA_URL", BASE_URL.rsplit("/", 1)[0] + "/metadata")
 LOG_FILE = "manifesto_loader_errors.log"
 VERSION = "2024-1"  # corpus版本号
 TRANSLATION = "en"  # 可改为 "original" 获取原文
-SAVE_DIR = "manifesto_text"  # 存储TXT文件的文件夹
+STORE_PATH = "manifesto_store.sqlite"  # 宣言文本存储
+LEGACY_DIR = "manifesto_text"  # 旧版每条宣言一个TXT的文件夹（仅用于导入）
+MAX_WORKERS = 8  # 并发线程数
+RATE_LIMIT = 4.0  # 每秒最多请求数（与原先串行 sleep(0.25) 的上限一致）
+BURST = 4  # 令牌桶容量：允许的瞬时突发请求数
+BATCH_SIZE = 20  # 每次请求的初始 keys[] 数量
+MAX_BATCH_SIZE = 50  # 批大小上限（受URL长度和服务器响应大小限制）
+METADATA_BATCH_SIZE = 50  # 元数据响应很小，每次请求可携带更多 keys[]
+MD5_FIELD = "md5sum_text"  # 元数据中用于判断文本是否变化的字段
+MAX_THROTTLED = 8  # 同一批次连续被限流（429）的最多次数，超过则按失败处理
+
+_log_lock = threading.Lock()
+_thread_local = threading.local()
 
 
 def log_error(message: str):
     """将错误信息写入日志文件"""
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat()}] {message}\n")
+    with _log_lock:
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(f"[{datetime.now().isoformat()}] {message}\n")
+
+
+def get_session():
+    """每个线程一个 requests.Session（Session 本身不保证线程安全）"""
+    if not hasattr(_thread_local, "session"):
+        session = requests.Session()
+        session.headers.update({"User-Agent": "ManifestoLoader/2.0"})
+        _thread_local.session = session
+    return _thread_local.session
 
 
 def normalize_date(date_val):
@@ -48,85 +86,385 @@ def normalize_date(date_val):
     return date_str
 
 
-def fetch_manifesto_text(session, party: str, date: str, retries=3) -> str:
+class BatchRequestError(Exception):
+    """批量请求失败（非200/404/429，或网络错误），调用方应拆小批次重试"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _item_text(item):
     """
-    调用 Manifesto API 获取政党宣言文本
-    若宣言不存在或多次失败则返回 None
+    items 中单条宣言的文本；若为逐句注释格式（嵌套 items）则每句一行拼接，
+    第 i 行即第 i 条注释（句内换行替换为空格以保持对齐）
     """
-    key = f"{party}_{date}"
-    params = {
-        "api_key": API_KEY,
-        "keys[]": key,
-        "version": VERSION,
-        "translation": TRANSLATION
-    }
-
-    for attempt in range(1, retries + 1):
+    if item.get("text") is not None:
+        return item["text"]
+    sentences = item.get("items")
+    if sentences:
+        return "\n".join(" ".join(str(s.get("text", "")).splitlines()) for s in sentences)
+    return None
+
+
+def _item_annotations(item):
+    """逐句注释 [(cmp_code, eu_code), ...]，与 _item_text 的行一一对应；无注释时为 []"""
+    sentences = item.get("items") or []
+    return [(None if s.get("cmp_code") is None else str(s.get("cmp_code")),
+             None if s.get("eu_code") is None else str(s.get("eu_code")))
+            for s in sentences]
+
+
+def _parse_items(data, keys, key_field, label):
+    """校验响应结构并按 key 拆分；格式不对（非字典、items 非列表等）抛出 BatchRequestError"""
+    if not isinstance(data, dict):
+        raise BatchRequestError(f"Malformed response for key={label}: expected a JSON object")
+    items = data.get("items") or []
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise BatchRequestError(f"Malformed response for key={label}: items must be a list of objects")
+    found = {key: None for key in keys}
+    for item in items:
+        sentences = item.get("items")
+        if sentences is not None and (not isinstance(sentences, list)
+                                      or not all(isinstance(s, dict) for s in sentences)):
+            raise BatchRequestError(f"Malformed response for key={label}: nested items must be objects")
+        key = item.get(key_field, keys[0] if len(keys) == 1 else None)
+        if key in found:
+            found[key] = item
+    return found
+
+
+def _request_items(session, url, keys, key_field="key", retries=3, limiter=None) -> dict:
+    """
+    一次请求携带多个 keys[]，返回 {key: item 或 None}（不存在的为 None）
+    多个key的批次出错时立即抛出 BatchRequestError（由调用方拆分重试），
+    单个key的批次则最多重试 retries 次；连续被限流超过 MAX_THROTTLED 次同样抛出
+    """
+    params = [("api_key", API_KEY), ("version", VERSION), ("translation", TRANSLATION)]
+    params += [("keys[]", key) for key in keys]
+    label = keys[0] if len(keys) == 1 else f"{keys[0]}..({len(keys)} keys)"
+    attempts = retries if len(keys) == 1 else 1
+
+    attempt = throttled = 0
+    while attempt < attempts:
+        attempt += 1
         try:
-            resp = session.get(BASE_URL, params=params, timeout=15)
+            if limiter is not None:
+                limiter.acquire()
+            resp = session.get(url, params=params, timeout=15 + len(keys))
             if resp.status_code == 200:
                 try:
                     data = resp.json()
-                    if "items" in data and data["items"]:
-                        return data["items"][0].get("text", None)
-                    return None
                 except Exception as e:
-                    log_error(f"JSON decode error for key={key}: {e}")
-                    return None
+                    log_error(f"JSON decode error for key={label}: {e}")
+                    raise BatchRequestError(str(e))
+                try:
+                    return _parse_items(data, keys, key_field, label)
+                except BatchRequestError as e:
+                    log_error(str(e))
+                    raise
 
             elif resp.status_code == 404:
-                return None
+                return {key: None for key in keys}
+
+            elif resp.status_code == 429:
+                # 被限流：按 Retry-After 暂停所有线程的请求（不计入重试次数，但有上限）
+                throttled += 1
+                if throttled > MAX_THROTTLED:
+                    log_error(f"HTTP 429 for key={label}, giving up after {MAX_THROTTLED} backoffs")
+                    raise BatchRequestError(f"HTTP 429 for key={label}", 429)
+                wait = _retry_after(resp, default=2 ** min(throttled, 6))
+                log_error(f"HTTP 429 for key={label}, backing off {wait}s")
+                if limiter is not None:
+                    limiter.penalize(wait)
+                else:
+                    time.sleep(wait)
+                attempt -= 1
 
             else:
-                log_error(f"HTTP {resp.status_code} for key={key}")
-                time.sleep(2)
+                log_error(f"HTTP {resp.status_code} for key={label}")
+                if resp.status_code in (413, 414):
+                    # 请求/URL过长：重试同样大小没有意义
+                    raise BatchRequestError(f"HTTP {resp.status_code} for key={label}", resp.status_code)
+                if attempt < attempts:
+                    time.sleep(2)
 
         except requests.RequestException as e:
-            log_error(f"Attempt {attempt} failed for key={key}: {e}")
-            time.sleep(3)
+            log_error(f"Attempt {attempt} failed for key={label}: {e}")
+            if attempt < attempts:
+                time.sleep(3)
 
-    return None
+    raise BatchRequestError(f"request failed for key={label}")
+
+
+def fetch_manifesto_batch(session, keys, retries=3, limiter=None) -> dict:
+    """
+    一次请求获取多条宣言（多个 keys[] 参数）
+    返回 {key: item 或 None}（item 为API返回的原始字典，用 _item_text / _item_annotations 解析）；
+    不存在的宣言为 None
+    """
+    return _request_items(session, BASE_URL, keys, "key", retries, limiter)
+
+
+def fetch_metadata_batch(session, keys, retries=3, limiter=None) -> dict:
+    """一次请求获取多条宣言的元数据，返回 {key: metadata 或 None}（含 md5sum_text 等字段）"""
+    return _request_items(session, METADATA_URL, keys, "manifesto_id", retries, limiter)
+
+
+def fetch_manifesto_text(session, party: str, date: str, retries=3, limiter=None) -> str:
+    """
+    调用 Manifesto API 获取政党宣言文本
+    若宣言不存在或多次失败则返回 None
+    limiter: 可选的 TokenBucket，每次请求（包括重试）前先取令牌
+    """
+    key = f"{party}_{date}"
+    try:
+        item = fetch_manifesto_batch(session, [key], retries=retries, limiter=limiter)[key]
+    except BatchRequestError:
+        return None
+    return _item_text(item) if item else None
+
+
+def _retry_after(resp, default: float) -> float:
+    try:
+        return float(resp.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+class BatchScheduler:
+    """
+    线程共享的待抓取队列与自适应批大小
+    失败：批次放回队首并把批大小减半；成功：批大小增加约 1/4（不超过上限）
+    413/414（请求过长）会把上限降到失败批次大小以下，之后不再超过
+    """
+
+    def __init__(self, keys, batch_size=BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE):
+        self.queue = deque(keys)
+        self.size = max(1, min(batch_size, max_batch_size))
+        self.max_size = max_batch_size
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def next_batch(self):
+        """取下一批key；队列为空返回 []，若仍有进行中的批次（可能失败回队）返回 None"""
+        with self.lock:
+            if not self.queue:
+                return None if self.in_flight else []
+            batch = [self.queue.popleft() for _ in range(min(self.size, len(self.queue)))]
+            self.in_flight += 1
+            return batch
+
+    def succeeded(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.size = min(self.max_size, self.size + max(1, self.size // 4))
+
+    def failed(self, batch, too_large=False):
+        with self.lock:
+            self.in_flight -= 1
+            # 放回队首（保持原顺序），下一批按减半后的大小领取
+            self.queue.extendleft(reversed(batch))
+            if too_large:
+                self.max_size = max(1, min(self.max_size, len(batch) - 1))
+            # 比当前批大小更大的失败批次是减半之前发出的，不再重复减半
+            self.size = max(1, min(self.size, len(batch) // 2, self.max_size))
+
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def _batch_worker(scheduler, fetch, handle, limiter, progress):
+    """
+    线程池任务：循环领取批次、请求（fetch）并整批处理结果（handle），直到队列清空
+    单条请求也失败时按不存在处理（{key: None}）；返回 handle 返回值之和
+    fetch 抛出的任何异常都会让批次回到调度器（否则 in_flight 不归零，其他线程会一直等待）
+    """
+    session = get_session()
+    found = 0
+    while True:
+        batch = scheduler.next_batch()
+        if batch is None:
+            time.sleep(0.05)
+            continue
+        if not batch:
+            return found
+        try:
+            items = fetch(session, batch, limiter=limiter)
+        except Exception as e:
+            status = e.status if isinstance(e, BatchRequestError) else None
+            if not isinstance(e, BatchRequestError):
+                log_error(f"Unexpected error for keys {batch[0]}..({len(batch)} keys): {e!r}")
+            if len(batch) > 1:
+                scheduler.failed(batch, too_large=status in (413, 414))
+                continue
+            items = {batch[0]: None}
+            scheduler.done()
+        else:
+            scheduler.succeeded()
+        found += handle(items)
+        progress.update(len(items))
 
 
-def save_manifesto_text(party, date, text):
-    """保存宣言文本到 manifesto_text/party_date.txt"""
-    os.makedirs(SAVE_DIR, exist_ok=True)
-    filename = f"{party}_{date}.txt"
-    filepath = os.path.join(SAVE_DIR, filename)
+def _run_batches(keys, fetch, handle, desc, max_workers=MAX_WORKERS, rate=RATE_LIMIT, burst=BURST,
+                 batch_size=BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE):
+    """max_workers 个线程共享一个令牌桶和批次队列，抓取全部 keys，返回 handle 返回值之和"""
+    limiter = TokenBucket(rate, burst)
+    scheduler = BatchScheduler(list(keys), batch_size, max_batch_size)
+    found = 0
+    with tqdm(total=len(keys), desc=desc) as progress, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_batch_worker, scheduler, fetch, handle, limiter, progress)
+                   for _ in range(max_workers)]
+        for future in as_completed(futures):
+            try:
+                found += future.result()
+            except Exception as e:
+                log_error(f"Unexpected error in fetch worker: {e}")
+    return found
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(text if text else "[No Text Available]")
 
+def _store_texts(store, keys, checksums=None):
+    """返回写入宣言文本的 handle：整批写入存储；给定 checksums 时同时记录取到文本的 md5"""
+    def handle(items):
+        rows = [(*keys[key], _item_text(item) if item else None, _item_annotations(item) if item else [])
+                for key, item in items.items()]
+        store.put_many(rows)
+        if checksums:
+            store.set_checksums([(party, date, checksums[f"{party}_{date}"])
+                                 for party, date, text, _ in rows
+                                 if text is not None and checksums.get(f"{party}_{date}")])
+        return sum(row[2] is not None for row in rows)
+    return handle
 
-def load_manifesto_and_save_texts(path="MPDataset_MPDS2025a.csv", sample_size=None):
-    """读取CSV，通过API获取宣言并保存为TXT"""
-    df = pd.read_csv(path)
+
+def _read_keys(path, sample_size=None):
+    """读取CSV中的 (party, date)，去重后返回 {party_date: (party, date)}"""
+    df = pd.read_csv(path, usecols=["party", "date"])
     if sample_size:
         df = df.sample(min(sample_size, len(df)), random_state=42)
+    keys = {}
+    for party, date in zip(df["party"], df["date"]):
+        party = str(party).strip()
+        date = normalize_date(date)
+        keys[f"{party}_{date}"] = (party, date)
+    return keys
+
+
+def _open_store(store_path):
+    store = ManifestoStore(store_path, VERSION, TRANSLATION)
+    if len(store) == 0 and os.path.isdir(LEGACY_DIR):
+        print(f"Importing legacy TXT files from {LEGACY_DIR}/ ...")
+        store.import_txt_dir(LEGACY_DIR)
+    return store
 
-    os.makedirs(SAVE_DIR, exist_ok=True)
-    existing_files = set(os.listdir(SAVE_DIR))
-    session = requests.Session()
-    session.headers.update({"User-Agent": "ManifestoLoader/2.0"})
 
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Fetching Manifestos"):
-        party = str(row["party"]).strip()
-        date = normalize_date(row["date"])
-        key = f"{party}_{date}"
-        filename = f"{key}.txt"
+def load_manifesto_and_save_texts(path="MPDataset_MPDS2025a.csv", sample_size=None,
+                                  max_workers=MAX_WORKERS, rate=RATE_LIMIT, burst=BURST,
+                                  batch_size=BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE,
+                                  store_path=STORE_PATH):
+    """
+    读取CSV，通过API获取宣言并写入 ManifestoStore
+    max_workers 个线程并发请求，所有线程共享一个令牌桶，总速率不超过 rate 次/秒；
+    每次请求携带 batch_size 个 keys[]（出错自动减半，成功后逐步增大到 max_batch_size）
+    """
+    keys = _read_keys(path, sample_size)
+    store = _open_store(store_path)
+    existing_keys = store.keys()
+
+    # 跳过已抓取的宣言
+    pending = {key: value for key, value in keys.items() if key not in existing_keys}
+    found = _run_batches(pending, fetch_manifesto_batch, _store_texts(store, pending), "Fetching Manifestos",
+                         max_workers, rate, burst, batch_size, max_batch_size)
+
+    print(f"\n共请求 {len(pending)} 条宣言，获取到文本 {found} 条")
+    print(f"\n所有宣言已保存至：{store_path}（共 {len(store)} 条）")
+    store.close()
+    print(f"错误日志记录在：{LOG_FILE}")
+
 
-        # 若文件已存在则跳过
-        if filename in existing_files:
+def sync_manifestos(path="MPDataset_MPDS2025a.csv", sample_size=None,
+                    max_workers=MAX_WORKERS, rate=RATE_LIMIT, burst=BURST,
+                    batch_size=BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE,
+                    store_path=STORE_PATH):
+    """
+    按元数据 md5 增量同步当前 VERSION / TRANSLATION：
+    1. 批量请求元数据接口，取得每条宣言的 md5sum_text
+    2. 本版本已有文本且 md5 相同（或尚未记录 md5）的宣言跳过
+    3. 其他版本中有相同 md5 的宣言在存储内直接复制（不请求）
+    4. 其余（新增、文本变化、之前未取到文本）才下载
+    元数据中不存在的宣言记为无文本
+    """
+    keys = _read_keys(path, sample_size)
+    store = _open_store(store_path)
+
+    metadata = {}
+
+    def collect(items):
+        metadata.update(items)
+        return sum(item is not None for item in items.values())
+
+    _run_batches(keys, fetch_metadata_batch, collect, "Fetching metadata",
+                 max_workers, rate, burst, METADATA_BATCH_SIZE, max(max_batch_size, METADATA_BATCH_SIZE))
+    remote = {key: item.get(MD5_FIELD) for key, item in metadata.items() if item is not None}
+
+    stored = store.keys()
+    with_text = store.keys(include_missing=False)
+    local = store.checksums()
+    sources = store.checksum_sources()
+
+    unchanged, adopted, missing, pending = [], [], [], {}
+    copies = {}  # version -> [(party, date)]
+    for key, (party, date) in keys.items():
+        if key not in remote:
+            if key not in stored:
+                missing.append((party, date, None))
             continue
+        md5 = remote[key]
+        if key in with_text and md5 and local.get(key) in (None, md5):
+            # 同一版本内文本不变；早先未记录 md5 的按元数据补记
+            (unchanged if local.get(key) == md5 else adopted).append((party, date, md5))
+        elif md5 and (key, md5) in sources:
+            copies.setdefault(sources[(key, md5)], []).append((party, date))
+        else:
+            pending[key] = (party, date)
 
-        text = fetch_manifesto_text(session, party, date)
-        save_manifesto_text(party, date, text)
-        time.sleep(0.25)  # 限速保护
+    store.set_checksums(adopted)
+    if missing:
+        store.put_many(missing)
+    copied = sum(store.copy_from_version(version, rows) for version, rows in copies.items())
+    found = _run_batches(pending, fetch_manifesto_batch, _store_texts(store, pending, remote),
+                         "Fetching changed manifestos", max_workers, rate, burst, batch_size, max_batch_size)
 
-    print(f"\n所有宣言已保存至文件夹：{SAVE_DIR}")
+    print(f"\n同步 {len(keys)} 条宣言（version={VERSION}, translation={TRANSLATION}）：")
+    print(f"  未变化 {len(unchanged) + len(adopted)} 条，从其他版本复制 {copied} 条，"
+          f"下载 {len(pending)} 条（取到文本 {found} 条），元数据中不存在 {len(missing)} 条")
+    print(f"\n所有宣言已保存至：{store_path}（共 {len(store)} 条）")
+    store.close()
     print(f"错误日志记录在：{LOG_FILE}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch Manifesto Project texts concurrently.")
+    parser.add_argument("--path", type=str, default="MPDataset_MPDS2025a.csv", help="MPDS CSV file.")
     # sample_size=None 表示处理全部数据
-    load_manifesto_and_save_texts(path="MPDataset_MPDS2025a.csv", sample_size=None)
+    parser.add_argument("--sample", type=int, default=None, help="Only fetch a random sample of rows.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent request threads.")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="Max requests per second (token bucket).")
+    parser.add_argument("--burst", type=int, default=BURST, help="Token bucket capacity.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Initial keys[] per request.")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="Upper bound on keys[] per request.")
+    parser.add_argument("--store", type=str, default=STORE_PATH, help="SQLite manifesto store path.")
+    parser.add_argument("--version", type=str, default=VERSION, help="Corpus version.")
+    parser.add_argument("--translation", type=str, default=TRANSLATION, help="Translation (en / original).")
+    parser.add_argument("--sync", action="store_true",
+                        help="Compare metadata md5 checksums and only fetch new or changed manifestos.")
+    args = parser.parse_args()
+
+    VERSION, TRANSLATION = args.version, args.translation
+    loader = sync_manifestos if args.sync else load_manifesto_and_save_texts
+    loader(path=args.path, sample_size=args.sample,
+           max_workers=args.workers, rate=args.rate, burst=args.burst,
+           batch_size=args.batch_size, max_batch_size=args.max_batch_size,
+           store_path=args.store)
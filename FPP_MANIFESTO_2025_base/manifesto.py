@@ -1,12 +1,72 @@
 # manifesto.py
+import os
+
 import pandas as pd
 
+# 实验主表保留的列及读取类型（其余数百个 perXXX 列不解析）
+KEEP_COLS = [
+    "country", "countryname", "party", "partyname", "partyabbrev",
+    "date", "rile", "planeco", "markeco", "welfare", "intpeace", "id_perm"
+]
+COLUMN_DTYPES = {
+    "country": "Int32",
+    "countryname": "category",
+    "party": "Int64",
+    "partyname": "category",
+    "partyabbrev": "category",
+    "date": "Int64",
+    "rile": "float64",
+    "planeco": "float64",
+    "markeco": "float64",
+    "welfare": "float64",
+    "intpeace": "float64",
+    "id_perm": str,
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow package not installed. Install with: pip install pyarrow")
+
+
+def read_manifesto_columns(path="MPDataset_MPDS2025a.csv", engine="c", parquet_cache=False):
+    """
+    只读取 KEEP_COLS 中的列（usecols + 类型表），国家/政党名称为 category。
+
+    engine="pyarrow" 使用多线程的 pyarrow CSV 解析器；parquet_cache=True 时把投影后的
+    表缓存为 <path>.columns.parquet，CSV 未更新时直接读取缓存（两者都需要 pyarrow）。
+    """
+    cache_path = os.path.splitext(path)[0] + ".columns.parquet"
+    if parquet_cache:
+        _require_pyarrow()
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            return pd.read_parquet(cache_path, engine="pyarrow")
+    if engine == "pyarrow":
+        _require_pyarrow()
+
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in KEEP_COLS if col in header]
+    df = pd.read_csv(path, usecols=usecols, dtype={col: COLUMN_DTYPES[col] for col in usecols}, engine=engine)
+    df = df[usecols]
+
+    if parquet_cache:
+        # 先写临时文件再替换，避免并发读取到半个文件
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, engine="pyarrow", index=False)
+        os.replace(tmp_path, cache_path)
+    return df
+
+
 def load_manifesto_data(
     path="MPDataset_MPDS2025a.csv",
     sample_size=500,
     drop_na=True,
     min_rile=-100,
-    max_rile=100
+    max_rile=100,
+    engine="c",
+    parquet_cache=False
 ):
     """
     加载 Manifesto Project Database 2025a 主数据文件 (MPDataset_MPDS2025a.csv)。
@@ -21,19 +81,15 @@ def load_manifesto_data(
       ['country', 'countryname', 'party', 'partyname',
        'partyabbrev', 'date', 'rile', 'planeco', 'markeco',
        'welfare', 'intpeace', 'id_perm']
-    """
+    （countryname / partyname / partyabbrev 为 category 类型）
 
-    # 1.加载文件
-    df = pd.read_csv(path, low_memory=False)
+    engine / parquet_cache 见 read_manifesto_columns（可选 pyarrow 解析器与 Parquet 缓存）。
+    """
 
-    # 2.仅保留关键列（实验主表）
-    keep_cols = [
-        "country", "countryname", "party", "partyname", "partyabbrev",
-        "date", "rile", "planeco", "markeco", "welfare", "intpeace", "id_perm"
-    ]
+    # 1-2.加载文件，仅读取关键列（实验主表）
     #Manifesto数据集中包含大量的`perXXX`列, 例如: per101, per102, per201, per301, per401, ...
-    #这些列代表人工编码的政策主题比例(quasi-sentences 比例), 每个值表示该政党宣言中该主题的百分比, 因此不作保留.
-    df = df[[col for col in keep_cols if col in df.columns]]
+    #这些列代表人工编码的政策主题比例(quasi-sentences 比例), 每个值表示该政党宣言中该主题的百分比, 因此不作读取.
+    df = read_manifesto_columns(path, engine=engine, parquet_cache=parquet_cache)
 
     # 3. 清洗：去除缺失 RILE 或非法值
     df = df.dropna(subset=["rile"])
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+线程安全的令牌桶限速器（token bucket）
+
+用于并发调用 Manifesto API：
+- rate：每秒补充的令牌数（即长期允许的请求速率）
+- burst：桶容量（允许的瞬时突发请求数）
+
+用法：
+    limiter = TokenBucket(rate=4.0, burst=4)
+    limiter.acquire()   # 阻塞直到拿到一个令牌
+    session.get(...)
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `acquire` blocks until enough tokens are available."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # penalize() 设置的暂停截止时间：在此之前不补充、不发放令牌
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        start = max(self.updated, self.paused_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1.0):
+        """阻塞直到取得 `tokens` 个令牌"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = max(self.paused_until - now, 0.0) + max(tokens - self.tokens, 0.0) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """
+        服务器返回 429/Retry-After 时清空令牌并暂停补充 `seconds` 秒（对所有线程生效）。
+        多个线程同时收到 429 时暂停不叠加：截止时间取最晚的一个。
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.paused_until = max(self.paused_until, now + seconds)
@@ -1,49 +1,331 @@
 # run.py
+"""
+并发 RILE 预测：
+- --workers 个线程并发请求，同一模型共享一个令牌桶（--rate 次/秒），限流时暂停所有线程
+- 请求失败自动重试（指数退避 + 随机抖动）；多次失败或无法解析的输出记录在 error 列，不会混入预测结果
+- 每条结果完成即追加写入 CSV；重新运行时跳过已成功的宣言（断点续传），失败的重新请求
+- 宣言文本从 data_loader_v2.py 生成的 ManifestoStore 中按 party_date 读取
+- 分段模式（--chunk-tokens）：长宣言切成不超过 N token 的段，各段并发评分后按准句数加权汇总，
+  --max-manifesto-tokens 限制每条宣言的总输入 token（见 chunking.py）
+- 抽取式压缩（--compress-tokens）：提示前在本地用 TF-IDF 对照 RILE 词表选出最有信息量的准句，
+  结果按宣言缓存（见 compression.py）；text_tokens 列记录实际送入模型的文本 token 数
+
+    python run.py --model gpt-4o-mini --sample 500 --workers 8 --rate 4
+    python run.py --model gpt-4o-mini --chunk-tokens 1500 --max-manifesto-tokens 12000
+    python run.py --model gpt-4o-mini --compress-tokens 1200
+"""
 import argparse
+import csv
 import json
+import os
+import random
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 import tqdm
 
+from chunking import aggregate_rile, chunk_text, estimate_tokens
+from compression import compress_manifesto, split_summary_header
 from manifesto import load_manifesto_data
+from manifesto_store import ManifestoStore, NO_TEXT_PLACEHOLDER
 from Identity import ManifestoIdentity
 from bedrock_client import query_model
+from rate_limit import TokenBucket
+
+RESULT_COLUMNS = ["country", "party", "party_code", "year", "true_rile",
+                  "predicted_rile", "rationale", "error", "attempts", "segments", "text_tokens"]
+THROTTLE_MARKERS = ("ThrottlingException", "Too many requests", "Rate limit", "rate_limit", "429")
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model_id, rate, burst=1):
+    """每个模型一个令牌桶（同一进程内所有线程共享）"""
+    with _limiters_lock:
+        if model_id not in _limiters:
+            _limiters[model_id] = TokenBucket(rate, burst)
+        return _limiters[model_id]
+
+
+def attach_texts(df, store_path, version="2024-1", translation="en"):
+    """按 party_date 从 ManifestoStore 读取宣言文本，写入 text 列（无文本时为占位符）"""
+    texts = {}
+    if store_path and os.path.exists(store_path):
+        store = ManifestoStore(store_path, version, translation)
+        texts = store.load_texts()
+        store.close()
+    keys = df["party"].astype(str) + "_" + df["date"].astype(str)
+    df = df.copy()
+    df["text"] = keys.map(texts).fillna(NO_TEXT_PLACEHOLDER)
+    print(f"Attached manifesto texts for {keys.isin(texts).sum()}/{len(df)} manifestos from {store_path}.")
+    return df
+
+
+def compress_texts(df, token_budget, top_k=None):
+    """对每条宣言做抽取式压缩（按 party_date 缓存），替换 text 列"""
+    df = df.copy()
+    before = after = 0
+    compressed = []
+    for party, date, text in zip(df["party"], df["date"], df["text"]):
+        short, stats = compress_manifesto(text, token_budget, top_k, key=f"{party}_{date}")
+        compressed.append(short)
+        before += stats["original_tokens"]
+        after += stats["tokens"]
+    df["text"] = compressed
+    print(f"Compressed manifesto texts: {before:,} -> {after:,} tokens ({after / max(1, before):.1%}).")
+    return df
+
+
+def parse_prediction(generation):
+    """从模型输出中取出 JSON（允许前后有多余文字）；解析失败时尝试直接提取数值"""
+    match = re.search(r"\{.*\}", generation, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except ValueError:
+            pass
+    number = re.search(r'"?predicted_rile"?\s*[:=]\s*(-?\d+(?:\.\d+)?)', generation)
+    if number:
+        return {"predicted_rile": float(number.group(1)), "rationale": generation.strip()}
+    raise ValueError(f"Unparseable response: {generation[:200]!r}")
+
+
+def call_with_retries(fn, limiter, retries=4, base_delay=1.0, max_delay=30.0):
+    """
+    调用 fn()，失败时重试：第 k 次等待 U(0, min(max_delay, base_delay * 2**k)) 秒（full jitter，
+    避免多个线程同时重试）；限流错误还会暂停令牌桶，让所有线程一起退避
+    返回 (结果, 尝试次数)；全部失败时抛出最后一次的异常
+    """
+    for attempt in range(1, retries + 1):
+        limiter.acquire()
+        try:
+            return fn(), attempt
+        except Exception as e:
+            if attempt == retries:
+                raise
+            wait = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if any(marker in str(e) for marker in THROTTLE_MARKERS):
+                limiter.penalize(wait)
+            else:
+                time.sleep(wait)
+
+
+def query_prompt(prompt, model_id, limiter, retries=4):
+    """调用模型并解析，返回 {"predicted_rile", "rationale", "error", "attempts"}"""
+    result = {"predicted_rile": None, "rationale": None, "error": None, "attempts": 0}
+    try:
+        response, result["attempts"] = call_with_retries(
+            lambda: query_model(model_id=model_id, prompt=prompt), limiter, retries)
+    except Exception as e:
+        result["attempts"] = retries
+        result["error"] = str(e)
+        return result
+    try:
+        # 解析失败不重试（temperature=0 时重试得到相同输出）
+        parsed = parse_prediction(response.get("generation", ""))
+        result["predicted_rile"] = float(parsed["predicted_rile"])
+        result["rationale"] = parsed.get("rationale")
+    except (KeyError, TypeError, ValueError) as e:
+        result["error"] = f"Invalid prediction: {e}"
+    return result
+
+
+def _result_row(row, identity):
+    return {
+        "country": identity.country,
+        "party": identity.party,
+        "party_code": row["party"],
+        "year": identity.date,
+        "true_rile": identity.true_rile,
+    }
+
+
+def predict_rile(row, model_id, limiter, retries=4):
+    """单条宣言：构造提示词、调用模型并解析，返回结果行"""
+    identity = ManifestoIdentity(row)
+    result = _result_row(row, identity)
+    result.update(query_prompt(identity.build_prompt(), model_id, limiter, retries))
+    result["segments"] = 1
+    result["text_tokens"] = estimate_tokens(identity.text)
+    return result
+
+
+def has_text(text):
+    """宣言是否有可用文本（商店中缺失的宣言为占位符）"""
+    return isinstance(text, str) and text.strip() != "" and text != NO_TEXT_PLACEHOLDER
+
+
+def missing_text_result(row):
+    """没有文本的宣言不调用模型，直接在 error 列记录（续跑时会再次尝试）"""
+    identity = ManifestoIdentity(row)
+    result = _result_row(row, identity)
+    result.update({"predicted_rile": None, "rationale": None, "error": "No text available",
+                   "attempts": 0, "segments": 0, "text_tokens": 0})
+    return result
+
+
+def plan_segments(row, chunk_tokens, max_manifesto_tokens=None):
+    """
+    分段模式：一条宣言 -> (identity, [(prompt, 权重, token数), ...])（权重为段内准句数）
+    压缩文本的说明行不参与分段（不算作准句），而是放在每一段的开头
+    """
+    identity = ManifestoIdentity(row)
+    header, body = split_summary_header(identity.text)
+    segments = chunk_text(body, chunk_tokens, max_manifesto_tokens)
+    context, context_tokens = (f"{header}\n", estimate_tokens(header)) if header else ("", 0)
+    return identity, [(identity.build_prompt(text=context + seg["text"], segment=(k + 1, len(segments))),
+                       seg["units"], seg["tokens"] + context_tokens) for k, seg in enumerate(segments)]
+
+
+def combine_segments(row, identity, segment_results, weights, text_tokens=0):
+    """汇总各段结果：RILE 按准句数加权平均；部分段失败时用其余段，全部失败才记为错误"""
+    result = _result_row(row, identity)
+    rile, scored = aggregate_rile([(r["predicted_rile"], w) for r, w in zip(segment_results, weights)])
+    errors = [r["error"] for r in segment_results if r["error"]]
+    result.update({
+        "predicted_rile": rile,
+        "rationale": " | ".join(r["rationale"] for r in segment_results if r["rationale"]) or None,
+        "error": None if rile is not None else (errors[0] if errors else "No segments"),
+        "attempts": sum(r["attempts"] for r in segment_results),
+        "segments": f"{scored}/{len(segment_results)}",
+        "text_tokens": text_tokens,
+    })
+    return result
+
+
+class ResultWriter:
+    """线程安全的增量 CSV 写入：每条结果写完即 flush，崩溃后已完成的结果不丢失"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        fieldnames = RESULT_COLUMNS
+        if not new_file:
+            # 续写旧文件时沿用其表头
+            with open(path, newline="", encoding="utf-8") as f:
+                fieldnames = next(csv.reader(f))
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction="ignore")
+        if new_file:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def write(self, row):
+        with self.lock:
+            self.writer.writerow(row)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def completed_keys(path):
+    """已成功预测的 (party_code, year)，用于断点续传"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    done = pd.read_csv(path, dtype={"party_code": str, "year": str})
+    done = done[done["predicted_rile"].notna()]
+    return set(zip(done["party_code"], done["year"]))
+
+
+def finalize_results(path, df):
+    """按输入顺序重写结果文件：每条宣言只保留最后一次结果"""
+    results = pd.read_csv(path, dtype={"party_code": str, "year": str})
+    results = results.drop_duplicates(subset=["party_code", "year"], keep="last")
+    order = pd.DataFrame({"party_code": df["party"].astype(str).to_numpy(), "year": df["date"].astype(str).to_numpy()})
+    results = order.merge(results, on=["party_code", "year"], how="inner").reindex(columns=RESULT_COLUMNS)
+    results.to_csv(path, index=False)
+    return results
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", type=str, required=True, help="Model ID (e.g. gpt-4o-mini or meta.llama3-1-70b-instruct-v1:0)")
     parser.add_argument("--sample", type=int, default=500)
-    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent model requests.")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max requests per second for this model.")
+    parser.add_argument("--burst", type=int, default=2, help="Token bucket capacity.")
+    parser.add_argument("--retries", type=int, default=4, help="Attempts per manifesto.")
+    parser.add_argument("--store", type=str, default="manifesto_store.sqlite", help="Manifesto text store.")
+    parser.add_argument("--out", type=str, default=None, help="Output CSV (default: manifesto_results_base_<model>.csv).")
+    parser.add_argument("--chunk-tokens", type=int, default=0,
+                        help="Split manifestos into segments of at most this many tokens (0 = whole text in one prompt).")
+    parser.add_argument("--max-manifesto-tokens", type=int, default=None,
+                        help="Cap on the total text tokens sent per manifesto in chunked mode.")
+    parser.add_argument("--compress-tokens", type=int, default=0,
+                        help="Extractively compress each manifesto to about this many tokens before prompting (0 = off).")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="Maximum number of quasi-sentences kept per manifesto when compressing.")
     args = parser.parse_args()
 
     print(f"Loading Manifesto dataset (sample_size={args.sample}) ...")
-    df = load_manifesto_data(sample_size=args.sample)
-
-    results = []
-    for _, row in tqdm.tqdm(df.iterrows(), total=len(df)):
-        identity = ManifestoIdentity(row)
-        prompt = identity.build_prompt()
-
-        try:
-            response = query_model(prompt, model_id=args.model)
-            parsed = json.loads(response)
-        except Exception as e:
-            parsed = {"predicted_rile": None, "rationale": str(e)}
+    df = attach_texts(load_manifesto_data(sample_size=args.sample), args.store)
 
-        results.append({
-            "country": identity.country,
-            "party": identity.party,
-            "year": identity.date,
-            "true_rile": identity.true_rile,
-            "predicted_rile": parsed.get("predicted_rile"),
-            "rationale": parsed.get("rationale")
-        })
+    out_path = args.out or f"manifesto_results_base_{args.model.replace('/', '_')}.csv"
+    done = completed_keys(out_path)
+    pending = df[[key not in done for key in zip(df["party"].astype(str), df["date"].astype(str))]]
+    if done:
+        print(f"Resuming: {len(df) - len(pending)} manifestos already predicted in {out_path}.")
+    # 没有文本的宣言不发送给模型
+    with_text = pending["text"].map(has_text).astype(bool)
+    skipped = [row for _, row in pending[~with_text].iterrows()]
+    pending = pending[with_text]
+    if skipped:
+        print(f"Skipping {len(skipped)} manifestos without text.")
+    # 只压缩尚未预测的宣言
+    if args.compress_tokens and len(pending):
+        pending = compress_texts(pending, args.compress_tokens, args.top_k)
+    pending = [row for _, row in pending.iterrows()]
 
-        time.sleep(args.delay)
+    limiter = get_limiter(args.model, args.rate, args.burst)
+    writer = ResultWriter(out_path)
+    for row in skipped:
+        writer.write(missing_text_result(row))
+    failures = len(skipped)
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        if not args.chunk_tokens:
+            futures = [executor.submit(predict_rile, row, args.model, limiter, args.retries) for row in pending]
+            for future in tqdm.tqdm(as_completed(futures), total=len(futures)):
+                result = future.result()
+                failures += result["error"] is not None
+                writer.write(result)
+        else:
+            # 所有宣言的所有段一起提交；某条宣言的最后一段完成时汇总并写出
+            futures, plans = {}, {}
+            for i, row in enumerate(pending):
+                identity, segments = plan_segments(row, args.chunk_tokens, args.max_manifesto_tokens)
+                plans[i] = (row, identity, [w for _, w, _ in segments], [None] * len(segments),
+                            sum(t for _, _, t in segments))
+                for k, (prompt, _, _) in enumerate(segments):
+                    futures[executor.submit(query_prompt, prompt, args.model, limiter, args.retries)] = (i, k)
+            remaining = {i: len(plan[2]) for i, plan in plans.items()}
+            print(f"Scoring {len(futures)} segments of {len(pending)} manifestos.")
+            with tqdm.tqdm(total=len(pending)) as progress:
+                for i in [i for i, n in remaining.items() if n == 0]:
+                    writer.write(combine_segments(plans[i][0], plans[i][1], [], []))
+                    failures += 1
+                    progress.update(1)
+                for future in as_completed(futures):
+                    i, k = futures[future]
+                    row, identity, weights, segment_results, text_tokens = plans[i]
+                    segment_results[k] = future.result()
+                    remaining[i] -= 1
+                    if remaining[i] == 0:
+                        result = combine_segments(row, identity, segment_results, weights, text_tokens)
+                        failures += result["error"] is not None
+                        writer.write(result)
+                        del plans[i]
+                        progress.update(1)
+    writer.close()
 
-    out_path = f"manifesto_results_base_{args.model.replace('/', '_')}.csv"
-    pd.DataFrame(results).to_csv(out_path, index=False)
+    results = finalize_results(out_path, df)
+    print(f"Predicted {results['predicted_rile'].notna().sum()}/{len(df)} manifestos ({failures} failed this run).")
     print(f"Results saved to {out_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
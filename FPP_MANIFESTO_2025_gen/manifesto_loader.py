@@ -1,27 +1,112 @@
 # ==========================================================
 # FPP_MANIFESTO_2025_gen/manifesto_loader.py
 # ==========================================================
+import numpy as np
 import pandas as pd
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
 from tqdm import tqdm
 
 MODEL_NAME = "manifesto-project/manifestoberta-56topics-sentence"
 
-def generate_policy_topics(input_csv):
-    """
-    Load manifesto sentences and run ManifestoBERTa to get topic distribution.
-    Returns a DataFrame grouped by party, country, year, with average topic probs.
-    """
+# The 56 main categories of the Manifesto coding scheme, in the label order of
+# ManifestoBERTa (ascending code).
+MANIFESTO_TOPICS = (
+    [str(c) for c in range(101, 111)] + [str(c) for c in range(201, 205)]
+    + [str(c) for c in range(301, 306)] + [str(c) for c in range(401, 417)]
+    + [str(c) for c in range(501, 508)] + [str(c) for c in range(601, 609)]
+    + [str(c) for c in range(701, 707)]
+)
+_TOPIC_INDEX = {code: i for i, code in enumerate(MANIFESTO_TOPICS)}
+
+
+def _main_category(cmp_code):
+    """'201.2' / '103_1' -> '201' / '103'; uncoded and headline sentences -> None."""
+    if cmp_code is None:
+        return None
+    code = str(cmp_code).replace("_", ".").split(".")[0]
+    return code if code in _TOPIC_INDEX else None
+
+
+def _load_manifestoberta():
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
     print(f"Loading ManifestoBERTa model: {MODEL_NAME}")
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
     model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
     model.eval()
+    return torch, tokenizer, model
+
+
+def gold_topic_distributions(store_path, version="2024-1", translation="en"):
+    """
+    Topic distributions from the hand-coded quasi-sentences in the manifesto
+    store: share of coded sentences per main category, aggregated in SQL
+    (no model inference). Returns {(party, date): np.ndarray of 56 shares},
+    keyed by the yyyymm election date of each manifesto.
+    """
+    from manifesto_store import ManifestoStore
+    store = ManifestoStore(store_path, version, translation)
+    counts = store.code_counts()
+    store.close()
+    counts["topic"] = counts["cmp_code"].map(_main_category)
+    counts = counts.dropna(subset=["topic"])
+
+    distributions = {}
+    for (party, date), subset in counts.groupby(["party", "date"]):
+        dist = np.bincount(subset["topic"].map(_TOPIC_INDEX).to_numpy(), weights=subset["count"].to_numpy(),
+                           minlength=len(MANIFESTO_TOPICS))
+        distributions[(str(party), str(date))] = dist / dist.sum()
+    return distributions
+
 
+def _gold_key(gold, party, year):
+    """
+    Key of the gold distribution for a sentence group, or None. `year` is a
+    yyyymm date (matched exactly) or a year, which only matches when the party
+    has a single coded manifesto that year (two elections in one year, e.g.
+    February and October 1974, are ambiguous and go to the model).
+    """
+    when = str(year)
+    if len(when) >= 6:
+        key = (str(party), when[:6])
+        return key if key in gold else None
+    dates = [key for key in gold if key[0] == str(party) and key[1][:4] == when[:4]]
+    return dates[0] if len(dates) == 1 else None
+
+
+def generate_policy_topics(input_csv, store_path=None, version="2024-1", translation="en"):
+    """
+    Load manifesto sentences and run ManifestoBERTa to get topic distribution.
+    Returns a DataFrame grouped by party, country, year, with average topic probs.
+
+    With `store_path` (a manifesto store filled by data_loader_v2.py), groups
+    whose manifesto carries gold quasi-sentence codes in the store's
+    `version` / `translation` use the coded topic shares instead; the model is
+    only loaded for the remaining groups.
+    """
     df = pd.read_csv(input_csv)
-    grouped = []
+    gold = gold_topic_distributions(store_path, version, translation) if store_path else {}
+    groups = list(df.groupby(["party", "country", "year"]))
+    keys = {group: _gold_key(gold, group[0], group[2]) for group, _ in groups}
+    pending = [g for g in groups if keys[g[0]] is None]
+    if gold:
+        print(f"Gold-coded topic distributions for {len(groups) - len(pending)}/{len(groups)} manifestos.")
 
-    for (party, country, year), subset in tqdm(df.groupby(["party", "country", "year"])):
+    model = None
+    if pending:
+        torch, tokenizer, model = _load_manifestoberta()
+
+    grouped = []
+    for (party, country, year), subset in tqdm(groups):
+        key = keys[(party, country, year)]
+        if key is not None:
+            grouped.append({
+                "party": party,
+                "country": country,
+                "year": year,
+                "topic_distribution": gold[key].tolist(),
+                "topic_source": "gold"
+            })
+            continue
         inputs = tokenizer(list(subset["text"]), truncation=True, padding=True, return_tensors="pt")
         with torch.no_grad():
             logits = model(**inputs).logits
@@ -31,8 +116,8 @@ def generate_policy_topics(input_csv):
             "party": party,
             "country": country,
             "year": year,
-            "topic_distribution": mean_probs.tolist()
+            "topic_distribution": mean_probs.tolist(),
+            "topic_source": "manifestoberta"
         })
 
     return pd.DataFrame(grouped)
-
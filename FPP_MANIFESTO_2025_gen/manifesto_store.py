@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+宣言文本存储：单个 SQLite 文件代替 manifesto_text/ 下每条宣言一个TXT
+
+- 主键 (party, date, version, translation)：存在性检查是一次索引查找，不扫描文件系统
+- 文本以 zlib 压缩的 BLOB 保存（标准库即可，无需额外依赖）
+- WAL 模式：抓取线程写入的同时可以读取；每批一个事务
+- 不存在的宣言也会记录（text 为 NULL），断点续传时同样跳过
+- 逐句注释（cmp_code / eu_code）存于 annotations 表，按 (宣言, 句序号) 和 (cmp_code) 建索引；
+  文本第 pos 行即第 pos 条注释，主题分布可直接在 SQL 中聚合
+- checksums 表记录每条宣言在 API 元数据中的 md5（版本间增量同步：md5 未变的宣言
+  直接从旧版本复制，不再请求）
+
+用法：
+    store = ManifestoStore("manifesto_store.sqlite", version="2024-1", translation="en")
+    store.put_many([("11220", "196009", "...text...")])
+    store.has("11220", "196009")
+    texts = store.load_texts()          # 一次顺序读取全部 {party_date: text}
+    counts = store.code_counts()        # 每条宣言每个 cmp_code 的句数（GROUP BY）
+    store.export_annotations_parquet("annotations.parquet")   # 列式导出（需要 pyarrow）
+
+旧的 manifesto_text/*.txt 可一次性导入：
+    python manifesto_store.py --import-dir manifesto_text
+    python manifesto_store.py --export-annotations annotations.parquet
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_STORE = "manifesto_store.sqlite"
+NO_TEXT_PLACEHOLDER = "[No Text Available]"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifestos (
+    party       TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    text        BLOB,
+    fetched_at  TEXT NOT NULL,
+    PRIMARY KEY (party, date, version, translation)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS annotations (
+    party       TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    pos         INTEGER NOT NULL,
+    cmp_code    TEXT,
+    eu_code     TEXT,
+    PRIMARY KEY (party, date, version, translation, pos)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS annotations_cmp_code ON annotations (cmp_code, version, translation);
+CREATE TABLE IF NOT EXISTS checksums (
+    party       TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    md5         TEXT NOT NULL,
+    PRIMARY KEY (party, date, version, translation)
+) WITHOUT ROWID;
+"""
+
+
+def _compress(text):
+    return None if text is None else zlib.compress(text.encode("utf-8"), 6)
+
+
+def _decompress(blob):
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+
+class ManifestoStore:
+    """
+    Compressed manifesto text store keyed by party/date/version/translation.
+    One connection shared by all threads, guarded by a lock.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, version="2024-1", translation="en"):
+        self.path = path
+        self.version = version
+        self.translation = translation
+        self.lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    # ---------- 写入 ----------
+    def put_many(self, rows):
+        """
+        rows: [(party, date, text 或 None), ...] 或 [(party, date, text, annotations), ...]，
+        annotations 为逐句 [(cmp_code, eu_code), ...]。同一事务写入（已存在则覆盖；
+        带注释的行同时替换该宣言原有的注释）
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        records, annotated, sentences = [], [], []
+        for row in rows:
+            party, date, text = str(row[0]), str(row[1]), row[2]
+            records.append((party, date, self.version, self.translation, _compress(text), now))
+            if len(row) > 3:
+                annotated.append((party, date, self.version, self.translation))
+                sentences.extend((party, date, self.version, self.translation, pos, cmp_code, eu_code)
+                                 for pos, (cmp_code, eu_code) in enumerate(row[3] or []))
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO manifestos VALUES (?, ?, ?, ?, ?, ?)", records)
+            self.conn.executemany(
+                "DELETE FROM annotations WHERE party=? AND date=? AND version=? AND translation=?", annotated)
+            self.conn.executemany(
+                "INSERT INTO annotations VALUES (?, ?, ?, ?, ?, ?, ?)", sentences)
+            self.conn.commit()
+
+    def put(self, party, date, text, annotations=None):
+        self.put_many([(party, date, text) if annotations is None else (party, date, text, annotations)])
+
+    # ---------- 查询 ----------
+    def has(self, party, date):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM manifestos WHERE party=? AND date=? AND version=? AND translation=?",
+                (str(party), str(date), self.version, self.translation)).fetchone()
+        return row is not None
+
+    def get(self, party, date):
+        """宣言文本；不存在或API无文本时返回 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT text FROM manifestos WHERE party=? AND date=? AND version=? AND translation=?",
+                (str(party), str(date), self.version, self.translation)).fetchone()
+        return None if row is None else _decompress(row[0])
+
+    def keys(self, include_missing=True):
+        """已存储的 party_date 集合，供断点续传一次性判断；include_missing=False 时只含有文本的宣言"""
+        query = "SELECT party, date FROM manifestos WHERE version=? AND translation=?"
+        if not include_missing:
+            query += " AND text IS NOT NULL"
+        with self.lock:
+            rows = self.conn.execute(query, (self.version, self.translation)).fetchall()
+        return {f"{party}_{date}" for party, date in rows}
+
+    def iter_texts(self, include_missing=False):
+        """按主键顺序读取 (party, date, text)"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT party, date, text FROM manifestos WHERE version=? AND translation=? ORDER BY party, date",
+                (self.version, self.translation)).fetchall()
+        for party, date, blob in rows:
+            if blob is not None or include_missing:
+                yield party, date, _decompress(blob)
+
+    def load_texts(self):
+        """{party_date: text}，只包含有文本的宣言"""
+        return {f"{party}_{date}": text for party, date, text in self.iter_texts()}
+
+    # ---------- 逐句注释 ----------
+    def get_annotations(self, party, date):
+        """单条宣言的逐句注释 [(cmp_code, eu_code), ...]（按句序）"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT cmp_code, eu_code FROM annotations "
+                "WHERE party=? AND date=? AND version=? AND translation=? ORDER BY pos",
+                (str(party), str(date), self.version, self.translation)).fetchall()
+        return rows
+
+    def code_counts(self):
+        """
+        每条宣言每个 cmp_code 的句数（SQL GROUP BY，不解压文本）
+        返回 DataFrame[party, date, cmp_code, count]；未编码的句子 cmp_code 为 None
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT party, date, cmp_code, COUNT(*) FROM annotations "
+                "WHERE version=? AND translation=? GROUP BY party, date, cmp_code ORDER BY party, date, cmp_code",
+                (self.version, self.translation)).fetchall()
+        return pd.DataFrame(rows, columns=["party", "date", "cmp_code", "count"])
+
+    def load_annotations(self):
+        """全部逐句注释 DataFrame[party, date, pos, cmp_code, eu_code]（编码列为 category）"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT party, date, pos, cmp_code, eu_code FROM annotations "
+                "WHERE version=? AND translation=? ORDER BY party, date, pos",
+                (self.version, self.translation)).fetchall()
+        frame = pd.DataFrame(rows, columns=["party", "date", "pos", "cmp_code", "eu_code"])
+        for col in ("party", "date", "cmp_code", "eu_code"):
+            frame[col] = frame[col].astype("category")
+        frame["pos"] = frame["pos"].astype("int32")
+        return frame
+
+    def export_annotations_parquet(self, path):
+        """把逐句注释写成 Parquet（按宣言、句序排序，编码列为字典编码），返回行数"""
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("pyarrow package not installed. Install with: pip install pyarrow")
+        frame = self.load_annotations()
+        frame.to_parquet(path, engine="pyarrow", index=False)
+        return len(frame)
+
+    # ---------- 增量同步 ----------
+    def checksums(self):
+        """{party_date: md5}：本版本已记录的元数据 md5"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT party, date, md5 FROM checksums WHERE version=? AND translation=?",
+                (self.version, self.translation)).fetchall()
+        return {f"{party}_{date}": md5 for party, date, md5 in rows}
+
+    def set_checksums(self, rows):
+        """rows: [(party, date, md5), ...]"""
+        records = [(str(party), str(date), self.version, self.translation, md5) for party, date, md5 in rows]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?)", records)
+            self.conn.commit()
+
+    def checksum_sources(self):
+        """
+        {(party_date, md5): version}：其他版本（同一 translation）中已有文本且记录了 md5 的宣言，
+        用于查找可直接复制、无需重新下载的副本
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT c.party, c.date, c.md5, c.version FROM checksums c "
+                "JOIN manifestos m USING (party, date, version, translation) "
+                "WHERE c.translation=? AND c.version<>? AND m.text IS NOT NULL ORDER BY c.version",
+                (self.translation, self.version)).fetchall()
+        return {(f"{party}_{date}", md5): version for party, date, md5, version in rows}
+
+    def copy_from_version(self, version, rows):
+        """
+        把 version 中的宣言（文本、逐句注释、md5）复制到当前版本，一个事务完成
+        rows: [(party, date), ...]；返回复制条数
+        """
+        rows = [(str(party), str(date)) for party, date in rows]
+        with self.lock:
+            for table in ("manifestos", "checksums"):
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} SELECT party, date, ?, translation, "
+                    + ("text, fetched_at" if table == "manifestos" else "md5")
+                    + f" FROM {table} WHERE party=? AND date=? AND version=? AND translation=?",
+                    [(self.version, party, date, version, self.translation) for party, date in rows])
+            self.conn.executemany(
+                "DELETE FROM annotations WHERE party=? AND date=? AND version=? AND translation=?",
+                [(party, date, self.version, self.translation) for party, date in rows])
+            self.conn.executemany(
+                "INSERT INTO annotations SELECT party, date, ?, translation, pos, cmp_code, eu_code "
+                "FROM annotations WHERE party=? AND date=? AND version=? AND translation=?",
+                [(self.version, party, date, version, self.translation) for party, date in rows])
+            self.conn.commit()
+        return len(rows)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM manifestos WHERE version=? AND translation=?",
+                (self.version, self.translation)).fetchone()[0]
+
+    # ---------- 迁移 ----------
+    def import_txt_dir(self, directory, batch_size=1000):
+        """把旧格式的 party_date.txt 导入存储（占位文本记为无文本），返回导入条数"""
+        batch, imported = [], 0
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".txt") or "_" not in filename:
+                continue
+            party, date = filename[:-4].split("_", 1)
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                text = f.read()
+            batch.append((party, date, None if text == NO_TEXT_PLACEHOLDER else text))
+            if len(batch) >= batch_size:
+                self.put_many(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            self.put_many(batch)
+            imported += len(batch)
+        return imported
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or populate the manifesto text store.")
+    parser.add_argument("--store", type=str, default=DEFAULT_STORE, help="SQLite store path.")
+    parser.add_argument("--version", type=str, default="2024-1", help="Corpus version.")
+    parser.add_argument("--translation", type=str, default="en", help="Translation (en / original).")
+    parser.add_argument("--import-dir", type=str, default=None, help="Import legacy party_date.txt files.")
+    parser.add_argument("--export-annotations", type=str, default=None,
+                        help="Write the quasi-sentence annotations to this Parquet file.")
+    args = parser.parse_args()
+
+    store = ManifestoStore(args.store, args.version, args.translation)
+    if args.import_dir:
+        print(f"Imported {store.import_txt_dir(args.import_dir)} manifestos from {args.import_dir}")
+    if args.export_annotations:
+        rows = store.export_annotations_parquet(args.export_annotations)
+        print(f"Exported {rows} annotated quasi-sentences to {args.export_annotations}")
+    print(f"{len(store)} manifestos stored in {args.store} (version={args.version}, translation={args.translation})")
+    store.close()
@@ -13,9 +13,10 @@ def main(args):
     print("=== FPP_MANIFESTO_2025_gen: Cross-national experiment (LLM-generated Ideology) ===")
     print(f"Using model: {args.model}")
 
-    # Step 1: ManifestoBERTa inference — extract 56-topic policy distributions
+    # Step 1: ManifestoBERTa inference (or gold codes) — extract 56-topic policy distributions
     print("Generating policy-topic distributions using ManifestoBERTa...")
-    df = generate_policy_topics(args.manifesto_csv)
+    df = generate_policy_topics(args.manifesto_csv, store_path=args.manifesto_store,
+                                version=args.version, translation=args.translation)
     print(f"Extracted topic features for {len(df)} manifestos.")
 
     # Step 2: LLM generates ideological embeddings
@@ -54,5 +55,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", type=str, required=True)
     parser.add_argument("--manifesto_csv", type=str, default="../../data/manifesto_sentences.csv")
+    parser.add_argument("--manifesto_store", type=str, default=None,
+                        help="Manifesto store (data_loader_v2.py) with quasi-sentence codes; "
+                             "gold-coded manifestos skip ManifestoBERTa inference.")
+    parser.add_argument("--version", type=str, default="2024-1",
+                        help="Corpus version of the manifesto store to read (as in data_loader_v2.py).")
+    parser.add_argument("--translation", type=str, default="en",
+                        help="Translation of the manifesto store to read: en or original.")
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,69 @@
+"""
+Shared helpers for the test suite.
+
+Every project folder is a flat directory of scripts that import their
+siblings by bare name (``from anes import data``), and several folders ship
+modules with the same name (Identity.py, run.py, ...). ``load`` imports a
+module from one folder and evicts same-named modules that were imported from
+another folder first.
+"""
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load(folder, name):
+    """Import `name` from the project folder `folder` (e.g. "FPP_ANES_2016_base")."""
+    path = (ROOT / folder).resolve()
+    for sibling in path.glob("*.py"):
+        module = sys.modules.get(sibling.stem)
+        module_file = getattr(module, "__file__", None)
+        if module_file and Path(module_file).resolve().parent != path:
+            del sys.modules[sibling.stem]
+    if str(path) in sys.path:
+        sys.path.remove(str(path))
+    sys.path.insert(0, str(path))
+    return importlib.import_module(name)
+
+
+@pytest.fixture
+def anes_folder(monkeypatch):
+    """Run inside FPP_ANES_2016_base (anes.py reads the survey CSV from the working directory)."""
+    folder = ROOT / "FPP_ANES_2016_base"
+    monkeypatch.chdir(folder)
+    return folder
+
+
+@pytest.fixture
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def manifesto_run(in_tmp, monkeypatch):
+    """
+    FPP_MANIFESTO_2025_base/run.py with bedrock_client replaced by a fake model
+    (boto3 is not needed). Prompts are recorded in run.prompts; run.respond(prompt)
+    returns the generation (a fixed RILE of 10 unless a test replaces it).
+    """
+    prompts = []
+
+    def query_model(model_id, prompt):
+        prompts.append(prompt)
+        return {"generation": module.respond(prompt)}
+
+    monkeypatch.setitem(sys.modules, "bedrock_client", types.SimpleNamespace(query_model=query_model))
+    monkeypatch.delitem(sys.modules, "run", raising=False)
+    module = load("FPP_MANIFESTO_2025_base", "run")
+    module.prompts = prompts
+    module.respond = lambda prompt: '{"predicted_rile": 10, "rationale": "stub"}'
+    yield module
+    sys.modules.pop("run", None)
+    sys.modules.pop("bedrock_client", None)
@@ -0,0 +1,118 @@
+"""
+Local stand-in for the Manifesto Project API (texts_and_annotations and
+metadata endpoints), used to exercise data_loader_v2.py without network access.
+
+    with ManifestoStub(max_keys=10, throttle_every=5) as stub:
+        data_loader_v2.BASE_URL = stub.texts_url
+        ...
+        stub.requests   # [(time, path, keys), ...]
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def stub_text(key, version="2024-1"):
+    return [f"{key} sentence {i} ({version})" for i in range(3)]
+
+
+class ManifestoStub:
+    """
+    Parameters
+    ----------
+    missing : set of keys the corpus does not contain.
+    max_keys : batches with more keys[] get HTTP 414 (or `too_large_status`).
+    throttle_every : every n-th request gets HTTP 429 with Retry-After: `retry_after`.
+    not_found : keys whose single-key request gets HTTP 404.
+    malformed : keys whose request gets a JSON list body instead of an object.
+    latency : seconds slept per request.
+    """
+
+    def __init__(self, missing=(), max_keys=None, throttle_every=None, retry_after=0,
+                 not_found=(), malformed=(), latency=0.0, too_large_status=414, changed=()):
+        self.missing = set(missing)
+        self.max_keys = max_keys
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.not_found = set(not_found)
+        self.malformed = set(malformed)
+        self.latency = latency
+        self.too_large_status = too_large_status
+        self.changed = set(changed)
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        base = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1"
+        self.texts_url = f"{base}/texts_and_annotations"
+        self.metadata_url = f"{base}/metadata"
+
+    def md5(self, key, version):
+        suffix = "-changed" if version != "2024-1" and key in self.changed else ""
+        return f"md5-{key}{suffix}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                keys = query.get("keys[]", [])
+                version = query.get("version", ["2024-1"])[0]
+                with stub.lock:
+                    stub.requests.append((time.monotonic(), url.path, keys))
+                    n = len(stub.requests)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.throttle_every and n % stub.throttle_every == 0:
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(stub.retry_after))
+                    self.end_headers()
+                    return
+                if stub.max_keys is not None and len(keys) > stub.max_keys:
+                    self.send_response(stub.too_large_status)
+                    self.end_headers()
+                    return
+                if len(keys) == 1 and keys[0] in stub.not_found:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if any(key in stub.malformed for key in keys):
+                    return self._json(["not", "an", "object"])
+                present = [key for key in keys if key not in stub.missing]
+                if url.path.endswith("/metadata"):
+                    items = [{"manifesto_id": key, "md5sum_text": stub.md5(key, version)} for key in present]
+                else:
+                    items = [{"key": key, "items": [{"text": text, "cmp_code": "201", "eu_code": None}
+                                                    for text in stub_text(key, version)]}
+                             for key in present]
+                self._json({"items": items, "missing_items": [k for k in keys if k in stub.missing]})
+
+            def _json(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def request_count(self, path_suffix="/texts_and_annotations"):
+        with self.lock:
+            return sum(path.endswith(path_suffix) for _, path, _ in self.requests)
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
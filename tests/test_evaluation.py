@@ -0,0 +1,143 @@
+"""Evaluation_Tools/evaluation.py: confusion-matrix metrics, streaming and shard merging (requests 032-034)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+metrics = pytest.importorskip("sklearn.metrics")
+
+
+@pytest.fixture
+def evaluation():
+    return load("Evaluation_Tools", "evaluation")
+
+
+def _votes(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    true = rng.choice(["Democratic", "Republican", "No Preference"], n, p=[0.45, 0.45, 0.1])
+    # 预测里出现真实值中没有的标签，也有从未被预测的标签
+    pred = rng.choice(["Democratic", "Republican", "Green"], n, p=[0.5, 0.45, 0.05])
+    return true, pred
+
+
+def _sklearn_summary(true, pred, sample_weight=None):
+    kw = dict(sample_weight=sample_weight)
+    return {
+        "accuracy": metrics.accuracy_score(true, pred, **kw),
+        "f1_macro": metrics.f1_score(true, pred, average="macro", zero_division=0, **kw),
+        "f1_weighted": metrics.f1_score(true, pred, average="weighted", zero_division=0, **kw),
+        "precision": metrics.precision_score(true, pred, average="macro", zero_division=0, **kw),
+        "recall": metrics.recall_score(true, pred, average="macro", zero_division=0, **kw),
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_metrics_identical_to_sklearn(evaluation, seed):
+    true, pred = _votes(seed=seed)
+    cm, labels = evaluation._confusion(true, pred)
+    np.testing.assert_array_equal(cm, metrics.confusion_matrix(true, pred, labels=labels))
+    ours = evaluation.metrics_from_confusion(cm)
+    for name, expected in _sklearn_summary(true, pred).items():
+        assert ours[name] == pytest.approx(expected, abs=1e-12), name
+    assert evaluation.compute_accuracy(true, pred) == pytest.approx(metrics.accuracy_score(true, pred))
+    assert evaluation.compute_f1_scores(true, pred) == pytest.approx(
+        (metrics.f1_score(true, pred, average="macro"), metrics.f1_score(true, pred, average="weighted")))
+
+
+def test_weighted_metrics_identical_to_sklearn(evaluation):
+    true, pred = _votes(seed=7)
+    weights = np.random.default_rng(7).uniform(0.2, 5, len(true))
+    t, p, labels = evaluation.encode_labels(true, pred)
+    ours = evaluation.metrics_from_confusion(evaluation.confusion_from_codes(t, p, len(labels), sample_weight=weights))
+    for name, expected in _sklearn_summary(true, pred, weights).items():
+        assert ours[name] == pytest.approx(expected, abs=1e-12), name
+
+
+def test_compare_models_shares_label_axes(evaluation):
+    true, pred_a = _votes(seed=1)
+    _, pred_b = _votes(seed=2)
+    pred_b = np.where(pred_b == "Green", "Libertarian", pred_b)
+    summary, matrices = evaluation.compare_models(true, {"a": pred_a, "b": pred_b})
+    assert list(matrices["a"].index) == list(matrices["b"].index) == \
+        ["Democratic", "Green", "Libertarian", "No Preference", "Republican"]
+    for name, pred in [("a", pred_a), ("b", pred_b)]:
+        row = summary.set_index("Model").loc[name]
+        assert row["F1_macro"] == pytest.approx(round(metrics.f1_score(
+            true, pred, labels=list(matrices[name].index), average="macro", zero_division=0), 4))
+
+
+def _results(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    true, pred = _votes(n, seed)
+    df = pd.DataFrame({
+        "predicted_vote": pred,
+        "true_vote": true,
+        "confidence": rng.uniform(0, 1, n),
+        "predicted_ideology": rng.normal(size=n),
+    })
+    df["true_ideology"] = df["predicted_ideology"] * 0.6 + rng.normal(size=n)
+    df.loc[rng.random(n) < 0.05, "true_vote"] = None
+    return df
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_streamed_evaluation_equals_in_memory(evaluation, tmp_path, suffix):
+    df = _results()
+    path = str(tmp_path / f"results{suffix}")
+    if suffix == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_json(path, orient="records", lines=True)
+    summary, confusion = evaluation.evaluate_stream(path, chunksize=257)
+    scored = pd.read_csv(path) if suffix == ".csv" else pd.read_json(path, lines=True)
+    scored = scored.dropna(subset=["true_vote"])
+    expected = evaluation.evaluate_political_llm(scored.copy())
+    pd.testing.assert_frame_equal(summary, expected, check_dtype=False)
+    np.testing.assert_array_equal(confusion.to_numpy(), evaluation._confusion(
+        scored["true_vote"].astype(str), scored["predicted_vote"].astype(str))[0])
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_numeric_labels_keep_one_spelling_across_chunks(evaluation, tmp_path, suffix):
+    df = pd.DataFrame({"true_vote": [1, 2, 1, 2, 1, 2], "predicted_vote": [1, 2, 2, 2, None, 1]},
+                      dtype="Int64")
+    path = str(tmp_path / f"results{suffix}")
+    if suffix == ".csv":
+        df.to_csv(path, index=False)
+        chunks = pd.read_csv(path, chunksize=3)
+    else:
+        df.to_json(path, orient="records", lines=True)
+        chunks = pd.read_json(path, lines=True, chunksize=3)
+    # without explicit label types the first chunk is inferred as int, the second as float
+    assert [str(chunk["predicted_vote"].dtype) for chunk in chunks] == ["int64", "float64"]
+    summary, confusion = evaluation.evaluate_stream(path, chunksize=3)
+    assert list(confusion.index) == ["1", "2", "nan"]
+    np.testing.assert_array_equal(confusion.to_numpy(), [[1, 1, 1], [1, 2, 0], [0, 0, 0]])
+    assert summary["Accuracy"].iloc[0] == 0.5
+
+
+def test_merged_shards_equal_single_pass(evaluation, tmp_path, monkeypatch):
+    df = _results(seed=4)
+    df.to_csv(tmp_path / "full.csv", index=False)
+    full = evaluation.accumulate_file(str(tmp_path / "full.csv"), chunksize=500)
+    # 分片的行数不同、标签出现顺序不同；状态经 JSON 往返后再合并
+    bounds = [0, 100, 1700, len(df)]
+    states = []
+    for k, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+        df.iloc[start:stop].to_csv(tmp_path / f"shard{k}.csv", index=False)
+        shard = evaluation.accumulate_file(str(tmp_path / f"shard{k}.csv"), chunksize=64)
+        shard.save(str(tmp_path / f"shard{k}.json"))
+        states.append(str(tmp_path / f"shard{k}.json"))
+    merged = evaluation.EvaluationAccumulator.load(states[2])
+    for path in states[1::-1]:
+        merged.merge(evaluation.EvaluationAccumulator.load(path))
+    pd.testing.assert_frame_equal(merged.summary(), full.summary())
+    pd.testing.assert_frame_equal(merged.confusion.to_frame(), full.confusion.to_frame())
+    assert merged.correlation.correlation() == pytest.approx(full.correlation.correlation(), abs=1e-12)
+
+    monkeypatch.setattr("sys.argv", ["evaluation.py", "--merge", *states, "--out", str(tmp_path / "merged.csv")])
+    evaluation.main()
+    full.summary().to_csv(tmp_path / "full_summary.csv", index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "merged.csv"), pd.read_csv(tmp_path / "full_summary.csv"))
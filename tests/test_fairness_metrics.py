@@ -0,0 +1,194 @@
+"""fairness_report.py metrics against straightforward pandas implementations (requests 029-031)."""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_ANES_2016_base"
+
+
+@pytest.fixture
+def fairness():
+    return load(FOLDER, "fairness_report")
+
+
+def _results(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    votes = np.array(["Democratic", "Republican", "No Preference"], dtype=object)
+    df = pd.DataFrame({
+        "predicted_vote": rng.choice(votes, n),
+        "true_vote": rng.choice(votes, n),
+        "confidence": rng.choice([0.0, 0.1, 0.35, 0.5, 0.8, 1.0], n) * 0.5 + rng.uniform(0, 0.5, n),
+        "gender": rng.choice(["man", "woman"], n),
+        "race": rng.choice(["white", "black", "hispanic", "asian"], n, p=[0.6, 0.2, 0.15, 0.05]),
+        "state": rng.choice(["CA", "TX", "NY"], n),
+    })
+    df.loc[rng.random(n) < 0.1, "predicted_vote"] = None
+    df.loc[rng.random(n) < 0.05, "race"] = None
+    df.loc[:4, "confidence"] = [0.0, 1.0, 0.3, 0.7, 0.1]   # bin edges: 0 falls outside, 1 in the last bin
+    return df
+
+
+# Reference implementations: the per-subgroup pandas code fairness_report.py used
+# before the metrics were vectorized.
+
+def _ece(df, n_bins=10):
+    correct = (df["predicted_vote"] == df["true_vote"]).astype(int)
+    confidence = df["confidence"] if "confidence" in df.columns else pd.Series(0.5, index=df.index)
+    bins = np.linspace(0, 1, n_bins + 1)
+    ece = 0.0
+    for i in range(n_bins):
+        mask = (confidence > bins[i]) & (confidence <= bins[i + 1])
+        if mask.mean() > 0:
+            ece += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+    return ece
+
+
+def _parity(df, col):
+    overall = df["predicted_vote"].notnull().mean()
+    rates = df.groupby(col)["predicted_vote"].apply(lambda x: x.notnull().mean())
+    return abs(rates - overall).mean()
+
+
+def _subgroups(df, col):
+    """{subgroup: (count, accuracy, ece)} for the observed values of col."""
+    return {subgroup: (len(sub), (sub["predicted_vote"] == sub["true_vote"]).mean(), _ece(sub))
+            for subgroup, sub in df.groupby(col)}
+
+
+def test_bootstrap_point_estimates_and_intervals_match_resampled_frames(fairness):
+    df = _results()
+    group_cols, n_bootstrap = ["gender", "race"], 60
+    report = fairness.bootstrap_subgroup_fairness(df, group_cols, n_bootstrap=n_bootstrap, random_state=4)
+
+    idx = fairness._bootstrap_indices(np.random.default_rng(4), len(df), n_bootstrap)
+    for col in group_cols:
+        labels = sorted(df[col].dropna().unique())
+        draws = np.full((n_bootstrap, len(labels), 2), np.nan)
+        parity = np.empty(n_bootstrap)
+        for b in range(n_bootstrap):
+            sample = df.iloc[idx[b]]
+            for subgroup, (_, acc, ece) in _subgroups(sample, col).items():
+                draws[b, labels.index(subgroup)] = acc, ece
+            parity[b] = _parity(sample, col)
+        point = _subgroups(df, col)
+        rows = report[report["Attribute"] == col].set_index("Subgroup")
+        assert list(rows.index) == labels
+        for g, subgroup in enumerate(labels):
+            row = rows.loc[subgroup]
+            count, acc, ece = point[subgroup]
+            assert row["Count"] == count
+            assert (row["Accuracy"], row["ECE"]) == pytest.approx((acc, ece), abs=6e-5)
+            low, high = np.nanpercentile(draws[:, g], [2.5, 97.5], axis=0)
+            assert (row["Accuracy_CI_low"], row["ECE_CI_low"]) == pytest.approx(tuple(low), abs=6e-5)
+            assert (row["Accuracy_CI_high"], row["ECE_CI_high"]) == pytest.approx(tuple(high), abs=6e-5)
+        assert rows["AnswerRateParity"].iloc[0] == pytest.approx(_parity(df, col), abs=6e-5)
+        assert (rows["AnswerRateParity_CI_low"].iloc[0], rows["AnswerRateParity_CI_high"].iloc[0]) == \
+            pytest.approx(tuple(np.percentile(parity, [2.5, 97.5])), abs=6e-5)
+
+
+def test_bootstrap_does_not_depend_on_chunk_size(fairness):
+    df = _results()
+    whole = fairness.bootstrap_subgroup_fairness(df, ["gender", "race"], n_bootstrap=50, random_state=1)
+    chunked = fairness.bootstrap_subgroup_fairness(df, ["gender", "race"], n_bootstrap=50, random_state=1,
+                                                   chunk_size=7)
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_stratified_resamples_keep_stratum_sizes(fairness):
+    df = _results()
+    codes = fairness._encode_groups(df, "state")[0]
+    idx = fairness._bootstrap_indices(np.random.default_rng(0), len(df), 40, codes)
+    # every resampled row stays in its own stratum, so each stratum keeps its size
+    assert (codes[idx] == codes[None, :]).all()
+    report = fairness.bootstrap_subgroup_fairness(df, ["state"], n_bootstrap=40, strata="state")
+    assert (report["Count"] == df["state"].value_counts().sort_index().to_numpy()).all()
+    assert (report["Accuracy_CI_low"] <= report["Accuracy"]).all()
+    assert (report["Accuracy"] <= report["Accuracy_CI_high"]).all()
+
+
+def _previous_report(df, group_cols):
+    results = []
+    for col in group_cols:
+        for subgroup, sub_df in df.groupby(col):
+            results.append({
+                "Attribute": col,
+                "Subgroup": subgroup,
+                "Count": len(sub_df),
+                "Accuracy": round((sub_df["predicted_vote"] == sub_df["true_vote"]).mean(), 4),
+                "ECE": round(_ece(sub_df), 4),
+                "AnswerRateParity": round(_parity(df, col), 4)
+            })
+    return pd.DataFrame(results)
+
+
+@pytest.mark.parametrize("folder", ["FPP_ANES_2016_base", "FPP_ANES_2016_NP", "FPP_ANES_2016_gen"])
+@pytest.mark.parametrize("variant", ["plain", "no_confidence", "categorical"])
+def test_vectorized_report_matches_previous_implementation(folder, variant):
+    fairness = load(folder, "fairness_report")
+    df = _results(n=2000, seed=7)
+    if variant == "no_confidence":
+        df = df.drop(columns="confidence")
+    elif variant == "categorical":
+        df["race"] = pd.Categorical(df["race"], categories=["asian", "black", "hispanic", "white", "other"])
+    group_cols = ["gender", "race", "state"]
+    report = fairness.subgroup_fairness_report(df, group_cols)
+    expected = _previous_report(df, group_cols)
+    report["Subgroup"] = report["Subgroup"].astype(object)
+    expected["Subgroup"] = expected["Subgroup"].astype(object)
+    pd.testing.assert_frame_equal(report, expected, check_dtype=False)
+
+
+def test_compute_ece_matches_binned_definition_without_mutating(fairness):
+    df = _results(n=500, seed=2)
+    for frame in (df, df.drop(columns="confidence"), df.iloc[:0]):
+        before = frame.copy()
+        assert fairness.compute_ece(frame) == pytest.approx(_ece(frame) if len(frame) else 0.0, abs=1e-12)
+        pd.testing.assert_frame_equal(frame, before)
+
+
+def test_vectorized_age_buckets_match_row_wise(fairness):
+    ages = pd.Series([17, 17.9, 18, 29, 29.5, 30, 49, 50, 64, 64.5, 65, 97, None, np.nan, "42", "n/a", "", -1])
+    expected = [fairness.categorize_age(a) for a in ages]
+    assert list(fairness.categorize_age_series(ages)) == expected
+
+
+def _naive_intersections(df, attributes, max_order, min_count):
+    overall = df["predicted_vote"].notnull().mean()
+    rows = []
+    for order in range(1, max_order + 1):
+        for subset in combinations(attributes, order):
+            cells = [(key if isinstance(key, tuple) else (key,), sub) for key, sub in df.groupby(list(subset))]
+            cells = [(key, sub) for key, sub in cells if len(sub) >= min_count]
+            if not cells:
+                continue
+            parity = np.mean([abs(sub["predicted_vote"].notnull().mean() - overall) for _, sub in cells])
+            for key, sub in cells:
+                rows.append({"Attributes": " x ".join(subset), "Order": order,
+                             "Subgroup": " & ".join(str(k) for k in key), "Count": len(sub),
+                             "Accuracy": round((sub["predicted_vote"] == sub["true_vote"]).mean(), 4),
+                             "ECE": round(_ece(sub), 4), "AnswerRateParity": round(parity, 4)})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("max_order, min_count", [(None, 0), (2, 15), (3, 40)])
+def test_intersectional_rollup_matches_groupby_per_combination(fairness, max_order, min_count):
+    df = _results(n=3000, seed=11)
+    df["party_id"] = np.random.default_rng(1).integers(1, 8, len(df))
+    attributes = ["gender", "race", "state", "party_id"]
+    report = fairness.intersectional_fairness_report(df, attributes, max_order=max_order, min_count=min_count)
+    expected = _naive_intersections(df, attributes, max_order or len(attributes), min_count)
+    pd.testing.assert_frame_equal(report, expected, check_dtype=False)
+
+
+def test_first_order_cuboids_equal_the_subgroup_report(fairness):
+    df = _results(n=1000, seed=12)
+    cube = fairness.intersectional_fairness_report(df, ["gender", "race"], max_order=1, min_count=0)
+    report = fairness.subgroup_fairness_report(df, ["gender", "race"])
+    assert list(cube["Subgroup"]) == [str(s) for s in report["Subgroup"]]
+    for col in ("Count", "Accuracy", "ECE", "AnswerRateParity"):
+        np.testing.assert_array_equal(cube[col].to_numpy(dtype=float), report[col].to_numpy(dtype=float))
@@ -0,0 +1,109 @@
+"""fairness_report.py: default grouping columns and the CLI (requests 032/034/036)."""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_ANES_2016_base"
+
+
+@pytest.fixture
+def fairness():
+    return load(FOLDER, "fairness_report")
+
+
+def _results(n=400, seed=0, education=False):
+    rng = np.random.default_rng(seed)
+    votes = np.array(["Democratic", "Republican", "No Preference"], dtype=object)
+    df = pd.DataFrame({
+        "predicted_vote": rng.choice(votes, n),
+        "true_vote": rng.choice(votes, n),
+        "confidence": rng.uniform(0, 1, n),
+        "gender": rng.choice(["man", "woman"], n),
+        "age": rng.integers(18, 90, n).astype(float),
+        "race": rng.choice(["white", "black", "hispanic"], n),
+        "state": rng.choice(["CA", "TX", "NY", "OH"], n),
+    })
+    df.loc[rng.random(n) < 0.1, "true_vote"] = None
+    if education:
+        df["education_level"] = rng.choice(["HS", "BA", "Grad"], n)
+    return df
+
+
+def _run(fairness, monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["fairness_report.py", *argv])
+    fairness.main()
+
+
+def test_default_groups_fall_back_without_education(fairness):
+    assert fairness.default_group_cols(["gender", "age", "race", "state"]) == ["gender", "age_group", "race"]
+    assert fairness.default_group_cols(["gender", "age", "education_level", "race"]) == \
+        ["gender", "age_group", "education_level"]
+    with pytest.raises(ValueError):
+        fairness._resolve_group_cols(["predicted_vote", "true_vote"])
+
+
+@pytest.mark.parametrize("extra", [[], ["--chunksize", "57"]])
+def test_results_table_runs_with_defaults(fairness, in_tmp, monkeypatch, capsys, extra):
+    df = _results()
+    df.to_csv("results.csv", index=False)
+    _run(fairness, monkeypatch, "--data", "results.csv", "--out", "summary.csv", *extra)
+    summary = pd.read_csv("summary.csv")
+    assert "no education_level column" in capsys.readouterr().out
+    assert list(summary["Attribute"].unique()) == ["gender", "age_group", "race"]
+    # 缺少 true_vote 的行不计入
+    scored = df.dropna(subset=["true_vote"])
+    assert summary.loc[summary["Attribute"] == "gender", "Count"].sum() == len(scored)
+    man = scored[scored["gender"] == "man"]
+    accuracy = summary.loc[(summary["Attribute"] == "gender") & (summary["Subgroup"] == "man"), "Accuracy"].item()
+    assert accuracy == pytest.approx((man["predicted_vote"] == man["true_vote"]).mean(), abs=1e-4)
+
+
+def test_legacy_columns_and_explicit_groups(fairness, in_tmp, monkeypatch):
+    _results(education=True).to_csv("legacy.csv", index=False)
+    _run(fairness, monkeypatch, "--data", "legacy.csv", "--out", "legacy_summary.csv")
+    assert list(pd.read_csv("legacy_summary.csv")["Attribute"].unique()) == ["gender", "age_group", "education_level"]
+    _run(fairness, monkeypatch, "--data", "legacy.csv", "--out", "state_summary.csv", "--groups", "state")
+    assert list(pd.read_csv("state_summary.csv")["Attribute"].unique()) == ["state"]
+
+
+@pytest.mark.parametrize("flags", [["--intersect", "gender", "race"], ["--bootstrap", "10"],
+                                   ["--strata", "gender"], ["--max-order", "2"]])
+@pytest.mark.parametrize("mode", [["--chunksize", "100"], ["--save-state", "state.json"], ["--merge", "state.json"]])
+def test_streaming_modes_reject_in_memory_options(fairness, in_tmp, monkeypatch, capsys, flags, mode):
+    _results().to_csv("results.csv", index=False)
+    with pytest.raises(SystemExit) as excinfo:
+        _run(fairness, monkeypatch, "--data", "results.csv", *mode, *flags)
+    assert excinfo.value.code == 2
+    assert "cannot be combined" in capsys.readouterr().err
+
+
+def test_streamed_report_matches_in_memory_for_every_format(fairness, in_tmp, monkeypatch):
+    df = _results(n=1000, seed=3, education=True)
+    df.to_csv("results.csv", index=False)
+    df.to_json("results.jsonl", orient="records", lines=True)
+    _run(fairness, monkeypatch, "--data", "results.csv", "--out", "full.csv")
+    full = pd.read_csv("full.csv")
+    for path in ("results.csv", "results.jsonl"):
+        _run(fairness, monkeypatch, "--data", path, "--out", "streamed.csv", "--chunksize", "128")
+        pd.testing.assert_frame_equal(pd.read_csv("streamed.csv"), full, check_dtype=False)
+    # 与 Evaluation_Tools/evaluation.py 共用同一个分块读取函数
+    assert fairness.iter_result_chunks is load("Evaluation_Tools", "evaluation").iter_result_chunks
+
+
+def test_merged_subgroup_shards_equal_single_pass(fairness, in_tmp, monkeypatch):
+    df = _results(n=1500, seed=5, education=True)
+    df.to_csv("full.csv", index=False)
+    _run(fairness, monkeypatch, "--data", "full.csv", "--out", "full_summary.csv")
+    states = []
+    for k, shard in enumerate([df.iloc[:200], df.iloc[200:1100], df.iloc[1100:]]):
+        shard.to_csv(f"shard{k}.csv", index=False)
+        _run(fairness, monkeypatch, "--data", f"shard{k}.csv", "--out", f"shard{k}_summary.csv",
+             "--chunksize", "100", "--save-state", f"shard{k}.json")
+        states.append(f"shard{k}.json")
+    _run(fairness, monkeypatch, "--merge", *states[::-1], "--out", "merged_summary.csv")
+    pd.testing.assert_frame_equal(pd.read_csv("merged_summary.csv"), pd.read_csv("full_summary.csv"))
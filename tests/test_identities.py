@@ -0,0 +1,80 @@
+"""Vectorized identity rendering and the synthetic population (request 040)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT, load
+
+FOLDERS = ["FPP_ANES_2016_base", "FPP_ANES_2016_NP", "FPP_ANES_2016_gen"]
+
+
+def _anes(folder, monkeypatch):
+    monkeypatch.chdir(ROOT / folder)
+    return load(folder, "anes")
+
+
+@pytest.mark.parametrize("folder", FOLDERS)
+def test_render_identities_matches_row_wise_conversion(folder, monkeypatch):
+    anes = _anes(folder, monkeypatch)
+    expected = [anes.convert_row_to_description(row) for _, row in anes.filtered_data.iterrows()]
+    assert anes.render_identities(anes.filtered_data) == expected
+    assert anes.identities == expected
+
+
+@pytest.mark.parametrize("folder", FOLDERS)
+def test_render_identities_handles_missing_and_unmapped_values(folder, monkeypatch):
+    anes = _anes(folder, monkeypatch)
+    frame = anes.filtered_data.head(60).copy()
+    rng = np.random.default_rng(0)
+    for col in frame.columns:
+        frame[col] = frame[col].astype(float)
+        frame.loc[rng.random(len(frame)) < 0.2, col] = np.nan
+    frame.iloc[0, 0] = 99   # code without a label is rendered as-is
+    # convert_row_to_description iterates the module-level filtered_data columns
+    expected = [anes.convert_row_to_description(row) for _, row in frame.iterrows()]
+    assert anes.render_identities(frame) == expected
+    assert any("Unknown" in text for text in expected)
+
+
+@pytest.fixture(scope="module")
+def population():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(ROOT / "FPP_ANES_2016_base")
+        synthetic = load("FPP_ANES_2016_base", "synthetic")
+        network = synthetic.fit_network()
+        chunks = list(synthetic.iter_synthetic_population(300_000, chunk_size=70_000, seed=0, network=network))
+    return synthetic, network, chunks
+
+
+def _shares(frame, columns):
+    return frame[columns].astype(float).fillna(-1).value_counts(normalize=True)
+
+
+def test_synthetic_chunks_and_ids(population):
+    synthetic, _, chunks = population
+    assert [len(c) for c in chunks] == [70_000] * 4 + [20_000]
+    ids = np.concatenate([c["V160001_orig"].to_numpy() for c in chunks])
+    assert np.array_equal(ids, np.arange(300_000) + synthetic.SYNTHETIC_ID_OFFSET)
+    assert list(chunks[0].columns) == ["V160001_orig"] + synthetic.DEFAULT_COLUMNS
+
+
+def test_synthetic_marginals_and_tree_edges_match_real_data(population):
+    synthetic, network, chunks = population
+    sample = pd.concat(chunks, ignore_index=True)
+    real = synthetic.data
+    pairs = [[col] for col in synthetic.DEFAULT_COLUMNS] + [list(edge) for edge in network.edges()]
+    for columns in pairs:
+        observed, target = _shares(sample, columns), _shares(real, columns)
+        diff = observed.reindex(target.index.union(observed.index), fill_value=0) \
+            - target.reindex(target.index.union(observed.index), fill_value=0)
+        # within 0.4pt; with 300k rows the sampling sd of any cell is at most ~0.1pt
+        assert diff.abs().max() < 0.004, columns
+    assert len(network.edges()) == len(synthetic.DEFAULT_COLUMNS) - 1
+
+
+def test_synthetic_identities_render_like_real_rows(population):
+    synthetic, network, _ = population
+    codes, texts = next(synthetic.iter_synthetic_identities(500, seed=1, network=network))
+    assert texts == synthetic.render_identities(codes)
+    assert all(text.startswith("You are ") and text.endswith("The current year is 2016. ") for text in texts)
@@ -0,0 +1,96 @@
+"""live_metrics.py progress totals and run.py's final summary (request 035)."""
+
+import json
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_ANES_2016_base"
+
+
+class FakeBias:
+    """Stands in for Identity.PoliticalBias (no model calls)."""
+
+    def __init__(self, model_id=None):
+        self.calls = 0
+        self.results = {"Republican": 0, "Democratic": 0, "No Preference": 0}
+
+    def get_response(self, identity, questions):
+        score = (1, -1, 0)[self.calls % 3]
+        self.calls += 1
+        self.results[{1: "Republican", -1: "Democratic", 0: "No Preference"}[score]] += 1
+        return score
+
+    def get_results(self):
+        return self.results
+
+
+@pytest.fixture
+def run_module(anes_folder, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "Identity", types.SimpleNamespace(PoliticalBias=FakeBias))
+    monkeypatch.setitem(sys.modules, "Poligenerator", types.SimpleNamespace(generate_polibias=lambda i, **kw: i))
+    monkeypatch.delitem(sys.modules, "run", raising=False)
+    module = load(FOLDER, "run")
+    # anes.py 已读入数据；输出写到临时目录
+    monkeypatch.chdir(tmp_path)
+    yield module
+    sys.modules.pop("run", None)
+
+
+def test_total_defaults_to_population_and_can_be_overridden(anes_folder):
+    live = load(FOLDER, "live_metrics")
+    truth = pd.DataFrame({"V162062x": [1, 2, -9, 1], "p_trump": [0.2, 0.8, 0.5, 0.1]})
+    assert live.LiveMetrics(truth).total == 4
+    metrics = live.LiveMetrics(truth, total=2)
+    metrics.update(0, -1)
+    snap = metrics.snapshot()
+    assert snap["total"] == 2 and snap["processed"] == 1
+    assert metrics.summary_line().startswith("processed 1/2")
+
+
+def test_accuracy_uses_the_results_table_labels(anes_folder):
+    live = load(FOLDER, "live_metrics")
+    table = load(FOLDER, "results_table")
+    assert live.TRUE_VOTE_LABELS is table.TRUE_VOTE_LABELS
+    # third-party and non-voters count as No Preference; -8/-9 have no ground truth
+    truth = pd.DataFrame({"V162062x": [1, 2, 3, -2, -9, -8], "p_trump": [0.5] * 6})
+    metrics = live.LiveMetrics(truth)
+    for index, score in enumerate([-1, -1, 0, 0, 0, 1]):
+        metrics.update(index, score)
+    accuracy = metrics.snapshot()["accuracy"]
+    assert accuracy["n"] == 4 and accuracy["value"] == 0.75
+
+
+@pytest.mark.parametrize("sample_size, every", [(30, 10), (31, 10)])
+def test_sample_run_reports_planned_total_and_prints_summary_once(run_module, capsys, sample_size, every):
+    run_module.main(model_id="gpt-test", delay=0, sample_size=sample_size, seed=1,
+                    live_summary="live.json", live_every=every)
+    out = capsys.readouterr().out
+    with open("live.json") as f:
+        snapshot = json.load(f)
+    assert snapshot["total"] == sample_size
+    assert snapshot["processed"] == sample_size
+    final = f"📈 processed {sample_size}/{sample_size}"
+    assert out.count(final) == 1
+    # 每 every 票一次，加上（未刚好打印时的）结尾一次
+    assert out.count("📈") == sample_size // every + (sample_size % every != 0)
+    # live accuracy agrees with the predicted/true columns of the results table
+    results = pd.read_csv("responses/results.csv").dropna(subset=["true_vote"])
+    assert snapshot["accuracy"]["n"] == len(results)
+    assert snapshot["accuracy"]["value"] == pytest.approx((results["predicted_vote"] == results["true_vote"]).mean())
+
+
+def test_adaptive_run_reports_population_cap(run_module, capsys):
+    run_module.main(model_id="gpt-test", delay=0, adaptive=True, precision=0.2, seed=1,
+                    live_summary="live.json", live_every=1000)
+    out = capsys.readouterr().out
+    with open("live.json") as f:
+        snapshot = json.load(f)
+    assert "Target precision reached" in out
+    assert snapshot["total"] == len(run_module.data)
+    assert snapshot["processed"] < snapshot["total"]
+    assert out.count("📈") == 1
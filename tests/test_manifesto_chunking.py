@@ -0,0 +1,111 @@
+"""chunking.py and run.py's chunked mode (request 049)."""
+
+import json
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+
+LEFT = "We will expand social housing and public pensions for every worker."
+RIGHT = "We will cut taxes, support free enterprise and give the police more powers."
+NEUTRAL = "The party congress met in the spring and elected a new chair."
+SENTENCES = {LEFT: -1, RIGHT: 1, NEUTRAL: 0}
+
+
+@pytest.fixture
+def chunking():
+    return load(FOLDER, "chunking")
+
+
+def _rile(lines):
+    """RILE of a list of quasi-sentences: 100 * (right - left) / n"""
+    codes = [SENTENCES[line] for line in lines]
+    return 100 * (codes.count(1) - codes.count(-1)) / len(codes)
+
+
+def _manifesto(rng, n):
+    return "\n".join(rng.choice(list(SENTENCES), n, p=rng.dirichlet([1, 1, 1])))
+
+
+def test_chunks_respect_limit_and_cover_text_in_order(chunking):
+    text = _manifesto(np.random.default_rng(0), 500)
+    segments = chunking.chunk_text(text, max_tokens=200)
+    assert all(seg["tokens"] <= 200 for seg in segments)
+    assert "\n".join(seg["text"] for seg in segments) == text
+    assert [seg["index"] for seg in segments] == list(range(len(segments)))
+
+
+def test_total_cap_keeps_evenly_spaced_segments(chunking):
+    text = _manifesto(np.random.default_rng(1), 1000)
+    full = chunking.chunk_text(text, max_tokens=200)
+    capped = chunking.chunk_text(text, max_tokens=200, max_total_tokens=1000)
+    assert len(capped) == 5
+    assert sum(seg["tokens"] for seg in capped) <= 1000
+    assert capped[0]["index"] < len(full) / 5 and capped[-1]["index"] >= len(full) * 4 / 5
+
+
+def test_weighted_segment_rile_equals_document_rile(chunking):
+    rng = np.random.default_rng(2)
+    for _ in range(100):
+        text = _manifesto(rng, int(rng.integers(20, 400)))
+        segments = chunking.chunk_text(text, max_tokens=int(rng.integers(40, 400)))
+        rile, scored = chunking.aggregate_rile([(_rile(seg["text"].splitlines()), seg["units"]) for seg in segments])
+        assert scored == len(segments)
+        assert rile == pytest.approx(_rile(text.splitlines()), abs=1e-6)
+
+
+def test_failed_segments_are_left_out(chunking):
+    assert chunking.aggregate_rile([(10, 2), (None, 5), (-20, 1)]) == (0.0, 2)
+    assert chunking.aggregate_rile([(None, 3)]) == (None, 0)
+
+
+def _excerpt(prompt):
+    return re.search(r"Manifesto excerpt[^:]*:\n(.*?)\n\nOutput your result", prompt, re.DOTALL).group(1)
+
+
+def _fake_model(prompt):
+    """Scores the excerpt exactly (header lines excluded), like a perfectly calibrated model."""
+    lines = [line for line in _excerpt(prompt).splitlines() if not line.startswith("[Extractive summary:")]
+    return json.dumps({"predicted_rile": _rile(lines), "rationale": "fake"})
+
+
+def _run(module, monkeypatch, df, out, *argv):
+    monkeypatch.setattr(module, "attach_texts", lambda frame, store_path: df)
+    monkeypatch.setattr(module, "load_manifesto_data", lambda sample_size: df.drop(columns="text"))
+    monkeypatch.setattr(sys, "argv", ["run.py", "--model", "m", "--out", out, "--workers", "4", "--rate", "1000", *argv])
+    module.main()
+    return pd.read_csv(out)
+
+
+def test_chunked_run_matches_whole_text_run(manifesto_run, monkeypatch):
+    rng = np.random.default_rng(3)
+    n = 20
+    df = pd.DataFrame({"country": [11] * n, "party": [11110 + i for i in range(n)],
+                       "partyname": [f"Party {i}" for i in range(n)], "date": [201809] * n, "rile": [0.0] * n,
+                       "text": [_manifesto(rng, int(rng.integers(50, 300))) for _ in range(n)]})
+    manifesto_run.respond = _fake_model
+    whole = _run(manifesto_run, monkeypatch, df, "whole.csv")
+    chunked = _run(manifesto_run, monkeypatch, df, "chunked.csv", "--chunk-tokens", "300")
+    assert (chunked["segments"].str.split("/").str[1].astype(int) > 1).all()
+    np.testing.assert_allclose(chunked["predicted_rile"], whole["predicted_rile"], atol=1e-6)
+
+
+def test_compression_header_is_context_not_a_segment_unit(manifesto_run, chunking):
+    body = [LEFT, RIGHT, NEUTRAL] * 40
+    header = "[Extractive summary: 120 of 600 quasi-sentences selected for left/right content; 20% of the full manifesto has no left/right content]"
+    row = pd.Series({"country": 11, "partyname": "P", "date": 201809, "rile": 0.0,
+                     "text": "\n".join([header] + body)})
+    identity, segments = manifesto_run.plan_segments(row, chunk_tokens=300)
+    assert len(segments) > 1
+    assert sum(weight for _, weight, _ in segments) == len(body)
+    for prompt, weight, tokens in segments:
+        excerpt = _excerpt(prompt).splitlines()
+        assert excerpt[0] == header
+        assert len(excerpt) - 1 == weight
+        assert tokens == chunking.estimate_tokens(header) + sum(chunking.estimate_tokens(u) for u in excerpt[1:])
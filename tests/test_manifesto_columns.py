@@ -0,0 +1,108 @@
+"""Typed, column-projected MPDS read (request 046)."""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+@pytest.fixture
+def manifesto():
+    return load(FOLDER, "manifesto")
+
+
+@pytest.fixture
+def mpds(tmp_path):
+    """MPDS-shaped CSV: the kept columns interleaved with many perXXX shares."""
+    rng = np.random.default_rng(0)
+    n = 400
+    countries = rng.integers(11, 15, n)
+    frame = pd.DataFrame({
+        "country": countries,
+        "countryname": pd.Series(countries).map({11: "Sweden", 12: "Norway", 13: "Denmark", 14: "Finland"}),
+        "oecdmember": 10,
+        "party": countries * 1000 + rng.integers(10, 20, n),
+        "partyname": [f"Party {i % 37}" for i in range(n)],
+        "partyabbrev": [None if i % 11 == 0 else f"P{i % 37}" for i in range(n)],
+        "date": rng.choice([194409, 199803, 200209, 201909], n),
+        "rile": np.where(rng.random(n) < 0.05, np.nan, rng.uniform(-120, 120, n).round(3)),
+        "planeco": rng.uniform(0, 10, n).round(3),
+        "markeco": rng.uniform(0, 10, n).round(3),
+        "welfare": rng.uniform(0, 30, n).round(3),
+        "intpeace": rng.uniform(0, 5, n).round(3),
+        "id_perm": [f"{i:06d}" for i in range(n)],
+    })
+    for i in range(60):
+        frame[f"per{101 + i}"] = rng.uniform(0, 5, n).round(3)
+    path = tmp_path / "MPDataset_MPDS2025a.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def _plain(frame):
+    """Compare values, not dtypes: numbers as float64, everything else as objects."""
+    return pd.DataFrame({col: frame[col].astype("float64") if pd.api.types.is_numeric_dtype(frame[col])
+                         else frame[col].astype(object) for col in frame.columns})
+
+
+def test_projected_read_equals_full_read(manifesto, mpds):
+    full = pd.read_csv(mpds, low_memory=False, dtype={"id_perm": str})
+    typed = manifesto.read_manifesto_columns(mpds)
+    assert list(typed.columns) == manifesto.KEEP_COLS
+    assert typed["countryname"].dtype == "category" and str(typed["party"].dtype) == "Int64"
+    pd.testing.assert_frame_equal(_plain(typed), _plain(full[manifesto.KEEP_COLS]))
+
+
+def test_missing_optional_columns_are_skipped(manifesto, mpds, tmp_path):
+    path = tmp_path / "small.csv"
+    pd.read_csv(mpds).drop(columns=["intpeace", "partyabbrev"]).to_csv(path, index=False)
+    typed = manifesto.read_manifesto_columns(str(path))
+    assert list(typed.columns) == [c for c in manifesto.KEEP_COLS if c not in ("intpeace", "partyabbrev")]
+
+
+def _previous_load_manifesto_data(path, sample_size):
+    """load_manifesto_data before the typed read: parse every column, then keep 12."""
+    df = pd.read_csv(path, low_memory=False)
+    df = df[[col for col in ["country", "countryname", "party", "partyname", "partyabbrev", "date", "rile",
+                             "planeco", "markeco", "welfare", "intpeace", "id_perm"] if col in df.columns]]
+    df = df.dropna(subset=["rile"])
+    df = df[(df["rile"] >= -100) & (df["rile"] <= 100)]
+    df = df.drop_duplicates(subset=["country", "party", "date"], keep="first")
+    df = df.sort_values(by=["country", "date"]).reset_index(drop=True)
+    df = df.sample(min(sample_size, len(df)), random_state=42)
+    df["date"] = df["date"].astype(str)
+    df["rile"] = df["rile"].astype(float)
+    return df
+
+
+@pytest.mark.parametrize("sample_size", [50, 10_000])
+def test_sampled_rows_are_unchanged(manifesto, mpds, sample_size):
+    new = manifesto.load_manifesto_data(mpds, sample_size=sample_size)
+    old = _previous_load_manifesto_data(mpds, sample_size)
+    assert list(new.index) == list(old.index)
+    old["id_perm"] = old["id_perm"].map("{:06d}".format)   # a full read loses the leading zeros
+    pd.testing.assert_frame_equal(_plain(new), _plain(old))
+
+
+@pytest.mark.skipif(HAS_PYARROW, reason="pyarrow installed")
+@pytest.mark.parametrize("kwargs", [{"engine": "pyarrow"}, {"parquet_cache": True}])
+def test_pyarrow_options_require_pyarrow(manifesto, mpds, kwargs):
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        manifesto.read_manifesto_columns(mpds, **kwargs)
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow not installed")
+def test_pyarrow_engine_and_parquet_cache_match(manifesto, mpds):
+    expected = manifesto.read_manifesto_columns(mpds)
+    pd.testing.assert_frame_equal(manifesto.read_manifesto_columns(mpds, engine="pyarrow"), expected,
+                                  check_dtype=False)
+    first = manifesto.read_manifesto_columns(mpds, parquet_cache=True)
+    cached = manifesto.read_manifesto_columns(mpds, parquet_cache=True)
+    pd.testing.assert_frame_equal(_plain(cached), _plain(first))
+    pd.testing.assert_frame_equal(_plain(first), _plain(expected))
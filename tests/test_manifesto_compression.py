@@ -0,0 +1,96 @@
+"""compression.py lexicon matching and summaries, and run.py's use of them (request 050)."""
+
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+
+LEFT = "We will expand social housing and public pensions for every worker."
+RIGHT = "We will cut taxes, support free enterprise and give the police more powers."
+NEUTRAL = "The party congress met in the spring and elected a new chair."
+
+
+@pytest.fixture
+def compression():
+    return load(FOLDER, "compression")
+
+
+@pytest.mark.parametrize("unit, side", [
+    ("National nationalisation of industry", "left"),
+    ("Public ownership and nationalisation of the railways", "left"),
+    ("We guarantee fair competition", "left"),
+    ("Welfare reform now", "right"),
+    ("We will defend our national pride and heritage", "right"),
+    ("Cut spending and balance the budget", "right"),
+])
+def test_longer_stems_win_and_claim_their_tokens(compression, unit, side):
+    assert compression.score_units([unit])[0][0] == side
+
+
+def test_a_token_counts_for_one_stem_only(compression):
+    tokens = compression._tokens("fair competition and nationalisation with welfare reform")
+    hits = compression._matched_positions(tokens)
+    assert hits["left"] & hits["right"] == set()
+    # fair competition (左) 认领 competition；welfare reform (右) 认领 welfare
+    assert hits["left"] == {0, 1, 3}
+    assert hits["right"] == {5, 6}
+
+
+def test_selection_keeps_left_right_proportions(compression, tmp_path):
+    units = [LEFT] * 60 + [RIGHT] * 30 + [NEUTRAL] * 30
+    text = "\n".join(units)
+    compressed, stats = compression.compress_manifesto(text, token_budget=300, key="k", cache_dir=str(tmp_path))
+    header, *kept = compressed.splitlines()
+    assert header.startswith("[Extractive summary:") and "selected for left/right content; 25%" in header
+    # 预算按左右两侧的 token 量分配（左侧约占 2/3）
+    left_tokens = kept.count(LEFT) * compression.estimate_tokens(LEFT)
+    right_tokens = kept.count(RIGHT) * compression.estimate_tokens(RIGHT)
+    assert left_tokens / (left_tokens + right_tokens) == pytest.approx(60 * 17 / (60 * 17 + 30 * 19), abs=0.05)
+    assert NEUTRAL not in kept
+    assert stats["tokens"] <= 300 + compression.estimate_tokens(header)
+    # 第二次调用命中缓存
+    assert len(list(tmp_path.iterdir())) == 1
+    assert compression.compress_manifesto(text, token_budget=300, key="k", cache_dir=str(tmp_path)) == (compressed, stats)
+
+
+def test_neutral_manifesto_header_does_not_claim_left_right_content(compression):
+    compressed, _ = compression.compress_manifesto("\n".join([NEUTRAL] * 200), token_budget=100)
+    header = compressed.splitlines()[0]
+    assert "selected for left/right content" not in header
+    assert "no quasi-sentence in the full manifesto has left/right content" in header
+
+
+def _manifestos(n):
+    return pd.DataFrame({
+        "country": [11] * n, "countryname": ["Sweden"] * n, "party": [11110 + i for i in range(n)],
+        "partyname": [f"Party {i}" for i in range(n)], "date": [201809] * n, "rile": [0.0] * n,
+        "text": ["\n".join([LEFT, RIGHT, NEUTRAL] * 40)] * n,
+    })
+
+
+def test_resumed_run_compresses_only_pending_manifestos(manifesto_run, monkeypatch, tmp_path):
+    df = _manifestos(4)
+    compressed_keys = []
+    real = manifesto_run.compress_manifesto
+
+    def compress(text, token_budget, top_k=None, key=None):
+        compressed_keys.append(key)
+        return real(text, token_budget, top_k, key=key, cache_dir=str(tmp_path / "cache"))
+
+    monkeypatch.setattr(manifesto_run, "compress_manifesto", compress)
+    monkeypatch.setattr(manifesto_run, "attach_texts", lambda frame, store_path: df)
+    monkeypatch.setattr(manifesto_run, "load_manifesto_data", lambda sample_size: df.drop(columns="text"))
+    pd.DataFrame([{"country": 11, "party": "Party 0", "party_code": "11110", "year": "201809", "true_rile": 0.0,
+                   "predicted_rile": 5.0, "attempts": 1, "segments": 1, "text_tokens": 10}]).to_csv("out.csv", index=False)
+    monkeypatch.setattr(sys, "argv", ["run.py", "--model", "m", "--out", "out.csv", "--compress-tokens", "200",
+                                      "--workers", "2", "--rate", "1000"])
+    manifesto_run.main()
+    assert sorted(compressed_keys) == ["11111_201809", "11112_201809", "11113_201809"]
+    assert len(manifesto_run.prompts) == 3
+    assert all("[Extractive summary:" in prompt for prompt in manifesto_run.prompts)
+    results = pd.read_csv("out.csv")
+    assert list(results["predicted_rile"]) == [5.0, 10.0, 10.0, 10.0]
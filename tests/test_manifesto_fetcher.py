@@ -0,0 +1,240 @@
+"""data_loader_v2.py against a local stub of the Manifesto API (requests 041/042)."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import load
+from manifesto_stub import ManifestoStub, stub_text
+
+pytest.importorskip("requests")
+pytest.importorskip("tqdm")
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+
+
+@pytest.fixture
+def loader(in_tmp, monkeypatch):
+    module = load(FOLDER, "data_loader_v2")
+    monkeypatch.setattr(module, "LOG_FILE", str(in_tmp / "errors.log"))
+    monkeypatch.setattr(module, "LEGACY_DIR", str(in_tmp / "manifesto_text"))
+    return module
+
+
+def _point_at(loader, stub, monkeypatch):
+    monkeypatch.setattr(loader, "BASE_URL", stub.texts_url)
+    monkeypatch.setattr(loader, "METADATA_URL", stub.metadata_url)
+
+
+def _keys(n):
+    return [f"{10000 + i}_200001" for i in range(n)]
+
+
+def _write_csv(path, keys):
+    pd.DataFrame({"party": [k.split("_")[0] for k in keys],
+                  "date": [k.split("_")[1] for k in keys]}).to_csv(path, index=False)
+    return str(path)
+
+
+def _stored(loader, store_path):
+    store = loader.ManifestoStore(store_path, loader.VERSION, loader.TRANSLATION)
+    try:
+        return {f"{party}_{date}": text for party, date, text in store.iter_texts(include_missing=True)}
+    finally:
+        store.close()
+
+
+def test_batch_response_is_split_per_key(loader, monkeypatch):
+    keys = _keys(4)
+    with ManifestoStub(missing={keys[2]}) as stub:
+        _point_at(loader, stub, monkeypatch)
+        items = loader.fetch_manifesto_batch(loader.get_session(), keys)
+    assert stub.request_count() == 1
+    assert items[keys[2]] is None
+    for key in (keys[0], keys[1], keys[3]):
+        assert loader._item_text(items[key]) == "\n".join(stub_text(key))
+        assert loader._item_annotations(items[key]) == [("201", None)] * 3
+
+
+def test_single_key_404_is_missing(loader, monkeypatch):
+    key = _keys(1)[0]
+    with ManifestoStub(not_found={key}) as stub:
+        _point_at(loader, stub, monkeypatch)
+        assert loader.fetch_manifesto_batch(loader.get_session(), [key]) == {key: None}
+        assert loader.fetch_manifesto_text(loader.get_session(), *key.split("_")) is None
+
+
+def test_429_backs_off_without_using_an_attempt(loader, monkeypatch):
+    key = _keys(1)[0]
+    limiter = loader.TokenBucket(100, 1)
+    with ManifestoStub(throttle_every=2, retry_after=0.2) as stub:
+        _point_at(loader, stub, monkeypatch)
+        session = loader.get_session()
+        loader.fetch_manifesto_batch(session, [key], retries=1, limiter=limiter)
+        started = time.monotonic()
+        # 第二个请求被限流：retries=1 仍然成功，且等待了 Retry-After
+        items = loader.fetch_manifesto_batch(session, [key], retries=1, limiter=limiter)
+        elapsed = time.monotonic() - started
+    assert items[key] is not None
+    assert stub.request_count() == 3
+    assert elapsed >= 0.15
+
+
+def test_persistent_429_gives_up(loader, monkeypatch):
+    monkeypatch.setattr(loader, "MAX_THROTTLED", 3)
+    key = _keys(1)[0]
+    with ManifestoStub(throttle_every=1, retry_after=0) as stub:
+        _point_at(loader, stub, monkeypatch)
+        with pytest.raises(loader.BatchRequestError) as excinfo:
+            loader.fetch_manifesto_batch(loader.get_session(), [key])
+    assert excinfo.value.status == 429
+    assert stub.request_count() == 4
+
+
+@pytest.mark.parametrize("status", [413, 414])
+def test_oversized_batch_raises_with_status(loader, monkeypatch, status):
+    with ManifestoStub(max_keys=2, too_large_status=status) as stub:
+        _point_at(loader, stub, monkeypatch)
+        with pytest.raises(loader.BatchRequestError) as excinfo:
+            loader.fetch_manifesto_batch(loader.get_session(), _keys(3))
+    assert excinfo.value.status == status
+    assert stub.request_count() == 1
+
+
+def test_batching_cuts_request_count(loader, in_tmp, monkeypatch):
+    keys = _keys(60)
+    csv_path = _write_csv(in_tmp / "mp.csv", keys)
+    with ManifestoStub() as stub:
+        _point_at(loader, stub, monkeypatch)
+        loader.load_manifesto_and_save_texts(csv_path, max_workers=1, rate=1000, burst=10,
+                                             batch_size=20, max_batch_size=20, store_path="store.sqlite")
+    assert stub.request_count() == 3
+    stored = _stored(loader, "store.sqlite")
+    assert stored == {key: "\n".join(stub_text(key)) for key in keys}
+
+
+def test_batch_size_adapts_to_url_limit(loader, in_tmp, monkeypatch):
+    keys = _keys(60)
+    csv_path = _write_csv(in_tmp / "mp.csv", keys)
+    with ManifestoStub(max_keys=7, missing={keys[5]}) as stub:
+        _point_at(loader, stub, monkeypatch)
+        loader.load_manifesto_and_save_texts(csv_path, max_workers=1, rate=1000, burst=10,
+                                             batch_size=20, max_batch_size=50, store_path="store.sqlite")
+    stored = _stored(loader, "store.sqlite")
+    assert set(stored) == set(keys)
+    assert stored[keys[5]] is None
+    assert all(stored[key] == "\n".join(stub_text(key)) for key in keys if key != keys[5])
+    # 单线程时批大小确定：20 -> 10 被拒后减半，增长到 8 再被拒后上限降为 7，之后不再超限
+    sizes = [len(batch) for _, _, batch in stub.requests]
+    assert [size for size in sizes if size > 7] == [20, 10, 8]
+    assert len(sizes) < len(keys) // 3
+
+
+def test_concurrent_load_with_url_limit_completes(loader, in_tmp, monkeypatch):
+    keys = _keys(60)
+    csv_path = _write_csv(in_tmp / "mp.csv", keys)
+    with ManifestoStub(max_keys=7) as stub:
+        _point_at(loader, stub, monkeypatch)
+        loader.load_manifesto_and_save_texts(csv_path, max_workers=4, rate=1000, burst=10,
+                                             batch_size=20, max_batch_size=50, store_path="store.sqlite")
+    assert _stored(loader, "store.sqlite") == {key: "\n".join(stub_text(key)) for key in keys}
+
+
+def test_resume_skips_stored_keys(loader, in_tmp, monkeypatch):
+    keys = _keys(10)
+    csv_path = _write_csv(in_tmp / "mp.csv", keys)
+    with ManifestoStub() as stub:
+        _point_at(loader, stub, monkeypatch)
+        loader.load_manifesto_and_save_texts(csv_path, max_workers=2, rate=1000, burst=10, store_path="store.sqlite")
+        first = stub.request_count()
+        loader.load_manifesto_and_save_texts(csv_path, max_workers=2, rate=1000, burst=10, store_path="store.sqlite")
+    assert first > 0
+    assert stub.request_count() == first
+
+
+def test_rate_limit_bounds_request_rate(loader, in_tmp, monkeypatch):
+    keys = _keys(30)
+    csv_path = _write_csv(in_tmp / "mp.csv", keys)
+    rate, burst = 20.0, 2
+    with ManifestoStub() as stub:
+        _point_at(loader, stub, monkeypatch)
+        started = time.monotonic()
+        loader.load_manifesto_and_save_texts(csv_path, max_workers=8, rate=rate, burst=burst,
+                                             batch_size=1, max_batch_size=1, store_path="store.sqlite")
+        elapsed = time.monotonic() - started
+    times = sorted(t for t, _, _ in stub.requests)
+    assert len(times) == len(keys)
+    assert elapsed >= (len(keys) - burst) / rate * 0.9
+    window = 0.5
+    busiest = max(sum(1 for u in times if t <= u < t + window) for t in times)
+    assert busiest <= rate * window + burst + 1
+
+
+def test_token_bucket_penalize_pauses_all_callers(loader):
+    bucket = loader.TokenBucket(rate=50, burst=1)
+    bucket.acquire()
+    bucket.penalize(0.3)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.25
+
+
+def test_concurrent_penalties_do_not_stack(loader):
+    bucket = loader.TokenBucket(rate=50, burst=1)
+    bucket.acquire()
+    # eight workers hit the same 429 at once: the pause is 0.3 s, not 8 x 0.3 s
+    threads = [threading.Thread(target=bucket.penalize, args=(0.3,)) for _ in range(8)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    bucket.acquire()
+    assert 0.25 <= time.monotonic() - started < 0.6
+    # a longer Retry-After still extends the pause
+    bucket.penalize(0.1)
+    bucket.penalize(0.4)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.35
+
+
+def test_malformed_payload_does_not_hang(loader, in_tmp, monkeypatch):
+    keys = _keys(12)
+    csv_path = _write_csv(in_tmp / "mp.csv", keys)
+    with ManifestoStub(malformed={keys[3]}) as stub:
+        _point_at(loader, stub, monkeypatch)
+        worker = threading.Thread(target=loader.load_manifesto_and_save_texts, daemon=True,
+                                  kwargs=dict(path=csv_path, max_workers=2, rate=1000, burst=10,
+                                              batch_size=4, store_path="store.sqlite"))
+        worker.start()
+        worker.join(timeout=30)
+        assert not worker.is_alive(), "fetch hung on a malformed response"
+    stored = _stored(loader, "store.sqlite")
+    assert set(stored) == set(keys)
+    assert stored[keys[3]] is None
+    assert sum(text is not None for text in stored.values()) == len(keys) - 1
+
+
+def test_unexpected_fetch_error_requeues_batch(loader):
+    def fetch(session, keys, limiter=None):
+        if "k3" in keys:
+            raise AttributeError("unexpected payload")
+        return {key: {"text": key} for key in keys}
+
+    seen = {}
+
+    def handle(items):
+        seen.update(items)
+        return sum(item is not None for item in items.values())
+
+    result = {}
+    worker = threading.Thread(daemon=True, target=lambda: result.setdefault("found", loader._run_batches(
+        [f"k{i}" for i in range(10)], fetch, handle, "test", max_workers=2, rate=1000, burst=10, batch_size=2)))
+    worker.start()
+    worker.join(timeout=20)
+    assert not worker.is_alive(), "_run_batches hung after an unexpected exception"
+    assert result["found"] == 9
+    assert seen["k3"] is None
@@ -0,0 +1,195 @@
+"""Concurrent run.py: retries, error column and resumable output (request 048)."""
+
+import sys
+import threading
+import types
+
+import pandas as pd
+import pytest
+
+from conftest import load
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.acquired = 0
+        self.penalties = []
+
+    def acquire(self):
+        self.acquired += 1
+
+    def penalize(self, seconds):
+        self.penalties.append(seconds)
+
+
+@pytest.fixture
+def no_backoff(manifesto_run, monkeypatch):
+    """Zero-length jittered backoff; returns the recorded sleeps."""
+    sleeps = []
+    monkeypatch.setattr(manifesto_run, "random", types.SimpleNamespace(uniform=lambda a, b: 0.0))
+    monkeypatch.setattr(manifesto_run, "time", types.SimpleNamespace(sleep=sleeps.append))
+    return sleeps
+
+
+@pytest.mark.parametrize("generation, expected", [
+    ('{"predicted_rile": -12.5, "rationale": "left"}', {"predicted_rile": -12.5, "rationale": "left"}),
+    ('Sure! Here it is:\n{"predicted_rile": 30, "rationale": "r"}\nThanks.', {"predicted_rile": 30, "rationale": "r"}),
+    ('predicted_rile: -7.25 because ...', {"predicted_rile": -7.25, "rationale": "predicted_rile: -7.25 because ..."}),
+])
+def test_parse_prediction(manifesto_run, generation, expected):
+    assert manifesto_run.parse_prediction(generation) == expected
+
+
+def test_parse_prediction_rejects_text_without_a_score(manifesto_run):
+    with pytest.raises(ValueError, match="Unparseable"):
+        manifesto_run.parse_prediction("I cannot answer that.")
+
+
+def test_call_with_retries_counts_attempts(manifesto_run, no_backoff):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("connection reset")
+        return "ok"
+
+    limiter = FakeLimiter()
+    assert manifesto_run.call_with_retries(flaky, limiter, retries=4) == ("ok", 3)
+    assert limiter.acquired == 3
+    assert len(no_backoff) == 2 and limiter.penalties == []
+
+
+def test_throttling_pauses_the_shared_bucket(manifesto_run, no_backoff):
+    def throttled():
+        raise RuntimeError("ThrottlingException: rate exceeded")
+
+    limiter = FakeLimiter()
+    with pytest.raises(RuntimeError, match="ThrottlingException"):
+        manifesto_run.call_with_retries(throttled, limiter, retries=3)
+    assert limiter.acquired == 3
+    assert len(limiter.penalties) == 2 and no_backoff == []
+
+
+def test_query_prompt_reports_errors_separately(manifesto_run, no_backoff):
+    limiter = FakeLimiter()
+    manifesto_run.respond = lambda prompt: "no score here"
+    result = manifesto_run.query_prompt("prompt", "m", limiter, retries=4)
+    # unparseable output is not retried and goes to the error column, not the rationale
+    assert result["predicted_rile"] is None and result["rationale"] is None
+    assert result["error"].startswith("Invalid prediction") and result["attempts"] == 1
+    assert manifesto_run.prompts == ["prompt"]
+
+    def down(prompt):
+        raise RuntimeError("service unavailable")
+
+    manifesto_run.respond = down
+    result = manifesto_run.query_prompt("prompt", "m", limiter, retries=2)
+    assert result == {"predicted_rile": None, "rationale": None, "error": "service unavailable", "attempts": 2}
+
+
+def _manifestos(n):
+    return pd.DataFrame({"country": [11] * n, "party": [11110 + i for i in range(n)],
+                         "partyname": [f"Party {i}" for i in range(n)], "date": [201809] * n,
+                         "rile": [float(i) for i in range(n)], "text": [f"text of party {i}" for i in range(n)]})
+
+
+def _run(module, monkeypatch, df, *argv):
+    monkeypatch.setattr(module, "attach_texts", lambda frame, store_path: df)
+    monkeypatch.setattr(module, "load_manifesto_data", lambda sample_size: df.drop(columns="text"))
+    monkeypatch.setattr(sys, "argv", ["run.py", "--model", "m", "--out", "out.csv", "--workers", "4",
+                                      "--rate", "1000", "--burst", "10", *argv])
+    module.main()
+    return pd.read_csv("out.csv", dtype={"party_code": str, "year": str})
+
+
+def _party(prompt):
+    return int(prompt.split("text of party ")[1].split()[0])
+
+
+def test_concurrent_run_retries_and_keeps_input_order(manifesto_run, monkeypatch, no_backoff):
+    df = _manifestos(12)
+    failures = {}
+    lock = threading.Lock()
+
+    def respond(prompt):
+        i = _party(prompt)
+        with lock:
+            failures[i] = failures.get(i, 0) + 1
+            count = failures[i]
+        if i == 7:
+            raise RuntimeError("model error")
+        if i % 3 == 0 and count == 1:
+            raise RuntimeError("Too many requests")
+        return f'{{"predicted_rile": {i * 2}, "rationale": "party {i}"}}'
+
+    manifesto_run.respond = respond
+    results = _run(manifesto_run, monkeypatch, df, "--retries", "3")
+    assert list(results.columns) == manifesto_run.RESULT_COLUMNS
+    assert list(results["party_code"]) == [str(p) for p in df["party"]]
+    ok = results[results["party_code"] != "11117"]
+    assert list(ok["predicted_rile"]) == [i * 2.0 for i in range(12) if i != 7]
+    assert ok["error"].isna().all()
+    assert list(ok["attempts"]) == [2 if i % 3 == 0 else 1 for i in range(12) if i != 7]
+    failed = results[results["party_code"] == "11117"].iloc[0]
+    assert pd.isna(failed["predicted_rile"]) and pd.isna(failed["rationale"])
+    assert failed["error"] == "model error" and failed["attempts"] == 3
+
+
+def test_rerun_requests_only_failed_and_missing_manifestos(manifesto_run, monkeypatch, no_backoff):
+    df = _manifestos(6)
+    # an interrupted earlier run: two successes, one failure, the rest never written
+    pd.DataFrame([
+        {"country": 11, "party": "Party 0", "party_code": "11110", "year": "201809", "true_rile": 0.0,
+         "predicted_rile": -50.0, "rationale": "earlier", "attempts": 1, "segments": 1, "text_tokens": 4},
+        {"country": 11, "party": "Party 3", "party_code": "11113", "year": "201809", "true_rile": 3.0,
+         "predicted_rile": None, "error": "model error", "attempts": 4, "segments": 1, "text_tokens": 4},
+        {"country": 11, "party": "Party 4", "party_code": "11114", "year": "201809", "true_rile": 4.0,
+         "predicted_rile": 40.0, "rationale": "earlier", "attempts": 1, "segments": 1, "text_tokens": 4},
+    ]).reindex(columns=manifesto_run.RESULT_COLUMNS).to_csv("out.csv", index=False)
+
+    results = _run(manifesto_run, monkeypatch, df)
+    assert sorted(_party(p) for p in manifesto_run.prompts) == [1, 2, 3, 5]
+    # one row per manifesto, in input order, earlier successes kept and the failure replaced
+    assert list(results["party_code"]) == [str(p) for p in df["party"]]
+    assert list(results["predicted_rile"]) == [-50.0, 10.0, 10.0, 10.0, 40.0, 10.0]
+    assert results["error"].isna().all()
+
+    manifesto_run.prompts.clear()
+    _run(manifesto_run, monkeypatch, df)
+    assert manifesto_run.prompts == []
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_manifestos_without_text_are_not_sent_to_the_model(manifesto_run, monkeypatch, no_backoff, chunked):
+    store_module = load("FPP_MANIFESTO_2025_base", "manifesto_store")
+    df = _manifestos(5)
+    df.loc[[1, 3], "text"] = store_module.NO_TEXT_PLACEHOLDER
+    df.loc[4, "text"] = ""
+    results = _run(manifesto_run, monkeypatch, df, *(["--chunk-tokens", "50"] if chunked else []))
+    assert sorted(_party(p) for p in manifesto_run.prompts) == [0, 2]
+    assert list(results["party_code"]) == [str(p) for p in df["party"]]
+    missing = results.iloc[[1, 3, 4]]
+    assert (missing["error"] == "No text available").all() and missing["predicted_rile"].isna().all()
+    assert (missing["attempts"] == 0).all()
+    assert list(results["predicted_rile"].iloc[[0, 2]]) == [10.0, 10.0]
+
+    # a rerun tries the missing manifestos again (their text may have been fetched since)
+    manifesto_run.prompts.clear()
+    df.loc[[1, 3, 4], "text"] = ["text of party 1", "text of party 3", "text of party 4"]
+    results = _run(manifesto_run, monkeypatch, df)
+    assert sorted(_party(p) for p in manifesto_run.prompts) == [1, 3, 4]
+    assert results["error"].isna().all()
+
+
+def test_attach_texts_joins_the_store_by_party_date(manifesto_run, tmp_path):
+    store_module = load("FPP_MANIFESTO_2025_base", "manifesto_store")
+    path = str(tmp_path / "store.sqlite")
+    store = store_module.ManifestoStore(path)
+    store.put_many([("11110", "201809", "first text"), ("11111", "201809", None)])
+    store.close()
+    df = _manifestos(3).drop(columns="text")
+    df["date"] = df["date"].astype(str)
+    attached = manifesto_run.attach_texts(df, path)
+    assert list(attached["text"]) == ["first text", store_module.NO_TEXT_PLACEHOLDER,
+                                      store_module.NO_TEXT_PLACEHOLDER]
@@ -0,0 +1,282 @@
+"""ManifestoStore round trips and quasi-sentence annotations (requests 043/044)."""
+
+import importlib.util
+import threading
+
+import numpy as np
+
+import pandas as pd
+import pytest
+
+from conftest import load
+from manifesto_stub import ManifestoStub, stub_text
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+
+TEXTS = {
+    ("11220", "196009"): "Line one.\nLigne deux – é, ü, 中文.\n",
+    ("11320", "201909"): "We will cut taxes. " * 2000,
+    ("11420", "202109"): "",
+    ("11520", "199803"): None,
+}
+
+
+@pytest.fixture
+def store_module():
+    return load(FOLDER, "manifesto_store")
+
+
+@pytest.fixture
+def store(store_module, tmp_path):
+    store = store_module.ManifestoStore(str(tmp_path / "store.sqlite"))
+    yield store
+    store.close()
+
+
+def test_texts_round_trip(store):
+    store.put_many([(party, date, text) for (party, date), text in TEXTS.items()])
+    for (party, date), text in TEXTS.items():
+        assert store.has(party, date)
+        assert store.get(party, date) == text
+    assert not store.has("99999", "200001")
+    assert store.get("99999", "200001") is None
+    assert len(store) == len(TEXTS)
+    assert store.keys() == {f"{p}_{d}" for p, d in TEXTS}
+    assert store.keys(include_missing=False) == {f"{p}_{d}" for (p, d), t in TEXTS.items() if t is not None}
+    assert store.load_texts() == {f"{p}_{d}": t for (p, d), t in TEXTS.items() if t is not None}
+
+
+def test_texts_survive_reopening(store_module, store):
+    store.put_many([(party, date, text) for (party, date), text in TEXTS.items()])
+    store.close()
+    reopened = store_module.ManifestoStore(store.path)
+    try:
+        assert dict(((p, d), t) for p, d, t in reopened.iter_texts(include_missing=True)) == TEXTS
+    finally:
+        reopened.close()
+
+
+def test_texts_are_compressed(store):
+    party, date = "11320", "201909"
+    store.put(party, date, TEXTS[(party, date)])
+    blob = store.conn.execute("SELECT text FROM manifestos WHERE party=?", (party,)).fetchone()[0]
+    assert len(blob) < len(TEXTS[(party, date)].encode("utf-8")) / 10
+
+
+def test_put_replaces_and_versions_are_separate(store_module, store):
+    store.put("11220", "196009", "old")
+    store.put("11220", "196009", "new")
+    assert store.get("11220", "196009") == "new"
+    assert len(store) == 1
+    for other in (store_module.ManifestoStore(store.path, version="2023-1"),
+                  store_module.ManifestoStore(store.path, translation="original")):
+        assert not other.has("11220", "196009")
+        assert len(other) == 0
+        other.close()
+
+
+def test_concurrent_writers_and_readers(store):
+    def write(worker):
+        for i in range(50):
+            store.put(f"{worker}", f"2000{i:02d}", f"text {worker} {i}")
+
+    def read():
+        for _ in range(50):
+            store.keys()
+            store.load_texts()
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)] + [threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    texts = store.load_texts()
+    assert len(texts) == 200
+    assert texts["3_200049"] == "text 3 49"
+
+
+def test_import_txt_dir_matches_files(store_module, store, tmp_path):
+    legacy = tmp_path / "manifesto_text"
+    legacy.mkdir()
+    (legacy / "11220_196009.txt").write_text("first\nsecond", encoding="utf-8")
+    (legacy / "11320_201909.txt").write_text(store_module.NO_TEXT_PLACEHOLDER, encoding="utf-8")
+    (legacy / "notes.md").write_text("ignored", encoding="utf-8")
+    assert store.import_txt_dir(str(legacy), batch_size=1) == 2
+    assert store.get("11220", "196009") == "first\nsecond"
+    assert store.has("11320", "201909") and store.get("11320", "201909") is None
+
+
+def test_loader_imports_legacy_dir_and_fetches_the_rest(in_tmp, monkeypatch):
+    pytest.importorskip("requests")
+    pytest.importorskip("tqdm")
+    loader = load(FOLDER, "data_loader_v2")
+    monkeypatch.setattr(loader, "LOG_FILE", str(in_tmp / "errors.log"))
+    monkeypatch.setattr(loader, "LEGACY_DIR", str(in_tmp / "manifesto_text"))
+    keys = [f"{10000 + i}_200001" for i in range(4)]
+    (in_tmp / "manifesto_text").mkdir()
+    for key in keys[:2]:
+        (in_tmp / "manifesto_text" / f"{key}.txt").write_text(f"legacy {key}", encoding="utf-8")
+    pd.DataFrame({"party": [k.split("_")[0] for k in keys],
+                  "date": [k.split("_")[1] for k in keys]}).to_csv(in_tmp / "mpds.csv", index=False)
+
+    with ManifestoStub() as stub:
+        monkeypatch.setattr(loader, "BASE_URL", stub.texts_url)
+        loader.load_manifesto_and_save_texts(str(in_tmp / "mpds.csv"), max_workers=1, rate=1000,
+                                             store_path=str(in_tmp / "store.sqlite"))
+        requested = [k for _, path, batch in stub.requests for k in batch]
+
+    assert sorted(requested) == keys[2:]
+    store = loader.ManifestoStore(str(in_tmp / "store.sqlite"), loader.VERSION, loader.TRANSLATION)
+    try:
+        assert store.load_texts() == {**{k: f"legacy {k}" for k in keys[:2]},
+                                      **{k: "\n".join(stub_text(k)) for k in keys[2:]}}
+    finally:
+        store.close()
+
+
+ANNOTATED = {
+    ("11220", "196009"): [("201.1", "1"), ("201.2", None), ("504", None), (None, None)],
+    ("11320", "201909"): [("504", None), ("504", None), ("H", None)],
+    ("11320", "201303"): [("103_1", None), ("605.1", "2")],
+}
+
+
+def _put_annotated(store):
+    store.put_many([(party, date, "\n".join(f"sentence {i}" for i in range(len(codes))), codes)
+                    for (party, date), codes in ANNOTATED.items()])
+
+
+def test_annotations_round_trip_and_align_with_lines(store):
+    _put_annotated(store)
+    for (party, date), codes in ANNOTATED.items():
+        assert store.get_annotations(party, date) == codes
+        assert len(store.get(party, date).splitlines()) == len(codes)
+    frame = store.load_annotations()
+    assert len(frame) == sum(len(codes) for codes in ANNOTATED.values())
+    assert frame["cmp_code"].dtype == "category" and frame["pos"].dtype == "int32"
+
+
+def test_reput_replaces_annotations(store):
+    _put_annotated(store)
+    store.put("11220", "196009", "only one", [("305", None)])
+    store.put("11320", "201909", "text without codes")
+    assert store.get_annotations("11220", "196009") == [("305", None)]
+    # rows without an annotations element leave the stored codes untouched
+    assert store.get_annotations("11320", "201909") == ANNOTATED[("11320", "201909")]
+
+
+def _as_dict(counts):
+    return {(party, date, None if pd.isna(code) else code): n
+            for party, date, code, n in counts[["party", "date", "cmp_code", "count"]].itertuples(index=False)}
+
+
+def test_code_counts_equal_grouped_annotations(store):
+    _put_annotated(store)
+    counts = store.code_counts()
+    frame = store.load_annotations().astype({"party": str, "date": str, "cmp_code": object})
+    expected = (frame.groupby(["party", "date", "cmp_code"], dropna=False).size()
+                .reset_index(name="count"))
+    assert _as_dict(counts) == _as_dict(expected)
+
+
+def test_loader_stores_annotations_aligned_with_text(in_tmp, monkeypatch):
+    pytest.importorskip("requests")
+    pytest.importorskip("tqdm")
+    loader = load(FOLDER, "data_loader_v2")
+    monkeypatch.setattr(loader, "LOG_FILE", str(in_tmp / "errors.log"))
+    monkeypatch.setattr(loader, "LEGACY_DIR", str(in_tmp / "manifesto_text"))
+    item = {"key": "11220_196009", "items": [{"text": "Two\nlines.", "cmp_code": 201.1, "eu_code": None},
+                                            {"text": "Plain.", "cmp_code": None, "eu_code": 3}]}
+    text, codes = loader._item_text(item), loader._item_annotations(item)
+    assert text.splitlines() == ["Two lines.", "Plain."]
+    assert codes == [("201.1", None), (None, "3")]
+
+    with ManifestoStub() as stub:
+        monkeypatch.setattr(loader, "BASE_URL", stub.texts_url)
+        pd.DataFrame({"party": ["11220"], "date": ["196009"]}).to_csv(in_tmp / "mpds.csv", index=False)
+        loader.load_manifesto_and_save_texts(str(in_tmp / "mpds.csv"), max_workers=1, rate=1000,
+                                             store_path=str(in_tmp / "store.sqlite"))
+    store = loader.ManifestoStore(str(in_tmp / "store.sqlite"), loader.VERSION, loader.TRANSLATION)
+    try:
+        assert store.get("11220", "196009").splitlines() == stub_text("11220_196009")
+        assert store.get_annotations("11220", "196009") == [("201", None)] * 3
+    finally:
+        store.close()
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is not None, reason="pyarrow installed")
+def test_parquet_export_requires_pyarrow(store):
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        store.export_annotations_parquet("annotations.parquet")
+
+
+def test_parquet_export_round_trip(store, tmp_path):
+    pytest.importorskip("pyarrow")
+    _put_annotated(store)
+    path = tmp_path / "annotations.parquet"
+    assert store.export_annotations_parquet(str(path)) == 9
+    pd.testing.assert_frame_equal(pd.read_parquet(path), store.load_annotations())
+
+
+def test_gold_topic_distributions_are_coded_shares(tmp_path, monkeypatch):
+    gen_store = load("FPP_MANIFESTO_2025_gen", "manifesto_store")
+    topics = load("FPP_MANIFESTO_2025_gen", "manifesto_loader")
+    path = str(tmp_path / "store.sqlite")
+    store = gen_store.ManifestoStore(path)
+    _put_annotated(store)
+    store.close()
+
+    gold = topics.gold_topic_distributions(path)
+    assert set(gold) == {("11220", "196009"), ("11320", "201909"), ("11320", "201303")}
+    index = topics.MANIFESTO_TOPICS.index
+    expected = np.zeros(56)
+    expected[index("201")], expected[index("504")] = 2 / 3, 1 / 3   # uncoded sentence ignored
+    np.testing.assert_allclose(gold[("11220", "196009")], expected)
+    expected = np.zeros(56)
+    expected[index("504")] = 1.0                                      # headline "H" ignored
+    np.testing.assert_allclose(gold[("11320", "201909")], expected)
+    expected = np.zeros(56)
+    expected[index("103")], expected[index("605")] = 0.5, 0.5
+    np.testing.assert_allclose(gold[("11320", "201303")], expected)
+
+    # every group is gold-coded: the model must not be loaded
+    csv = tmp_path / "sentences.csv"
+    pd.DataFrame({"party": [11220, 11320], "country": [11, 11], "year": [1960, 2019],
+                  "text": ["a", "b"]}).to_csv(csv, index=False)
+    monkeypatch.setattr(topics, "_load_manifestoberta", lambda: pytest.fail("model loaded"))
+    result = topics.generate_policy_topics(str(csv), store_path=path)
+    assert list(result["topic_source"]) == ["gold", "gold"]
+    np.testing.assert_allclose(result["topic_distribution"][1], gold[("11320", "201909")])
+
+
+def test_gold_topics_are_matched_by_election_date(tmp_path):
+    gen_store = load("FPP_MANIFESTO_2025_gen", "manifesto_store")
+    topics = load("FPP_MANIFESTO_2025_gen", "manifesto_loader")
+    path = str(tmp_path / "store.sqlite")
+    store = gen_store.ManifestoStore(path)
+    # two elections in 1974: the shares stay apart instead of being pooled by year
+    store.put_many([("51620", "197402", "a\nb", [("504", None), ("504", None)]),
+                    ("51620", "197410", "c", [("605", None)])])
+    store.close()
+    gold = topics.gold_topic_distributions(path)
+    assert set(gold) == {("51620", "197402"), ("51620", "197410")}
+    assert topics._gold_key(gold, 51620, 197410) == ("51620", "197410")
+    assert topics._gold_key(gold, 51620, 1974) is None     # ambiguous year
+    assert topics._gold_key(gold, 51620, 1979) is None
+
+
+def test_gold_topics_read_the_requested_version_and_translation(tmp_path):
+    gen_store = load("FPP_MANIFESTO_2025_gen", "manifesto_store")
+    topics = load("FPP_MANIFESTO_2025_gen", "manifesto_loader")
+    path = str(tmp_path / "store.sqlite")
+    store = gen_store.ManifestoStore(path, version="2025-1", translation="original")
+    _put_annotated(store)
+    store.close()
+    assert topics.gold_topic_distributions(path) == {}
+    gold = topics.gold_topic_distributions(path, version="2025-1", translation="original")
+    assert set(gold) == {("11220", "196009"), ("11320", "201909"), ("11320", "201303")}
+
+    csv = tmp_path / "sentences.csv"
+    pd.DataFrame({"party": [11320], "country": [11], "year": [201303], "text": ["a"]}).to_csv(csv, index=False)
+    result = topics.generate_policy_topics(str(csv), store_path=path, version="2025-1", translation="original")
+    np.testing.assert_allclose(result["topic_distribution"][0], gold[("11320", "201303")])
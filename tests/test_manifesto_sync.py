@@ -0,0 +1,99 @@
+"""md5-based delta sync of data_loader_v2.py against the stub API (request 045)."""
+
+import pandas as pd
+import pytest
+
+from conftest import load
+from manifesto_stub import ManifestoStub, stub_text
+
+pytest.importorskip("requests")
+pytest.importorskip("tqdm")
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+KEYS = [f"{10000 + i}_200001" for i in range(6)]
+MISSING = {KEYS[5]}
+CHANGED = {KEYS[0], KEYS[1]}
+
+
+@pytest.fixture
+def loader(in_tmp, monkeypatch):
+    module = load(FOLDER, "data_loader_v2")
+    monkeypatch.setattr(module, "LOG_FILE", str(in_tmp / "errors.log"))
+    monkeypatch.setattr(module, "LEGACY_DIR", str(in_tmp / "manifesto_text"))
+    pd.DataFrame({"party": [k.split("_")[0] for k in KEYS],
+                  "date": [k.split("_")[1] for k in KEYS]}).to_csv(in_tmp / "mpds.csv", index=False)
+    return module
+
+
+@pytest.fixture
+def stub(loader, monkeypatch):
+    with ManifestoStub(missing=MISSING, changed=CHANGED) as stub:
+        monkeypatch.setattr(loader, "BASE_URL", stub.texts_url)
+        monkeypatch.setattr(loader, "METADATA_URL", stub.metadata_url)
+        yield stub
+
+
+def _sync(loader, stub, monkeypatch, version="2024-1"):
+    """Run one sync of `version`; returns the keys whose text was requested."""
+    monkeypatch.setattr(loader, "VERSION", version)
+    before = len(stub.requests)
+    loader.sync_manifestos("mpds.csv", max_workers=1, rate=1000, store_path="store.sqlite")
+    return sorted(key for _, path, keys in stub.requests[before:]
+                  if path.endswith("/texts_and_annotations") for key in keys)
+
+
+def _open(loader, version="2024-1"):
+    return loader.ManifestoStore("store.sqlite", version, loader.TRANSLATION)
+
+
+def test_first_sync_fetches_everything_and_records_md5(loader, stub, monkeypatch):
+    assert _sync(loader, stub, monkeypatch) == sorted(set(KEYS) - MISSING)
+    store = _open(loader)
+    try:
+        assert store.load_texts() == {key: "\n".join(stub_text(key)) for key in KEYS if key not in MISSING}
+        assert store.keys() == set(KEYS)   # the missing manifesto is recorded without text
+        assert store.checksums() == {key: stub.md5(key, "2024-1") for key in KEYS if key not in MISSING}
+    finally:
+        store.close()
+
+
+def test_repeated_sync_requests_only_metadata(loader, stub, monkeypatch):
+    _sync(loader, stub, monkeypatch)
+    metadata_requests = stub.request_count("/metadata")
+    assert _sync(loader, stub, monkeypatch) == []
+    assert stub.request_count("/metadata") > metadata_requests
+
+
+def test_texts_without_recorded_md5_are_adopted(loader, stub, monkeypatch):
+    loader.load_manifesto_and_save_texts("mpds.csv", max_workers=1, rate=1000, store_path="store.sqlite")
+    assert _sync(loader, stub, monkeypatch) == []
+    store = _open(loader)
+    try:
+        assert store.checksums() == {key: stub.md5(key, "2024-1") for key in KEYS if key not in MISSING}
+    finally:
+        store.close()
+
+
+def test_new_version_copies_unchanged_and_fetches_changed(loader, stub, monkeypatch):
+    _sync(loader, stub, monkeypatch, "2024-1")
+    assert _sync(loader, stub, monkeypatch, "2025-1") == sorted(CHANGED)
+
+    store = _open(loader, "2025-1")
+    try:
+        # unchanged manifestos are copied from 2024-1 (text, codes, md5); changed ones are downloaded
+        expected = {key: "\n".join(stub_text(key, "2025-1" if key in CHANGED else "2024-1"))
+                    for key in KEYS if key not in MISSING}
+        assert store.load_texts() == expected
+        assert store.checksums() == {key: stub.md5(key, "2025-1") for key in KEYS if key not in MISSING}
+        for key in KEYS:
+            if key not in MISSING:
+                assert store.get_annotations(*key.split("_")) == [("201", None)] * 3
+    finally:
+        store.close()
+    previous = _open(loader, "2024-1")
+    try:
+        assert previous.load_texts() == {key: "\n".join(stub_text(key)) for key in KEYS if key not in MISSING}
+    finally:
+        previous.close()
+    # a second pass over the new version is a no-op
+    assert _sync(loader, stub, monkeypatch, "2025-1") == []
@@ -0,0 +1,91 @@
+"""constrcuct_small_MPDataset.py: streamed subsets (request 047)."""
+
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT, load
+
+FOLDER = "FPP_MANIFESTO_2025_base"
+
+
+@pytest.fixture
+def mpds():
+    return load(FOLDER, "constrcuct_small_MPDataset")
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "countryname": rng.choice(["Germany", "France", "United States", "Sweden"], n),
+        "party": rng.integers(10000, 99999, n),
+        "date": rng.integers(1945, 2024, n) * 100 + rng.integers(1, 13, n),
+        "parfam": rng.choice([10, 20, 30, 40, 50, 60, 70, 999], n),
+        "rile": np.round(rng.normal(0, 20, n), 3),
+        "per101": rng.choice(["0.5", "", "1.25e-1", "NA"], n),
+    })
+    path = tmp_path / "mpds.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_subsets_match_in_memory_filter(mpds, source, tmp_path):
+    subsets = [
+        mpds.make_subset(str(tmp_path / "all_de.csv"), countries=["Germany"]),
+        mpds.make_subset(str(tmp_path / "postwar_left.csv"), years=(1945, 1990), parfam=["SOC", "lef"]),
+        mpds.make_subset(str(tmp_path / "mix.csv"), countries=["France", "Sweden"], years=(2000, 2023), parfam=[40, "60"]),
+        mpds.make_subset(str(tmp_path / "empty.csv"), countries=["Atlantis"]),
+    ]
+    total, counts = mpds.build_subsets(subsets, source, chunksize=137)
+    raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    year = raw["date"].astype(int) // 100
+    parfam = raw["parfam"].astype(int)
+    expected = {
+        "all_de.csv": raw[raw["countryname"] == "Germany"],
+        "postwar_left.csv": raw[year.between(1945, 1990) & parfam.isin([30, 20])],
+        "mix.csv": raw[raw["countryname"].isin(["France", "Sweden"]) & year.between(2000, 2023) & parfam.isin([40, 60])],
+        "empty.csv": raw.iloc[:0],
+    }
+    assert total == len(raw)
+    for name, rows in expected.items():
+        out = pd.read_csv(tmp_path / name, dtype=str, keep_default_na=False)
+        assert counts[str(tmp_path / name)] == len(rows)
+        pd.testing.assert_frame_equal(out, rows.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("rows", ["all", "header_only"])
+def test_filter_that_matches_nothing_writes_the_header(mpds, source, tmp_path, rows):
+    if rows == "header_only":
+        path = tmp_path / "header_only.csv"
+        path.write_text(open(source).readline())
+        source = str(path)
+    out = str(tmp_path / "none.csv")
+    total, counts = mpds.build_subsets([mpds.make_subset(out, countries=["Atlantis"], parfam=["SOC"])], source,
+                                       chunksize=50)
+    assert counts == {out: 0} and total == (0 if rows == "header_only" else 2000)
+    empty = pd.read_csv(out, dtype=str)
+    assert empty.empty and list(empty.columns) == list(pd.read_csv(source, nrows=0).columns)
+
+
+def test_unknown_party_family_is_rejected_up_front(mpds):
+    assert mpds.parfam_code("soc") == 30 and mpds.parfam_code("999") == 999 and mpds.parfam_code(40) == 40
+    for bad in ["XYZ", "31", -1]:
+        with pytest.raises(ValueError, match="Valid abbreviations.*SOC \\(30\\)"):
+            mpds.make_subset("out.csv", parfam=["SOC", bad])
+
+
+def test_cli_reports_unknown_party_family_before_reading(tmp_path):
+    spec = tmp_path / "subsets.json"
+    spec.write_text(json.dumps([{"output": str(tmp_path / "a.csv"), "parfam": ["XYZ"]}]))
+    result = subprocess.run([sys.executable, str(ROOT / FOLDER / "constrcuct_small_MPDataset.py"),
+                             "--subsets", str(spec), "--input", str(tmp_path / "missing.csv")],
+                            capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 2
+    assert "Unknown party family 'XYZ'" in result.stderr and "SOC (30)" in result.stderr
+    assert not (tmp_path / "a.csv").exists()
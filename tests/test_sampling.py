@@ -0,0 +1,78 @@
+"""sampling.py: stratified orders and design-weighted subsamples (requests 037/038)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_ANES_2016_base"
+
+
+@pytest.fixture
+def sampling():
+    return load(FOLDER, "sampling")
+
+
+def _population(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    state = rng.choice(["CA", "TX", "NY", "WY", "VT"], n, p=[0.4, 0.3, 0.2, 0.06, 0.04])
+    party = rng.choice([1, 4, 7], n)
+    # 投票倾向随州和党派变化，使分层有意义
+    p_rep = np.where(party == 7, 0.85, np.where(party == 1, 0.1, 0.5)) + np.where(state == "WY", 0.1, 0)
+    vote = np.where(rng.random(n) < p_rep, 1, -1)
+    return pd.DataFrame({"state": state, "party": party, "vote": vote})
+
+
+def test_inclusion_probabilities_and_weights(sampling):
+    data = _population()
+    n, draws = 200, 300
+    hits = np.zeros(len(data))
+    estimates = []
+    for seed in range(draws):
+        sample = sampling.stratified_sample(data, ["state", "party"], n, seed=seed, min_per_stratum=3)
+        assert sample.index.is_unique
+        hits[sample.index.to_numpy()] += 1
+        shares = sampling.weighted_vote_shares(data["vote"].to_numpy()[sample.index], sample["design_weight"],
+                                               sample["stratum"])
+        estimates.append(shares["Republican"][0])
+    sample = sampling.stratified_sample(data, ["state", "party"], n, seed=0, min_per_stratum=3)
+    # 同一层内每行的设计权重都是 1 / 入样概率
+    expected_prob = 1 / sample.groupby("stratum")["design_weight"].first()
+    codes = data.groupby(["state", "party"], sort=True).ngroup().to_numpy()
+    observed_prob = pd.Series(hits / draws).groupby(codes).mean()
+    np.testing.assert_allclose(observed_prob.to_numpy(), expected_prob.sort_index().to_numpy(), rtol=0.1)
+    # Hajek 份额在重复抽样下近似无偏
+    truth = np.mean(data["vote"] == 1)
+    assert np.mean(estimates) == pytest.approx(truth, abs=0.01)
+
+
+def test_sample_size_and_minimum_per_stratum(sampling):
+    data = _population(seed=1)
+    sizes = data.groupby(["state", "party"]).size().to_numpy()
+    allocation = np.minimum(np.maximum(150 * sizes / len(data), 5), sizes)
+    for seed in range(20):
+        sample = sampling.stratified_sample(data, ["state", "party"], 150, seed=seed, min_per_stratum=5)
+        assert abs(len(sample) - allocation.sum()) <= 1
+        assert sample.groupby("stratum").size().min() >= 5
+
+
+def test_weighted_shares_match_hajek_formula(sampling):
+    rng = np.random.default_rng(3)
+    scores = rng.choice([1, -1, 0], 80)
+    weights = rng.uniform(1, 10, 80)
+    shares = sampling.weighted_vote_shares(scores, weights)
+    for label, value in (("Republican", 1), ("Democratic", -1), ("No Preference", 0)):
+        assert shares[label][0] == pytest.approx(np.sum(weights * (scores == value)) / weights.sum())
+    assert sum(estimate for estimate, _ in shares.values()) == pytest.approx(1.0)
+
+
+def test_stratified_order_keeps_prefixes_proportional(sampling):
+    data = _population(seed=4)
+    order = sampling.stratified_order(data, ["state"], seed=0)
+    assert sorted(order) == list(range(len(data)))
+    population = data["state"].value_counts(normalize=True)
+    for t in (100, 500, 1500):
+        prefix = data["state"].iloc[order[:t]].value_counts()
+        # 每层在前 t 个中的数量与 t * 比例相差不超过 1
+        assert (abs(prefix.reindex(population.index, fill_value=0) - t * population) <= 1 + 1e-9).all()
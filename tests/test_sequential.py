@@ -0,0 +1,67 @@
+"""sequential.py: confidence sequences and the early-stopping rule (request 037)."""
+
+import numpy as np
+import pytest
+
+from conftest import load
+
+FOLDER = "FPP_ANES_2016_base"
+
+
+@pytest.fixture
+def sequential():
+    return load(FOLDER, "sequential")
+
+
+def test_confidence_sequence_holds_at_every_step(sequential):
+    rng = np.random.default_rng(0)
+    N, alpha, runs = 1500, 0.05, 100
+    population = (rng.random(N) < 0.4).astype(float)
+    truth = population.mean()
+    misses = 0
+    for _ in range(runs):
+        cs = sequential.WoRConfidenceSequence(N, alpha)
+        missed = False
+        for x in population[rng.permutation(N)]:
+            low, high = cs.update(x)
+            missed |= not (low <= truth <= high)
+        misses += missed
+        # t = N 时区间收缩为总体均值
+        assert cs.low == cs.high == pytest.approx(truth)
+    # 任意时刻同时成立：整条路径上出错的比例不超过 alpha（留出模拟误差）
+    assert misses <= runs * alpha + 5
+
+
+def test_intervals_only_shrink(sequential):
+    cs = sequential.WoRConfidenceSequence(500, 0.05, target_half_width=0.05)
+    widths = [cs.update(x)[1] - cs.low for x in np.random.default_rng(1).integers(0, 2, 500)]
+    assert all(later <= earlier + 1e-12 for earlier, later in zip(widths, widths[1:]))
+
+
+def test_too_many_observations(sequential):
+    cs = sequential.WoRConfidenceSequence(3)
+    for x in (1, 0, 1):
+        cs.update(x)
+    with pytest.raises(ValueError):
+        cs.update(1)
+
+
+@pytest.mark.parametrize("precision", [0.03, 0.05])
+def test_stopping_rule_reaches_precision_early_and_covers(sequential, precision):
+    rng = np.random.default_rng(2)
+    N, alpha, runs = 4270, 0.05, 40
+    scores = rng.choice([1, -1, 0], N, p=[0.45, 0.47, 0.08])
+    truth = {"Republican": np.mean(scores == 1), "Democratic": np.mean(scores == -1)}
+    stops, misses = [], 0
+    for _ in range(runs):
+        shares = sequential.SequentialVoteShares(N, precision=precision, alpha=alpha)
+        for score in scores[rng.permutation(N)]:
+            shares.update(score)
+            if shares.done:
+                break
+        assert shares.done
+        assert all(cs.half_width <= precision for cs in shares.shares.values())
+        stops.append(shares.n)
+        misses += any(not (s["low"] <= truth[name] <= s["high"]) for name, s in shares.summary().items())
+    assert max(stops) < N
+    assert misses <= runs * alpha + 3
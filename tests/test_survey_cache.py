@@ -0,0 +1,163 @@
+"""survey_cache.py round trips and rebuilds (request 039)."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT, load
+
+FOLDER = "FPP_ANES_2016_base"
+
+
+@pytest.fixture
+def cache():
+    return load(FOLDER, "survey_cache")
+
+
+def _plain(frame):
+    """memmap -> ndarray so assert_frame_equal compares values, not array classes"""
+    return pd.DataFrame({col: frame[col].to_numpy(dtype=float, na_value=np.nan)
+                         if pd.api.types.is_numeric_dtype(frame[col]) and frame[col].dtype != bool else frame[col]
+                         for col in frame.columns})
+
+
+@pytest.fixture
+def survey(tmp_path):
+    path = tmp_path / "survey.csv"
+    pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "state": ["CA", None, "TX", "CA"],
+        "p_trump": [0.1, np.nan, 0.7, 0.4],
+        "party": [1, np.nan, 7, -9],
+        "voted": [True, False, True, True],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def _is_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def _entry_dir(cache_dir):
+    return next(p for p in cache_dir.iterdir() if p.is_dir())
+
+
+def _entries(cache_dir):
+    return sorted(p.name for p in cache_dir.iterdir() if p.is_dir())
+
+
+def test_anes_csv_round_trip(cache, tmp_path):
+    csv_path = str(ROOT / FOLDER / "full_results_2016_2.csv")
+    expected = pd.read_csv(csv_path)
+    for _ in range(2):  # 构建，然后从缓存读取
+        loaded = cache.load_survey(csv_path, cache_dir=str(tmp_path))
+        pd.testing.assert_frame_equal(_plain(loaded), _plain(expected))
+        codes = [col for col in expected.columns if col.startswith("V16") and col != "V160001_orig"]
+        assert {str(loaded[col].dtype) for col in codes} == {"Int8"}
+        assert str(loaded["V160001_orig"].dtype) == "Int32" and loaded["p_trump"].dtype == "float64"
+
+
+def test_survey_codes_are_nullable_integers(cache, survey, tmp_path):
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    loaded = cache.load_survey(survey, cache_dir=str(tmp_path))
+    assert str(loaded["party"].dtype) == "Int8" and str(loaded["id"].dtype) == "Int8"
+    assert loaded["party"].isna().tolist() == [False, True, False, False]
+    assert loaded["party"].dropna().tolist() == [1, 7, -9]
+    assert _is_mapped(loaded["party"].array._data) and _is_mapped(loaded["party"].array._mask)
+    assert loaded["p_trump"].dtype == "float64" and loaded["voted"].dtype == bool
+
+
+def test_string_columns_round_trip_and_numeric_columns_are_mapped(cache, survey, tmp_path):
+    expected = pd.read_csv(survey)
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    loaded = cache.load_survey(survey, cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(_plain(loaded), _plain(expected))
+    assert _is_mapped(loaded["p_trump"].to_numpy()) and _is_mapped(loaded["id"].array._data)
+    projected = cache.load_survey(survey, columns=["state", "id"], cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(_plain(projected), _plain(expected[["state", "id"]]))
+
+
+def test_unchanged_csv_is_not_rehashed(cache, survey, tmp_path, monkeypatch):
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    calls = []
+    real = cache._file_sha256
+    monkeypatch.setattr(cache, "_file_sha256", lambda path: calls.append(path) or real(path))
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    assert calls == []
+    with open(survey, "a") as f:
+        f.write("5,NY,0.5,2,False\n")
+    assert len(cache.load_survey(survey, cache_dir=str(tmp_path))) == 5
+    assert calls == [survey]
+
+
+@pytest.mark.parametrize("damage", ["missing", "empty", "truncated_header", "truncated_data"])
+def test_damaged_column_file_triggers_rebuild(cache, survey, tmp_path, damage):
+    expected = pd.read_csv(survey)
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    column = _entry_dir(tmp_path) / "p_trump.npy"
+    data = column.read_bytes()
+    if damage == "missing":
+        column.unlink()
+    else:
+        column.write_bytes({"empty": b"", "truncated_header": data[:40], "truncated_data": data[:-8]}[damage])
+    pd.testing.assert_frame_equal(_plain(cache.load_survey(survey, cache_dir=str(tmp_path))), _plain(expected))
+    assert column.read_bytes() == data
+
+
+def test_damaged_mask_file_triggers_rebuild(cache, survey, tmp_path):
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    (_entry_dir(tmp_path) / "party.mask.npy").unlink()
+    assert cache.load_survey(survey, cache_dir=str(tmp_path))["party"].isna().sum() == 1
+    assert (_entry_dir(tmp_path) / "party.mask.npy").exists()
+
+
+def test_entry_in_the_previous_format_is_rebuilt(cache, survey, tmp_path):
+    cache.load_survey(survey, cache_dir=str(tmp_path))
+    meta_path = _entry_dir(tmp_path) / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    del meta["format"]
+    meta_path.write_text(json.dumps(meta))
+    assert str(cache.load_survey(survey, cache_dir=str(tmp_path))["party"].dtype) == "Int8"
+    assert json.loads(meta_path.read_text())["format"] == cache.CACHE_FORMAT
+
+
+def test_rebuild_evicts_entries_of_changed_and_deleted_csvs(cache, survey, tmp_path):
+    cache_dir = tmp_path / "cache"
+    other = tmp_path / "other.csv"
+    pd.DataFrame({"id": [1, 2]}).to_csv(other, index=False)
+    cache.load_survey(survey, cache_dir=str(cache_dir))
+    cache.load_survey(str(other), cache_dir=str(cache_dir))
+    before = _entries(cache_dir)
+    assert len(before) == 2
+    with open(survey, "a") as f:
+        f.write("5,NY,0.5,2,False\n")
+    cache.load_survey(survey, cache_dir=str(cache_dir))
+    # the old version of survey.csv is gone; other.csv keeps its entry
+    after = _entries(cache_dir)
+    assert len(after) == 2 and cache.csv_checksum(str(other), str(cache_dir)) in after
+    assert cache.csv_checksum(survey, str(cache_dir)) in after
+    other.unlink()
+    with open(survey, "a") as f:
+        f.write("6,CA,0.2,1,True\n")
+    cache.load_survey(survey, cache_dir=str(cache_dir))
+    assert _entries(cache_dir) == [cache.csv_checksum(survey, str(cache_dir))]
+
+
+def test_unwritable_cache_falls_back_to_read_csv(cache, survey, tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    loaded = cache.load_survey(survey, columns=["id", "party"], cache_dir=str(blocker / "anes"))
+    pd.testing.assert_frame_equal(_plain(loaded), _plain(pd.read_csv(survey)[["id", "party"]]))
+    assert str(loaded["party"].dtype) == "Int8"
+
+
+def test_folder_copies_are_identical():
+    sources = {(ROOT / folder / "survey_cache.py").read_text() for folder in
+               ("FPP_ANES_2016_base", "FPP_ANES_2016_NP", "FPP_ANES_2016_gen")}
+    assert len(sources) == 1
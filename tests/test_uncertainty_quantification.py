@@ -0,0 +1,187 @@
+"""uncertainty_quantification.py: vectorized, parallel, BCa and studentized bootstrap (requests 026-028)."""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+
+
+@pytest.fixture
+def uq():
+    return load("Evaluation_Tools", "uncertainty_quantification")
+
+
+def _frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.integers(1, 8, n).astype(float)
+    return pd.DataFrame({
+        "predicted_vote": rng.choice(["A", "B"], n),
+        "predicted_ideology": x,
+        "true_ideology": np.clip(x + rng.integers(-2, 3, n), 1, 7),
+        "design_weight": rng.uniform(0.5, 3.0, n),
+    })
+
+
+def vote_share_plus_ideology(df):
+    """Module-level (picklable) metric for the process pool."""
+    return (df["predicted_vote"] == "A").mean() + df["predicted_ideology"].mean()
+
+
+def noted_republican_share(df):
+    """Uses the categorical and object columns, which workers rebuild from codes."""
+    return ((df["party"] == "R") & df["note"].notna()).mean()
+
+
+@pytest.mark.parametrize("metric, metric_fn", [("vote_ratio", "compute_vote_ratio"),
+                                                ("ideology_alignment", "compute_ideology_alignment")])
+def test_weight_vector_replicates_equal_resampled_frames(uq, metric, metric_fn):
+    df = _frame()
+    terms, counts, stat_fn = uq._collapsed_terms(df, metric)
+    rng = np.random.default_rng(1)
+    # 每一行属于哪个折叠后的唯一行
+    row_of = np.unique(uq.VECTORIZED_METRICS[metric][0](df), axis=0, return_inverse=True)[1].ravel()
+    for _ in range(20):
+        idx = rng.integers(0, len(df), len(df))
+        weights = np.bincount(row_of[idx], minlength=len(counts)).astype(float)
+        vectorized = stat_fn(uq._weighted_means(weights[None, :], terms))[0]
+        assert vectorized == pytest.approx(getattr(uq, metric_fn)(df.take(idx)), abs=1e-9)
+
+
+def test_cli_defaults_to_the_loop_engine(uq, tmp_path, monkeypatch, capsys):
+    df = _frame(n=100)
+    df.to_csv(tmp_path / "predictions.csv", index=False)
+    monkeypatch.setattr(sys, "argv", ["uncertainty_quantification.py", "--data", str(tmp_path / "predictions.csv"),
+                                      "--metric", "vote_ratio", "--n_boot", "30"])
+    uq.main()
+    mean, (low, high) = uq.bootstrap_confidence_interval(df, uq.compute_vote_ratio, 30, random_state=42)
+    assert capsys.readouterr().out.splitlines()[1:] == [f"Mean: {mean:.4f}",
+                                                        f"95% Confidence Interval: [{low:.4f}, {high:.4f}]"]
+
+
+def test_design_weighted_estimate_is_hajek(uq):
+    df = _frame()
+    estimate = uq._full_sample_estimate(df, "vote_ratio", weight_col="design_weight")
+    w = df["design_weight"]
+    assert estimate == pytest.approx(((df["predicted_vote"] == "A") * w).sum() / w.sum(), abs=1e-12)
+
+
+def test_parallel_replicates_do_not_depend_on_worker_count(uq):
+    df = _frame(n=200)
+    serial = uq.parallel_bootstrap_replicates(df, vote_share_plus_ideology, 150, random_state=3, n_jobs=1)
+    parallel = uq.parallel_bootstrap_replicates(df, vote_share_plus_ideology, 150, random_state=3, n_jobs=3)
+    np.testing.assert_array_equal(serial, parallel)
+
+
+def test_worker_closes_attached_segments(uq):
+    df = _frame(n=50)
+    specs, segments = uq._share_frame(df)
+    try:
+        uq._init_worker(specs)
+        attached = list(uq._worker_segments)
+        # 非数值列解码后其共享内存立即关闭，只保留数值列的映射
+        assert len(attached) == df.select_dtypes("number").shape[1]
+        pd.testing.assert_frame_equal(uq._worker_frame, df, check_dtype=False)
+        uq._detach_worker()
+        assert uq._worker_frame is None and uq._worker_segments == []
+        assert all(shm.buf is None for shm in attached)
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def _mixed_frame(n=120, seed=5):
+    df = _frame(n, seed)
+    df["party"] = pd.Categorical(np.resize(["D", "R", "I"], n))
+    df["note"] = np.resize(["x", None, "y", np.nan], n)
+    return df
+
+
+def test_sequential_mode_keeps_the_original_sampler(uq):
+    df = _frame(n=80)
+    rng = np.random.default_rng(7)
+    expected = [vote_share_plus_ideology(df.loc[rng.choice(df.index, size=len(df), replace=True)])
+                for _ in range(40)]
+    mean, (lower, upper) = uq.bootstrap_confidence_interval(df, vote_share_plus_ideology, 40, random_state=7)
+    assert mean == pytest.approx(np.mean(expected), abs=1e-12)
+    assert (lower, upper) == pytest.approx((np.percentile(expected, 2.5), np.percentile(expected, 97.5)), abs=1e-12)
+
+
+def test_parallel_replicates_come_from_seeded_blocks(uq):
+    df = _frame(n=60)
+    replicates = uq.parallel_bootstrap_replicates(df, vote_share_plus_ideology, 150, random_state=11, n_jobs=1)
+    assert len(replicates) == 150
+    seeds = np.random.SeedSequence(11).spawn(3)
+    for block, (seed, size) in enumerate(zip(seeds, [64, 64, 22])):
+        rng = np.random.default_rng(seed)
+        for i in range(size):
+            expected = vote_share_plus_ideology(df.take(rng.integers(0, len(df), size=len(df))))
+            assert replicates[block * 64 + i] == pytest.approx(expected, abs=1e-12)
+    # blocks are independent streams: a longer run extends a shorter one
+    shorter = uq.parallel_bootstrap_replicates(df, vote_share_plus_ideology, 128, random_state=11, n_jobs=1)
+    np.testing.assert_array_equal(replicates[:128], shorter)
+
+
+def test_parallel_interval_with_non_numeric_columns(uq):
+    df = _mixed_frame()
+    serial = uq.bootstrap_confidence_interval(df, noted_republican_share, 100, random_state=2, n_jobs=1)
+    parallel = uq.bootstrap_confidence_interval(df, noted_republican_share, 100, random_state=2, n_jobs=2)
+    assert parallel == serial
+    assert 0 < serial[1][0] < serial[1][1] < 1
+
+
+@pytest.mark.parametrize("metric, metric_fn", [("vote_ratio", "compute_vote_ratio"),
+                                                ("ideology_alignment", "compute_ideology_alignment")])
+def test_closed_form_jackknife_equals_leave_one_out(uq, metric, metric_fn):
+    df = _frame(n=120)
+    values, counts = uq.jackknife_values(df, metric)
+    row_of = np.unique(uq.VECTORIZED_METRICS[metric][0](df), axis=0, return_inverse=True)[1].ravel()
+    assert counts.sum() == len(df)
+    loo, ones = uq.jackknife_values(df, getattr(uq, metric_fn))
+    np.testing.assert_allclose(values[row_of], loo, atol=1e-9)
+    assert uq._acceleration(values, counts) == pytest.approx(uq._acceleration(loo, ones), abs=1e-9)
+
+
+def test_weighted_jackknife_is_leave_one_out_hajek(uq):
+    df = _frame(n=80)
+    values, _ = uq.jackknife_values(df, "vote_ratio", weight_col="design_weight")
+    row_of = np.unique(uq._design_weighted(uq._vote_ratio_terms(df), df["design_weight"].to_numpy(),
+                                           uq._vote_ratio_from_means)[0], axis=0, return_inverse=True)[1].ravel()
+    is_a, w = (df["predicted_vote"] == "A").to_numpy(), df["design_weight"].to_numpy()
+    expected = [(np.sum(is_a * w) - is_a[i] * w[i]) / (np.sum(w) - w[i]) for i in range(len(df))]
+    np.testing.assert_allclose(values[row_of], expected, atol=1e-12)
+
+
+def test_delta_method_se(uq):
+    df = _frame(n=400)
+    terms, counts, stat_fn = uq._collapsed_terms(df, "vote_ratio")
+    p = (df["predicted_vote"] == "A").mean()
+    se = uq._delta_method_se(counts.astype(float), terms, stat_fn)[0]
+    assert se == pytest.approx(np.sqrt(p * (1 - p) / len(df)), rel=1e-6)
+    # for the correlation, the delta method agrees with the jackknife standard error
+    terms, counts, stat_fn = uq._collapsed_terms(df, "ideology_alignment")
+    se = uq._delta_method_se(counts.astype(float), terms, stat_fn)[0]
+    values, _ = uq.jackknife_values(df, uq.compute_ideology_alignment)
+    n = len(df)
+    jack_se = np.sqrt((n - 1) / n * np.sum((values - values.mean()) ** 2))
+    assert se == pytest.approx(jack_se, rel=0.15)
+
+
+def test_bca_and_studentized_intervals_cover_the_true_value(uq):
+    rng = np.random.default_rng(2024)
+    rho, n, trials = 0.5, 150, 200
+    covered = {"bca": 0, "studentized": 0}
+    for trial in range(trials):
+        x = rng.standard_normal(n)
+        y = rho * x + np.sqrt(1 - rho ** 2) * rng.standard_normal(n)
+        df = pd.DataFrame({"predicted_ideology": x, "true_ideology": y})
+        _, (lo, hi) = uq.bootstrap_bca_interval(df, "ideology_alignment", 1000, random_state=trial)
+        covered["bca"] += lo <= rho <= hi
+        _, (lo, hi) = uq.bootstrap_studentized_interval(df, "ideology_alignment", 1000, random_state=trial)
+        covered["studentized"] += lo <= rho <= hi
+    # nominal 95%; 200 trials give a standard error of about 1.5 points
+    for kind, hits in covered.items():
+        assert 0.89 <= hits / trials <= 0.99, (kind, hits)